@@ -11,6 +11,9 @@ PORT = os.getenv("APPLICATION_PORT", 3001)
 SCHEDULER_URL = os.environ.get("SCHEDULER_URL", "http://scheduler:3002/schedule_task")
 SCHEDULER_RUN_URL="http://scheduler:3002/run_task"
 MINIMUM_CONFIDENCE = float(os.environ.get("APPLICATION_MIN_CONFIDENCE", 80.0))
+SCAN_RESULT_SOURCES = os.environ.get(
+    "APPLICATION_SCAN_RESULT_SOURCES", "celery_worker,celery_scoring_worker"
+).split(",")  # Hosts allowed to post scan results (the scan worker and the scoring worker)
 SCAN_FREQUENCIES = {
     1: "Monthly",
     2: "Weekly",
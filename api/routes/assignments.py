@@ -182,6 +182,9 @@ def update_assignment(assignment):
 
     active = data.get("assignmentActive")
     logger.info("Assignment active status changed from %s to %s", assignment.assignmentActive, active)
+    previous_active = assignment.assignmentActive
+    previous_contents = assignment.contents
+    previous_key_phrases = assignment.get_key_phrases()
     
     if active is False and assignment.assignmentActive is True:
         task_data = {
@@ -225,6 +228,27 @@ def update_assignment(assignment):
     db.session.commit()
 
     update_key_phrases(assignment, data.get("keyPhrases"))
+
+    # Reschedule the scan of an active assignment whose text or key phrases changed, so the
+    # scraping server scans for the new text and drops what it cached for the old one
+    key_phrases = assignment.get_key_phrases()
+    if previous_active and assignment.assignmentActive and (
+        contents != previous_contents or key_phrases != previous_key_phrases
+    ):
+        task_data = {
+            "id": assignment.assignmentId,
+            "platform": "Chegg",
+            "oldFrequency": SCAN_FREQUENCIES[current_user.frequencyId],
+            "frequency": SCAN_FREQUENCIES[current_user.frequencyId],
+            "keywords": key_phrases,
+            "textToSearch": contents,
+        }
+        try:
+            requests.put(SCHEDULER_URL, json=task_data)
+            logger.info("Updated scan for assignment: %s", assignment.title)
+        except Exception as e:
+            logger.info("Error sending put request to scraping server: %s", e)
+
     logger.info("Assignment updated: %s", data.get("title"))
 
     return jsonify(assignment.as_api_response())
@@ -11,7 +11,7 @@ import json
 
 from extensions import db, logger, mail
 from models.models import ScanResult, Assignment, Instructor
-from config import MINIMUM_CONFIDENCE
+from config import MINIMUM_CONFIDENCE, SCAN_RESULT_SOURCES
 
 results = Blueprint("results", __name__)
 
@@ -42,21 +42,36 @@ def get_results():
         return jsonify({"msg": "Error retrieving scan results"}), 500
 
 
+def scan_result_source_addrs():
+    """
+    Returns the addresses of the hosts allowed to post scan results. Hosts that
+    do not resolve (e.g. a worker that is not deployed) are skipped.
+    """
+    addrs = set()
+    for host in SCAN_RESULT_SOURCES:
+        try:
+            addrs.add(socket.gethostbyname(host))
+        except socket.gaierror:
+            continue
+    return addrs
+
+
 @results.route("/", methods=["POST"])
 async def add_scan_result():
     """
     Add a scan result(s) to the database and send a notification to the instructor
     if the confidence probability is above the minimum threshold.
     """
-    # only accept requests from the scraper worker
-    scraper_worker_addr = socket.gethostbyname("celery_worker")
-    if request.remote_addr != scraper_worker_addr:
+    # only accept requests from the scraper workers
+    if request.remote_addr not in scan_result_source_addrs():
         return jsonify({"msg": "Unauthorized"}), 401
     try:
         logger.info(request.json)
         logger.info(request.get_json())
         results = request.get_json()
-        instructor_email = None
+        # instructor emails by assignment ID, since a batch may hold results of
+        # other instructors' assignments (e.g. matches found while scanning another assignment)
+        instructor_emails = {}
         for result in results:
             confidence = float(result.get("confidenceProbability"))
             url = result.get("url")
@@ -89,19 +104,19 @@ async def add_scan_result():
                 db.session.add(new_result)
                 continue
 
-            # get instructor email if not already retrieved
-            # (all results in a batch should have the same instructor)
-            if not instructor_email:
-                assignment = Assignment.query.filter(
-                    Assignment.assignmentId == result.get("assignmentId")
-                ).one_or_none()
-                instructor_email = (
+            # get the assignment and the email of its instructor, looked up once per assignment
+            assignment = Assignment.query.filter(
+                Assignment.assignmentId == new_result.assignmentId
+            ).one_or_none()
+            if assignmentId not in instructor_emails:
+                instructor_emails[assignmentId] = (
                     Instructor.query.filter(
                         Instructor.instructorId == assignment.instructorId
                     )
                     .one_or_none()
                     .email
                 )
+            instructor_email = instructor_emails[assignmentId]
 
             # send email to instructor if confidence probability is above threshold
             if new_result.confidenceProbability >= MINIMUM_CONFIDENCE:
@@ -114,10 +129,6 @@ async def add_scan_result():
                     recipients=[instructor_email],
                 )
 
-                assignment = Assignment.query.filter(
-                    Assignment.assignmentId == new_result.assignmentId
-                ).one_or_none()
-
                 msg.html = f"""
 Hello,<br>
 <br>
@@ -81,6 +81,13 @@ def mock_requests_post():
         yield mock_post
 
 
+@pytest.fixture
+def mock_requests_put():
+    with patch("requests.put") as mock_put:
+        mock_put.return_value.status_code = 200
+        yield mock_put
+
+
 def test_create_assignment(
     client, init_db, new_instructor, patch_redis, mock_requests_post
 ):
@@ -203,6 +210,42 @@ def test_update_assignment(
     assert len(json_data["keyPhrases"]) == 2
 
 
+def test_update_assignment_text_reschedules_scan(
+    client, init_db, new_instructor, patch_redis, mock_requests_post, mock_requests_put
+):
+    """
+    Test that changing the text of an active assignment reschedules its scan
+    with the new text, and that an unchanged text does not.
+    """
+    headers = {
+        "Authorization": f"Bearer {create_access_token(identity=new_instructor)}"
+    }
+    data = {
+        "dueDate": "2029-11-11T12:00:00.000Z",
+        "contents": "Test Assignment",
+        "courseName": "Test Course",
+        "title": "Test Title",
+        "keyPhrases": ["phrase1"],
+    }
+    response = client.post("/assignments/", json=data, headers=headers)
+    assignment_id = response.get_json()["assignmentId"]
+
+    data["title"] = "Renamed Title"
+    response = client.put(f"/assignments/{assignment_id}", json=data, headers=headers)
+    assert response.status_code == 200
+    assert not mock_requests_put.called
+
+    data["contents"] = "Updated Assignment"
+    response = client.put(f"/assignments/{assignment_id}", json=data, headers=headers)
+    assert response.status_code == 200
+    assert mock_requests_put.call_count == 1
+    task_data = mock_requests_put.call_args.kwargs["json"]
+    assert task_data["id"] == assignment_id
+    assert task_data["textToSearch"] == "Updated Assignment"
+    assert task_data["keywords"] == ["phrase1"]
+    assert task_data["oldFrequency"] == task_data["frequency"]
+
+
 def test_delete_assignment(
     client,
     init_db,
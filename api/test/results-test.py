@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_jwt_extended import create_access_token
 import pytest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 from server import create_app
 from models.models import Assignment, Instructor, ScanResult
@@ -154,3 +154,59 @@ def test_get_unauthorized_result(
 
     response = client.get("/results/1", headers=headers)
     assert response.status_code == 401
+
+
+@pytest.fixture
+def patch_mail():
+    # accept scan results from the test client and capture the notifications
+    with patch(
+        "routes.results.scan_result_source_addrs", return_value={"127.0.0.1"}
+    ), patch("routes.results.mail.send_message", new_callable=AsyncMock) as send:
+        yield send
+
+
+def test_add_scan_results_of_several_instructors(
+    client, init_db, new_instructor_with_results, patch_mail
+):
+    salt = make_salt()
+    other_instructor = Instructor(
+        firstName="other",
+        lastName="other",
+        email="other@test.com",
+        userPassword=make_pw_hash("other@test.com", "testpassword", salt),
+        passwordSalt=salt,
+        created=datetime.utcnow(),
+        lastLogin=None,
+    )
+    db.session.add(other_instructor)
+    db.session.commit()
+    db.session.add(
+        Assignment(
+            assignmentId=2,
+            instructorId=other_instructor.instructorId,
+            assignmentActive=True,
+            dueDate=datetime.utcnow(),
+            contents="other",
+            courseName="other",
+            title="other",
+            lastNotificationCheck=datetime.utcnow(),
+        )
+    )
+    db.session.commit()
+
+    # a match for another instructor's assignment, found while scanning assignment 1
+    scan_time = int(datetime.utcnow().timestamp())
+    data = [
+        {"confidenceProbability": 95.0, "url": "a.com", "scanTime": scan_time, "assignmentId": 1},
+        {"confidenceProbability": 90.0, "url": "b.com", "scanTime": scan_time, "assignmentId": 2},
+    ]
+    response = client.post("/results/", json=data)
+
+    assert response.status_code == 201
+    recipients = {
+        call.args[0].recipients[0]: call.args[0].subject for call in patch_mail.call_args_list
+    }
+    assert recipients == {
+        "test@test.com": 'Your Assignment "test" was found online - WolfWatch',
+        "other@test.com": 'Your Assignment "other" was found online - WolfWatch',
+    }
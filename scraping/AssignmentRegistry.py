@@ -0,0 +1,157 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import redis
+import scipy.sparse
+from redbeat.schedulers import RedBeatConfig, RedBeatSchedulerEntry, get_redis
+
+import MinHash
+from extensions import celery, redis_cache, logger
+from FingerprintCache import fingerprint_cache
+from Similarity import (
+    AssignmentFingerprint,
+    build_count_matrix,
+    pairwise_similarity,
+    pairwise_similarity_idf,
+    tokenize,
+)
+
+# Redis hash of every actively scanned assignment, mapping its ID to its text and keywords
+ACTIVE_KEY = "assignments:active"
+# Redis counter incremented on every change to the active assignments
+VERSION_KEY = "assignments:active:version"
+# Redis flag set by the worker that backfilled the registry from the schedule, so it is only done once
+BACKFILLED_KEY = "assignments:active:backfilled"
+
+
+# Registers an assignment as actively scanned, or updates its text and keywords.
+def register_assignment(assignment_id, keywords: Optional[List[str]], text_to_search: str):
+    try:
+        redis_cache.hset(
+            ACTIVE_KEY,
+            mapping={str(assignment_id): json.dumps({"keywords": keywords, "textToSearch": text_to_search})},
+        )
+        redis_cache.incr(VERSION_KEY)
+    except redis.exceptions.RedisError as e:
+        logger.error("Error registering assignment %s: %s", assignment_id, e)
+
+
+# Removes an assignment from the actively scanned assignments.
+def unregister_assignment(assignment_id):
+    try:
+        redis_cache.hdel(ACTIVE_KEY, str(assignment_id))
+        redis_cache.incr(VERSION_KEY)
+    except redis.exceptions.RedisError as e:
+        logger.error("Error unregistering assignment %s: %s", assignment_id, e)
+
+
+# Reads the assignment ID, keywords and text of every scheduled scan task.
+def read_scheduled_assignments() -> Dict[str, Tuple[Optional[List[str]], str]]:
+    assignments = {}
+    for key in get_redis(celery).zrange(RedBeatConfig(celery).schedule_key, 0, -1):
+        entry = RedBeatSchedulerEntry.from_key(key, app=celery)
+        # Skip tasks that were saved without their assignment ID
+        if len(entry.args) != 3:
+            continue
+        assignment_id, keywords, text_to_search = entry.args
+        if text_to_search:
+            assignments[str(assignment_id)] = (keywords, text_to_search)
+    return assignments
+
+
+# Fills the registry from the scheduled scan tasks. Used once, when the registry does not exist yet.
+def backfill_from_schedule():
+    for assignment_id, (keywords, text_to_search) in read_scheduled_assignments().items():
+        register_assignment(assignment_id, keywords, text_to_search)
+
+
+# Fingerprints of every active assignment stacked into matrices, so one scraped page can be scored
+# against all of them with a single sparse matrix multiply.
+class ActiveAssignments:
+    # ID of the assignment in each row
+    assignment_ids: List[str]
+    # Vocabulary of the assignment matrices
+    vocabulary: Dict[str, int]
+    # Term counts of each assignment
+    counts: scipy.sparse.csr_matrix
+    # Key phrase terms of each assignment (empty rows for assignments without key phrases)
+    keywords: scipy.sparse.csr_matrix
+    # LSH index of the MinHash window signatures of each assignment
+    index: MinHash.LSHIndex
+
+    def __init__(self, assignment_ids: List[str], fingerprints: List[AssignmentFingerprint], rows_per_band: int):
+        self.assignment_ids = assignment_ids
+        self.vocabulary = {}
+        indices = [
+            self.vocabulary.setdefault(term, len(self.vocabulary))
+            for fingerprint in fingerprints
+            for term in fingerprint.terms
+        ]
+        indptr = np.cumsum([0] + [len(fingerprint.terms) for fingerprint in fingerprints])
+        data = np.concatenate([fingerprint.counts for fingerprint in fingerprints] + [np.zeros(0)])
+        self.counts = scipy.sparse.csr_matrix(
+            (data, np.asarray(indices, dtype=np.int64), indptr),
+            shape=(len(fingerprints), len(self.vocabulary)),
+        )
+        self.keywords = build_count_matrix(
+            [fingerprint.keyword_terms or [] for fingerprint in fingerprints], self.vocabulary
+        )
+        self.index = MinHash.LSHIndex(rows_per_band)
+        for row, fingerprint in enumerate(fingerprints):
+            self.index.add(row, fingerprint.signatures)
+
+    # Scores every text against every assignment, returning an (assignments x texts) score matrix.
+    # Pairs whose MinHash signatures share no LSH band score 0, like the single-assignment pre-filter.
+    def score(self, texts: List[str], idf_model=None) -> np.ndarray:
+        # The assignment vocabulary is shared by every scan, so new terms go into a copy
+        vocabulary = dict(self.vocabulary)
+        text_tokens = [tokenize(text) for text in texts]
+        text_counts = build_count_matrix(text_tokens, vocabulary)
+        if idf_model is None:
+            scores = pairwise_similarity(self.counts, text_counts, self.keywords)
+        else:
+            idf = idf_model.lookup(list(vocabulary.keys()))
+            scores = pairwise_similarity_idf(self.counts, text_counts, idf, self.keywords)
+
+        candidates = np.zeros(scores.shape, dtype=bool)
+        for column, tokens in enumerate(text_tokens):
+            rows = list(self.index.query(MinHash.signature(MinHash.shingle_hashes(tokens))))
+            candidates[rows, column] = True
+        return np.where(candidates, scores, 0.0)
+
+
+# Active assignments of this worker process, rebuilt whenever the registry version changes
+_active: Optional[ActiveAssignments] = None
+_active_version = None
+
+
+# Gets the matrices of every active assignment, rebuilding them only after the registry changed.
+def get_active_assignments(rows_per_band: int) -> Optional[ActiveAssignments]:
+    global _active, _active_version
+    try:
+        # Only the first worker to set the flag backfills, and only if nothing was registered before it.
+        # Without the flag an empty registry would be backfilled again on every scan.
+        if redis_cache.set(BACKFILLED_KEY, 1, nx=True) and not redis_cache.exists(ACTIVE_KEY):
+            backfill_from_schedule()
+        version = redis_cache.get(VERSION_KEY)
+        if _active is not None and version == _active_version:
+            return _active
+        registered = redis_cache.hgetall(ACTIVE_KEY)
+    except redis.exceptions.RedisError as e:
+        logger.error("Error reading active assignments: %s", e)
+        return _active
+    if len(registered) == 0:
+        return None
+
+    assignment_ids = []
+    fingerprints = []
+    for assignment_id, data in registered.items():
+        assignment = json.loads(data)
+        assignment_ids.append(assignment_id)
+        fingerprints.append(
+            fingerprint_cache.get(assignment_id, assignment["textToSearch"], assignment["keywords"])
+        )
+    _active = ActiveAssignments(assignment_ids, fingerprints, rows_per_band)
+    _active_version = version
+    return _active
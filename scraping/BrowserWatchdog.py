@@ -0,0 +1,109 @@
+import os
+from typing import Iterable, Optional, Set
+
+import psutil
+
+from extensions import logger
+
+# Got help from:
+# https://psutil.readthedocs.io/en/latest/#processes
+# https://psutil.readthedocs.io/en/latest/#psutil.wait_procs
+
+# Process name of the driver
+DRIVER_PROCESS_NAME = "chromedriver"
+# Switch chromedriver adds to every browser it starts, which tells them apart from a browser started by a person
+WEBDRIVER_SWITCH = "--test-type=webdriver"
+# Seconds to wait for killed processes to exit
+KILL_TIMEOUT = 3
+
+
+# Checks whether a process is a chromedriver or a browser started by one.
+def is_driver_process(process: psutil.Process) -> bool:
+    try:
+        return process.name().lower().startswith(DRIVER_PROCESS_NAME) or WEBDRIVER_SWITCH in process.cmdline()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return False
+
+
+# Gets the process ID of the chromedriver behind a driver, or None when it is not running.
+def driver_pid(driver) -> Optional[int]:
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    return getattr(process, "pid", None)
+
+
+# Gets the resident memory in bytes of a process and every process it started,
+# i.e. chromedriver plus all Chrome browser, renderer and GPU processes of one driver.
+def process_tree_rss(pid: int) -> int:
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return rss
+
+
+# Kills processes and waits for them to exit, returning the number killed.
+def kill_processes(processes: Iterable[psutil.Process]) -> int:
+    killed = []
+    for process in processes:
+        try:
+            process.kill()
+            killed.append(process)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    psutil.wait_procs(killed, timeout=KILL_TIMEOUT)
+    return len(killed)
+
+
+# Kills a process and every process it started, e.g. a chromedriver that did not quit its browser.
+def kill_process_tree(pid: int) -> int:
+    try:
+        root = psutil.Process(pid)
+        processes = root.children(recursive=True) + [root]
+    except psutil.NoSuchProcess:
+        return 0
+    return kill_processes(processes)
+
+
+# Gets the process IDs of processes and of every process they started, skipping the ones no longer running.
+def process_tree_pids(pids: Iterable[int]) -> Set[int]:
+    tree = set()
+    for pid in pids:
+        try:
+            tree.update(child.pid for child in psutil.Process(pid).children(recursive=True))
+        except psutil.NoSuchProcess:
+            continue
+        tree.add(pid)
+    return tree
+
+
+# Kills chromedrivers and browsers left behind by drivers that were never quit or crashed.
+# A live chromedriver is started by a worker process and a live browser by its chromedriver,
+# so one whose parent is init or the Celery main process has lost its owner.
+# The chromedrivers of live_pids (the live drivers of the worker) and their browsers are never killed.
+# A worker running as init itself (e.g. the solo pool as a container's main process) is the parent of its
+# live drivers and of orphans alike, so it does not sweep at all.
+def kill_orphaned_browsers(live_pids: Iterable[int] = ()) -> int:
+    if os.getpid() == 1:
+        return 0
+    orphan_parents = {1, os.getppid()}
+    live = process_tree_pids(live_pids)
+    orphans = []
+    for process in psutil.process_iter(["ppid"]):
+        if process.info["ppid"] in orphan_parents and process.pid not in live and is_driver_process(process):
+            try:
+                orphans.extend(child for child in process.children(recursive=True) if child.pid not in live)
+            except psutil.NoSuchProcess:
+                continue
+            orphans.append(process)
+    killed = kill_processes(orphans)
+    if killed > 0:
+        logger.warning("Killed %s orphaned browser processes", killed)
+    return killed
@@ -1,7 +1,5 @@
 import time
-from typing import Dict, List
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
+from typing import Dict, List, Optional
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
@@ -12,13 +10,49 @@ import requests
 import json
 import pyperclip as pc
 import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
 
 
-from Scraper import Scraper
-from extensions import logger
+from Scraper import CAPTCHA_FAILURE, ELEMENT_FAILURE, PROXY_FAILURE, Scraper
+from config import (
+    CHEGG_BASE_URL,
+    CROSS_ASSIGNMENT_SCORING,
+    CROSS_MATCH_MIN_CONFIDENCE,
+    HTTP_BLOCKED_TTL,
+    HTTP_FAST_PATH,
+    PASSAGE_MODE,
+    PASSAGE_WINDOW_WORDS,
+    RESULT_CONCURRENCY,
+    RESULTS_TO_SCAN,
+    SCORING_MODE,
+    SCORING_QUEUE,
+    SNIPPET_MIN_CONFIDENCE,
+    SNIPPET_PREFILTER,
+)
+from DriverPool import driver_pool
+from extensions import celery, logger
+from FingerprintCache import fingerprint_cache
+from HttpFetcher import FetchBlocked
+from IdfModel import archive_texts
+from LayoutCache import layout_cache
+from PageExtractor import (
+    QUESTION_LOADED_SELECTOR,
+    extract_question_text,
+    extract_result_count,
+    extract_search_results,
+    parse_page,
+)
+from ProxyPool import CAPTCHA as PROXY_CAPTCHA, SUCCESS as PROXY_SUCCESS, NoProxyAvailable, proxy_pool
+from QueryPlanner import merge_search_results
+from TextNormalizer import normalize_text
 
-# Number of results to scan
-RESULTS_TO_SCAN = 1
+# Name of the platform in shared caches
+PLATFORM = "chegg"
+# Name of the HTTP fast path in the layout cache, which remembers when it has to fall back to the browser:
+# for the TTL of the cache when the pages are rendered by scripts, and for HTTP_BLOCKED_TTL when it was blocked
+HTTP_PLATFORM = "chegg:http"
 # The scan results endpoint URL
 RESULTS_API_URL = "http://api:3001/results"
 
@@ -30,26 +64,92 @@ class Chegg_Scraper(Scraper):
     __keywords: List[str]
     # Text to be scanned for
     __text_to_search: str
+    # Search results of the scrape when they are collected for a sharded scan instead of scored right away
+    __collected: Optional[List[Dict]]
 
     # Initializes the Chegg_Scraper object with the given parameters.
     def __init__(self, keywords: List[str], text_to_search: str):
         super(Chegg_Scraper, self).__init__(keywords, text_to_search)
         self.__keywords = keywords
         self.__text_to_search = text_to_search
+        self.__collected = None
+        self.set_base_url(CHEGG_BASE_URL)
+        self.set_platform(PLATFORM)
+
+    # Scrapes like scrape, but returns the scraped search results instead of scoring and posting them,
+    # so the search results of every shard of a scan can be scored together. Returns None when the scrape fails.
+    def collect(self, assignment_id):
+        self.__collected = []
+        try:
+            if self.scrape(assignment_id) == False:
+                return None
+            return self.__collected
+        finally:
+            self.__collected = None
+
+    # Gets the fingerprint of the text to be scanned for. A collected scrape searches for one question of the
+    # assignment (a shard), whose fingerprint must not replace the one of the whole assignment in the cache.
+    def get_fingerprint(self, assignment_id):
+        if self.__collected is None:
+            return super(Chegg_Scraper, self).get_fingerprint(assignment_id)
+        return fingerprint_cache.get(assignment_id, self.__text_to_search, self.__keywords, track=False)
 
     # Top-level scrape function, which tries to detect which layout of Chegg is currently present and scrapes accordingly.
+    # The scrape goes through a proxy leased from the proxy pool, preferably one a warm driver of the worker was
+    # started with, and fails with PROXY_FAILURE when every proxy is ejected or out of budget.
+    # Pages are fetched over plain HTTP when possible, and the browser is only used when that gets blocked.
+    # Raises RateLimited before leasing anything when the turn of its first request is too far away.
     def scrape(self, assignment_id):
-        # Tries scraping new site first
-        scrape_new_site = self.scrape_new_site(assignment_id)
-        scrape_old_site = None
-        # If scraping new site fails, then scrape old site
-        if scrape_new_site == False:
-            time.sleep(3)
-            scrape_old_site = self.scrape_old_site(assignment_id)
+        self.get_pacer().start()
+        self.set_failure(None)
+        self.acquire_first_request_token()
+        try:
+            with proxy_pool.lease(driver_pool.idle_proxy_servers()) as proxy_server:
+                self.set_proxy_server(proxy_server)
+                # Try plain HTTP first, unless it recently had to fall back to the browser
+                if HTTP_FAST_PATH and layout_cache.get(HTTP_PLATFORM) != "browser":
+                    if self.scrape_http(assignment_id):
+                        return True
+                scrape_browser = self.scrape_browser(assignment_id)
+                # The outcome of the browser session counts towards the health of its proxy, unless the layout is to blame
+                if scrape_browser != False:
+                    proxy_pool.record(proxy_server, PROXY_SUCCESS)
+                elif self.get_failure() == CAPTCHA_FAILURE:
+                    proxy_pool.record(proxy_server, PROXY_CAPTCHA)
+                return scrape_browser
+        except NoProxyAvailable as e:
+            logger.error("No proxy available for assignment %s: %s", assignment_id, e)
+            self.set_failure(PROXY_FAILURE)
+            return False
+
+    # Scrapes with the browser. Both layouts are tried with the same warm driver, leased from the worker's driver pool.
+    # The layout that last worked is shared through the layout cache, so scrapes skip the probe of the other one.
+    def scrape_browser(self, assignment_id):
+        layout_scrapers = {"new": self.scrape_new_site, "old": self.scrape_old_site}
+        cached_layout = layout_cache.get(PLATFORM)
+        with driver_pool.lease(self.get_driver_options()) as driver:
+            self.set_driver(driver)
+            # Go straight to the layout that is known to work
+            if cached_layout in layout_scrapers:
+                if layout_scrapers[cached_layout](assignment_id) == False:
+                    # Only a missing element hints at a new layout, a captcha or a timeout says nothing about it
+                    if self.get_failure() == ELEMENT_FAILURE:
+                        layout_cache.record_failure(PLATFORM)
+                    return False
+                layout_cache.record_success(PLATFORM)
+                return True
+            # Tries scraping new site first
+            scrape_new_site = self.scrape_new_site(assignment_id)
+            scrape_old_site = None
+            # If scraping new site fails, then scrape old site
+            if scrape_new_site == False:
+                self.get_pacer().human_delay()
+                scrape_old_site = self.scrape_old_site(assignment_id)
         # If scraping both layouts are unsuccessful then return false and abort
         if scrape_new_site == False and scrape_old_site == False:
             return False
-        # If one scrape is successful then return true
+        # If one scrape is successful then remember its layout and return true
+        layout_cache.remember(PLATFORM, "new" if scrape_new_site != False else "old")
         return True
 
     # Function for scraping the old layout of Chegg.
@@ -59,164 +159,215 @@ class Chegg_Scraper(Scraper):
     # https://www.selenium.dev/documentation/webdriver/elements/interactions/#click
     # https://www.selenium.dev/documentation/webdriver/interactions/navigation/
     def scrape_old_site(self, assignment_id):
-        scan_results = []
-        # Initializes the Chrome webdriver with driver options
-        driver = webdriver.Chrome(options=self.get_driver_options())
-        self.set_driver(driver)
-        # Part of disabling webdriver automation indicator flags
-        self.get_driver().execute_script(
-            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-        )
-
-        # Sets the URL of the website using what is generated from the URL builder function and starts the driver at that URL
-        self.set_url(self.url_builder(self.__text_to_search))
-        self.get_driver().get(self.get_url())
+        # Texts and URLs of each visited search result, scored together once all results are visited
+        search_results = []
 
         # This is under a try except structure because a TimeoutException or NoSuchElementException may be thrown
         try:
-            # Check if the Solutions tab of search results exists, else timeout after 25 seconds
-            element = WebDriverWait(self.get_driver(), 25).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//a[@data-test='search-tabs-link-study']")
-                )
-            )
-            time.sleep(3)
-            # Click Solutions tab
-            element.click()
-            # Check if the first search result exists, else timeout after 8 seconds
-            element = WebDriverWait(self.get_driver(), 8).until(
-                EC.presence_of_element_located(
-                    (
-                        By.XPATH,
-                        "//span[@data-test='section-1-serp-result-1-study-question']",
-                    )
-                )
-            )
-
-            # Grab the number of search results and print it
-            element = self.get_driver().find_element(
-                By.XPATH, "//div[@data-test='search-result-count-line']"
-            )
-            num_of_results = element.text.split()[0]
-            print("Number of results: " + num_of_results + "\n")
-            time.sleep(3)
+            # Search for each planned query, stopping at the first one that fails (most likely a captcha)
+            search_page_results = []
+            for query in self.get_search_queries():
+                try:
+                    search_page_results.append(self.search_old_site(query))
+                except (TimeoutException, NoSuchElementException):
+                    if len(search_page_results) == 0:
+                        raise
+                    logger.error("Search failed for assignment %s, continuing with %s queries", assignment_id, len(search_page_results))
+                    break
 
-            # Go through each search result to check for cheating
-            for idx in range(1, RESULTS_TO_SCAN + 1):
-                # Identifies each search result link
-                element = self.get_driver().find_element(
-                    By.XPATH,
-                    f"//a[@data-test='section-1-serp-result-{idx}-study-link']",
-                )
-                time.sleep(3)
-                # Clicks on search result link
-                element.click()
-                # Outsource scraping each search result to this helper function
-                self.scrape_old_search_result(scan_results, assignment_id)
-            # Try to post scan results to the scan results endpoint, else log error
-            try:
-                headers={'Content-type':'application/json', 'Accept': 'text/plain'}
-                requests.post(
-                    RESULTS_API_URL,
-                    data=json.dumps(scan_results),
-                    headers=headers,
-                )
-            except requests.exceptions.RequestException as e:
-                logger.error("Error posting scan results to API: %s", e)
+            # Pick the search results worth opening and go through them to check for cheating
+            result_urls = self.select_search_results(merge_search_results(search_page_results), assignment_id)
+            self.scrape_result_tabs(result_urls, search_results, assignment_id)
+            # Score every search result against the assignment in a single batch
+            self.submit_search_results(search_results, assignment_id)
         # Catch TimeoutException and blame it on captcha
         except TimeoutException as e:
             print(f"Captcha hit for assignment {assignment_id}\n")
             logger.error(f"Captcha hit for assignment {assignment_id}\n {e}")
-            # self.get_driver().quit()
+            self.set_failure(CAPTCHA_FAILURE)
             return False
         # Catch NoSuchElementException
         except NoSuchElementException as e:
             print(f"Element not found for assignment {assignment_id}\n")
             logger.error(f"Element not found for assignment {assignment_id}\n {e}")
-            # self.get_driver().quit()
+            self.set_failure(ELEMENT_FAILURE)
             return False
-        # finally:
-            # self.get_driver().quit()
         return True
 
-    # Helper function for scraping each search result
-    def scrape_old_search_result(self, scan_results, assignment_id):
-        # Try except structure used to catch Timeout- and NoSuchElement- Exceptions.
-        try:
-            # Check if transcribed image text button exists, else timeout after 8 seconds
-            element = WebDriverWait(self.get_driver(), 8).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//div[@data-test='transcribed-data-text']")
-                )
-            )
-            # Grab the actual transcribed image text
-            element = self.get_driver().find_element(
-                By.XPATH,
-                "//div[@class='styled__TextContent-sc-1k7k16x-4 IUHUF']",
-            )
-        # No transcribed image text, so grab the text from question body
-        except TimeoutException:
-            element = WebDriverWait(self.get_driver(), 8).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//div[@data-test='qna-question-body']")
-                )
-            )
-        # No transcribed image text, so grab the text from question body
-        except NoSuchElementException:
-            element = WebDriverWait(self.get_driver(), 8).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//div[@data-test='qna-question-body']")
+    # Searches the old layout of Chegg for a query and gets the URL and snippet of every Solutions search result.
+    # Raises TimeoutException when the search page does not load.
+    def search_old_site(self, query: str):
+        # Sets the URL of the website using what is generated from the URL builder function and starts the driver at that URL
+        self.set_url(self.url_builder(query))
+        self.acquire_request_token()
+        self.get_driver().get(self.get_url())
+        self.record_page()
+
+        # Wait until the Solutions tab of search results can be clicked, else timeout after 25 seconds
+        element = self.wait_until(
+            EC.element_to_be_clickable(
+                (By.XPATH, "//a[@data-test='search-tabs-link-study']")
+            ),
+            25,
+        )
+        self.get_pacer().human_delay()
+        # Click Solutions tab
+        self.acquire_request_token()
+        element.click()
+        self.record_page()
+        # Check if the first search result exists, else timeout after 8 seconds
+        self.wait_until(
+            EC.presence_of_element_located(
+                (
+                    By.XPATH,
+                    "//span[@data-test='section-1-serp-result-1-study-question']",
                 )
-            )
-        # Get the current URL for scan results
-        current_url = self.get_driver().current_url
-        # Get the text similarity score for this scan result
-        text_similarity_score = (
-            self.calc_text_similarity(
-                self.__text_to_search, element.text, self.__keywords
-            )
-            * 100
+            ),
+            8,
         )
-        # Construct scan result dictionary
-        scan_result_data = {
-            "confidenceProbability": text_similarity_score,
-            "url": current_url,
-            "scanTime": int(datetime.datetime.now().timestamp()),
-            "assignmentId": assignment_id,
-        }
-        # Append to scan results list
-        scan_results.append(scan_result_data)
+
+        # Let the search results finish loading, then read the whole search page at once
+        self.get_pacer().wait_for_network_idle(self.get_driver())
+        search_page = parse_page(self.get_driver().page_source, self.get_driver().current_url)
+
+        # Grab the number of search results and print it
+        num_of_results = extract_result_count(search_page)
+        print(f"Number of results: {num_of_results}\n")
+        return extract_search_results(search_page, self.get_driver().current_url)
+
+    # Fast path scraping the old layout over plain HTTP, without a browser. Returns False when the pages
+    # are blocked or rendered by scripts (no search results or question text in the HTML), so the
+    # browser has to scrape them instead. Only pages rendered by scripts turn the fast path off for every worker
+    # for the TTL of the layout cache: a block may only be one proxy, so it turns it off for HTTP_BLOCKED_TTL,
+    # and a search page that shows it found nothing is left to the browser without turning it off.
+    def scrape_http(self, assignment_id):
+        self.clear_http_cookies()
+        search_urls = [self.url_builder(query) for query in self.get_search_queries()]
+        try:
+            # Fetch the search page of every planned query concurrently
+            with ThreadPoolExecutor(max_workers=RESULT_CONCURRENCY) as executor:
+                search_pages = list(executor.map(self.fetch_page, search_urls))
+            search_page_results = merge_search_results(
+                [extract_search_results(search_page, url) for search_page, url in zip(search_pages, search_urls)]
+            )
+            if len(search_page_results) == 0:
+                if any(extract_result_count(search_page) is not None for search_page in search_pages):
+                    logger.info("Search found nothing over HTTP for assignment %s, using the browser", assignment_id)
+                    return False
+                logger.info("No search results in the HTML for assignment %s, using the browser", assignment_id)
+                layout_cache.remember(HTTP_PLATFORM, "browser")
+                return False
+            result_urls = self.select_search_results(search_page_results, assignment_id)
+            search_results = []
+            # Fetch the selected search results concurrently
+            with ThreadPoolExecutor(max_workers=RESULT_CONCURRENCY) as executor:
+                result_pages = list(executor.map(self.fetch_page, result_urls))
+            for result_url, result_page in zip(result_urls, result_pages):
+                question_text = extract_question_text(result_page)
+                if question_text is None:
+                    logger.info("No question text in the HTML of %s, using the browser", result_url)
+                    layout_cache.remember(HTTP_PLATFORM, "browser")
+                    return False
+                search_results.append({"url": result_url, "text": normalize_text(question_text)})
+        except FetchBlocked as e:
+            logger.info("HTTP fast path blocked for assignment %s, using the browser: %s", assignment_id, e)
+            layout_cache.remember(HTTP_PLATFORM, "browser", HTTP_BLOCKED_TTL)
+            return False
+        except requests.exceptions.RequestException as e:
+            logger.error("HTTP fast path failed for assignment %s, using the browser: %s", assignment_id, e)
+            layout_cache.remember(HTTP_PLATFORM, "browser", HTTP_BLOCKED_TTL)
+            return False
+        self.submit_search_results(search_results, assignment_id)
+        return True
+
+    # Picks the URLs of the search results to open, at most RESULTS_TO_SCAN of them.
+    # With the snippet pre-filter on, the snippet the search page shows for each result is scored against
+    # the assignment first, and only the results whose snippet passes SNIPPET_MIN_CONFIDENCE are opened,
+    # best first. Results shown without a snippet cannot be judged, so they are kept after the others.
+    def select_search_results(self, search_page_results, assignment_id):
+        if not SNIPPET_PREFILTER or not any(result["snippet"] for result in search_page_results):
+            return [result["url"] for result in search_page_results[:RESULTS_TO_SCAN]]
+        with_snippet = [result for result in search_page_results if result["snippet"]]
+        without_snippet = [result["url"] for result in search_page_results if not result["snippet"]]
+        snippet_scores = self.calc_snippet_similarity_batch(
+            self.get_fingerprint(assignment_id),
+            [normalize_text(result["snippet"]) for result in with_snippet],
+        ) * 100
+        ranked = [
+            with_snippet[idx]["url"]
+            for idx in np.argsort(-snippet_scores, kind="stable")
+            if snippet_scores[idx] >= SNIPPET_MIN_CONFIDENCE
+        ]
+        selected = (ranked + without_snippet)[:RESULTS_TO_SCAN]
         logger.info(
-            "Found a match for assignment %s - %s",
+            "Opening %s of %s search results for assignment %s after scoring their snippets",
+            len(selected),
+            len(search_page_results),
             assignment_id,
-            current_url,
         )
-        time.sleep(3)
-        # Navigate back a page
-        self.get_driver().back()
-        time.sleep(3)
+        return selected
+
+    # Opens the search results in parallel tabs, RESULT_CONCURRENCY at a time, and scrapes each once it loaded.
+    # The browser loads every tab of a batch at the same time, so a batch costs about as much as one result.
+    # Results that fail to load are skipped, unless none of them load (e.g. a captcha), which raises the last error.
+    # Got help from:
+    # https://www.selenium.dev/documentation/webdriver/interactions/windows/
+    def scrape_result_tabs(self, result_urls, search_results, assignment_id):
+        driver = self.get_driver()
+        search_page = driver.current_window_handle
+        last_error = None
+        for start in range(0, len(result_urls), RESULT_CONCURRENCY):
+            self.get_pacer().human_delay()
+            handles_before = set(driver.window_handles)
+            # Opening a tab from the page does not wait for it to load, unlike navigating the driver
+            for result_url in result_urls[start : start + RESULT_CONCURRENCY]:
+                self.acquire_request_token()
+                driver.execute_script("window.open(arguments[0], '_blank');", result_url)
+                self.record_page()
+            for handle in [handle for handle in driver.window_handles if handle not in handles_before]:
+                driver.switch_to.window(handle)
+                try:
+                    self.scrape_old_search_result(search_results, assignment_id)
+                except (TimeoutException, NoSuchElementException) as e:
+                    logger.error("Search result did not load for assignment %s - %s", assignment_id, driver.current_url)
+                    last_error = e
+                driver.close()
+            driver.switch_to.window(search_page)
+        if len(result_urls) > 0 and len(search_results) == 0:
+            raise last_error or TimeoutException("No search result tab opened")
+
+    # Helper function for scraping the search result in the current tab.
+    # Waits for the question of either kind (image or text) to load, then reads the page once.
+    def scrape_old_search_result(self, search_results, assignment_id):
+        # Check if the question exists, else timeout after 8 seconds
+        self.wait_until(
+            EC.presence_of_element_located((By.XPATH, QUESTION_LOADED_SELECTOR)), 8
+        )
+        # Get the current URL for scan results
+        current_url = self.get_driver().current_url
+        question_text = extract_question_text(parse_page(self.get_driver().page_source, current_url))
+        if question_text is None:
+            raise NoSuchElementException(f"No question text in {current_url}")
+        # Keep the normalized text for batch scoring once every search result has been visited
+        search_results.append({"url": current_url, "text": normalize_text(question_text)})
 
     # Function to scrape the new layout of Chegg
     def scrape_new_site(self, assignment_id):
         scan_results = []
         num_of_results = 0
-        driver = webdriver.Chrome(options=self.get_driver_options())
-        self.set_driver(driver)
-        self.get_driver().execute_script(
-            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-        )
-        self.set_url("https://www.chegg.com/chat")
+        self.set_url(self.get_base_url() + "/chat")
+        self.acquire_request_token()
         self.get_driver().get(self.get_url())
+        self.record_page()
         element = None
         try:
-            element = WebDriverWait(self.get_driver(), 25).until(
-                EC.presence_of_element_located((By.XPATH, "//div[@id='editor01-']"))
+            element = self.wait_until(
+                EC.presence_of_element_located((By.XPATH, "//div[@id='editor01-']")), 25
             )
             print(f"New Site Found Reattempting for old site for assignment {assignment_id}\n")
         except TimeoutException as e:
             print(f"New Site not found for assignment {assignment_id}\n")
             logger.error(f"New Site not found for assignment {assignment_id}\n {e}")
-            # self.get_driver().quit()
         return False
         # Due to the nature of Docker not using a desktop environment we cannot use copy paste
         # Functionality. A different solution for running Chrome would be required for this to be viable
@@ -320,5 +471,114 @@ class Chegg_Scraper(Scraper):
     #         current_url,
     #     )
 
+    # Scores every scraped search result against the assignment in one batch and builds the scan results.
+    def build_scan_results(self, search_results, assignment_id):
+        # Keep the scraped texts for the background corpus of the IDF model
+        archive_texts([search_result["text"] for search_result in search_results])
+        texts = [search_result["text"] for search_result in search_results]
+        fingerprint = self.get_fingerprint(assignment_id)
+        text_similarity_scores = self.calc_fingerprint_similarity_batch(fingerprint, texts)
+        # A long assignment is also scored window by window, and each result keeps its best score.
+        # Results rejected by the MinHash pre-filter share no passage with the assignment and are skipped.
+        if PASSAGE_MODE and len(texts) > 0 and fingerprint.counts.sum() > PASSAGE_WINDOW_WORDS:
+            passage_scores, passage_offsets = self.calc_prefiltered_passage_similarity_batch(
+                fingerprint, texts, self.__keywords
+            )
+            for idx, (passage_score, passage_offset) in enumerate(zip(passage_scores, passage_offsets)):
+                if passage_score > text_similarity_scores[idx]:
+                    logger.info(
+                        "Best passage for assignment %s starts at character %s - %s",
+                        assignment_id,
+                        passage_offset,
+                        search_results[idx]["url"],
+                    )
+                    text_similarity_scores[idx] = passage_score
+        text_similarity_scores = text_similarity_scores * 100
+        scan_results = []
+        for search_result, text_similarity_score in zip(search_results, text_similarity_scores):
+            # Construct scan result dictionary
+            scan_result_data = {
+                "confidenceProbability": float(text_similarity_score),
+                "url": search_result["url"],
+                "scanTime": int(datetime.datetime.now().timestamp()),
+                "assignmentId": assignment_id,
+            }
+            # Append to scan results list
+            scan_results.append(scan_result_data)
+            logger.info(
+                "Found a match for assignment %s - %s",
+                assignment_id,
+                search_result["url"],
+            )
+        if CROSS_ASSIGNMENT_SCORING:
+            scan_results.extend(self.build_cross_scan_results(search_results, assignment_id))
+        return scan_results
+
+    # Scores the scraped search results and posts the scan results. Scoring runs on the scoring workers
+    # when they are deployed, so this worker can move on to its next scrape. Collected scrapes keep them instead.
+    def submit_search_results(self, search_results, assignment_id):
+        if self.__collected is not None:
+            self.__collected.extend(search_results)
+        elif SCORING_MODE == "queue":
+            celery.send_task(
+                "Tasks.score_Chegg",
+                args=(assignment_id, self.__keywords, self.__text_to_search, search_results),
+                queue=SCORING_QUEUE,
+            )
+        else:
+            self.post_scan_results(self.build_scan_results(search_results, assignment_id))
+
+    # Posts scan results to the scan results endpoint, logging any error. Results of other assignments found by
+    # cross-assignment scoring are posted in their own batch, one per assignment, as each batch notifies one instructor.
+    def post_scan_results(self, scan_results):
+        batches: Dict[int, List[Dict]] = {}
+        for scan_result in scan_results:
+            batches.setdefault(scan_result["assignmentId"], []).append(scan_result)
+        headers={'Content-type':'application/json', 'Accept': 'text/plain'}
+        for assignment_id, batch in batches.items():
+            try:
+                requests.post(
+                    RESULTS_API_URL,
+                    data=json.dumps(batch),
+                    headers=headers,
+                )
+            except requests.exceptions.RequestException as e:
+                logger.error("Error posting scan results of assignment %s to API: %s", assignment_id, e)
+
+    # Scores the scraped search results against every other active assignment, so a page fetched for one
+    # assignment is also reported for any other assignment it matches (e.g. a reused assignment).
+    def build_cross_scan_results(self, search_results, assignment_id):
+        cross_scan_results = []
+        try:
+            cross_scores = self.calc_active_assignments_similarity(
+                [search_result["text"] for search_result in search_results]
+            )
+        except Exception as e:
+            logger.error("Error scoring against active assignments for assignment %s: %s", assignment_id, e)
+            return cross_scan_results
+        if cross_scores is None:
+            return cross_scan_results
+        assignment_ids, scores = cross_scores
+        rows, columns = np.nonzero(scores * 100 >= CROSS_MATCH_MIN_CONFIDENCE)
+        for row, column in zip(rows, columns):
+            # The assignment being scanned already has its own results
+            if assignment_ids[row] == str(assignment_id):
+                continue
+            cross_scan_results.append(
+                {
+                    "confidenceProbability": float(scores[row, column] * 100),
+                    "url": search_results[column]["url"],
+                    "scanTime": int(datetime.datetime.now().timestamp()),
+                    "assignmentId": int(assignment_ids[row]),
+                }
+            )
+            logger.info(
+                "Found a match for assignment %s while scanning assignment %s - %s",
+                assignment_ids[row],
+                assignment_id,
+                search_results[column]["url"],
+            )
+        return cross_scan_results
+
     def url_builder(self, search_query: str):
-        return "https://www.chegg.com/search?q=" + search_query
+        return self.get_base_url() + "/search?q=" + quote_plus(search_query)
@@ -0,0 +1,178 @@
+from typing import Dict
+
+import redis
+
+from config import (
+    CIRCUIT_FAILURE_RATE,
+    CIRCUIT_MIN_ATTEMPTS,
+    CIRCUIT_OPEN_SECONDS,
+    CIRCUIT_PROBE_TIMEOUT,
+    CIRCUIT_WINDOW,
+)
+from extensions import redis_cache, logger
+
+# Got help from:
+# https://martinfowler.com/bliki/CircuitBreaker.html
+# https://redis.io/commands/set/ (NX and EX options)
+
+# Redis key prefix of the circuits
+CIRCUIT_PREFIX = "circuit:"
+# Redis key suffixes of the attempt and failure counters of the current window, of an open circuit,
+# of a circuit waiting to be probed once open, and of the probe in flight
+OUTCOMES_SUFFIX = ":outcomes"
+OPEN_SUFFIX = ":open"
+HALF_OPEN_SUFFIX = ":half_open"
+PROBE_SUFFIX = ":probe"
+# States of a circuit
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+# Circuit breaker shared by every scraper worker through Redis, keyed by name (e.g. a platform).
+# While closed, scans run and their outcomes are counted over a window. Once enough of them were blocked,
+# the circuit opens and scans are deferred without starting a browser, for open_seconds. The circuit then
+# half-opens: a single probe scan is let through, which closes the circuit when it succeeds or opens it again
+# when it is blocked. A probe that never reports back is replaced after probe_timeout seconds.
+class CircuitBreaker:
+    # Redis instance storing the circuits
+    __store: redis.StrictRedis
+    # Share of blocked scans in a window that opens the circuit
+    __failure_rate: float
+    # Scans counted in a window before the circuit may open
+    __min_attempts: int
+    # Length in seconds of the window scans are counted over
+    __window: int
+    # Seconds the circuit stays open before it is probed
+    __open_seconds: int
+    # Seconds a probe scan may take before another one is let through
+    __probe_timeout: int
+
+    def __init__(
+        self,
+        store: redis.StrictRedis,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        min_attempts: int = CIRCUIT_MIN_ATTEMPTS,
+        window: int = CIRCUIT_WINDOW,
+        open_seconds: int = CIRCUIT_OPEN_SECONDS,
+        probe_timeout: int = CIRCUIT_PROBE_TIMEOUT,
+    ):
+        self.__store = store
+        self.__failure_rate = failure_rate
+        self.__min_attempts = min_attempts
+        self.__window = window
+        self.__open_seconds = open_seconds
+        self.__probe_timeout = probe_timeout
+
+    # Checks whether a scan may run: always while closed, never while open, and only as the single probe
+    # while half-open. The circuit is an optimization only, so Redis errors let scans run.
+    def allow(self, name: str) -> bool:
+        try:
+            if self.__store.exists(self.__key(name, OPEN_SUFFIX)):
+                return False
+            if self.__store.exists(self.__key(name, HALF_OPEN_SUFFIX)):
+                return bool(self.__store.set(self.__key(name, PROBE_SUFFIX), 1, nx=True, ex=self.__probe_timeout))
+            return True
+        except redis.exceptions.RedisError as e:
+            logger.error("Error reading circuit %s: %s", name, e)
+            return True
+
+    # Checks whether a circuit is open, without claiming the probe of a half-open circuit. Used by the parts of a scan
+    # that was already let through, such as its shards. Redis errors count as closed.
+    def is_open(self, name: str) -> bool:
+        try:
+            return bool(self.__store.exists(self.__key(name, OPEN_SUFFIX)))
+        except redis.exceptions.RedisError as e:
+            logger.error("Error reading circuit %s: %s", name, e)
+            return False
+
+    # Gets the seconds until a deferred scan may be let through: until the circuit half-opens, or until the
+    # probe in flight times out.
+    def retry_after(self, name: str) -> int:
+        try:
+            for suffix in (OPEN_SUFFIX, PROBE_SUFFIX):
+                ttl = self.__store.ttl(self.__key(name, suffix))
+                if ttl is not None and ttl > 0:
+                    return ttl
+        except redis.exceptions.RedisError as e:
+            logger.error("Error reading circuit %s: %s", name, e)
+        return 0
+
+    # Records a scan that went through, closing the circuit when it was the probe.
+    def record_success(self, name: str):
+        try:
+            if self.__store.exists(self.__key(name, HALF_OPEN_SUFFIX)):
+                logger.info("Closing circuit %s after a successful probe", name)
+                self.__store.delete(
+                    self.__key(name, HALF_OPEN_SUFFIX), self.__key(name, PROBE_SUFFIX), self.__key(name, OUTCOMES_SUFFIX)
+                )
+                return
+            self.__count(name, failed=False)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error recording success of circuit %s: %s", name, e)
+
+    # Records a blocked scan, opening the circuit when it was the probe or when too many scans of the window were blocked.
+    def record_failure(self, name: str):
+        try:
+            if self.__store.exists(self.__key(name, HALF_OPEN_SUFFIX)):
+                logger.info("Reopening circuit %s after a blocked probe", name)
+                self.__open(name)
+                return
+            attempts, failures = self.__count(name, failed=True)
+            if attempts >= self.__min_attempts and failures / attempts >= self.__failure_rate:
+                logger.info("Opening circuit %s after %s blocked scans out of %s", name, failures, attempts)
+                self.__open(name)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error recording failure of circuit %s: %s", name, e)
+
+    # Releases the probe of a half-open circuit when a scan ends without an outcome that tells whether the site is
+    # still blocking (e.g. it was rate limited or the layout changed), so another scan probes right away.
+    def release_probe(self, name: str):
+        try:
+            self.__store.delete(self.__key(name, PROBE_SUFFIX))
+        except redis.exceptions.RedisError as e:
+            logger.error("Error releasing probe of circuit %s: %s", name, e)
+
+    # Gets the state of a circuit and the counters of its window, for logging.
+    def info(self, name: str) -> Dict:
+        try:
+            outcomes = self.__store.hgetall(self.__key(name, OUTCOMES_SUFFIX))
+            if self.__store.exists(self.__key(name, OPEN_SUFFIX)):
+                state = OPEN
+            elif self.__store.exists(self.__key(name, HALF_OPEN_SUFFIX)):
+                state = HALF_OPEN
+            else:
+                state = CLOSED
+        except redis.exceptions.RedisError as e:
+            logger.error("Error reading circuit %s: %s", name, e)
+            return {}
+        return {
+            "state": state,
+            "attempts": int(outcomes.get("attempts", 0)),
+            "failures": int(outcomes.get("failures", 0)),
+            "retryAfter": self.retry_after(name),
+        }
+
+    # Counts a scan in the current window, which starts with its first scan, and returns the counters.
+    def __count(self, name: str, failed: bool):
+        key = self.__key(name, OUTCOMES_SUFFIX)
+        attempts = self.__store.hincrby(key, "attempts", 1)
+        if attempts == 1:
+            self.__store.expire(key, self.__window)
+        failures = self.__store.hincrby(key, "failures", 1 if failed else 0)
+        return attempts, failures
+
+    # Opens a circuit for open_seconds, after which it half-opens. The half-open marker outlives the open period
+    # long enough for a probe to report back.
+    def __open(self, name: str):
+        self.__store.set(self.__key(name, OPEN_SUFFIX), 1, ex=self.__open_seconds)
+        self.__store.set(self.__key(name, HALF_OPEN_SUFFIX), 1, ex=self.__open_seconds + self.__window + self.__probe_timeout)
+        self.__store.delete(self.__key(name, PROBE_SUFFIX), self.__key(name, OUTCOMES_SUFFIX))
+
+    @staticmethod
+    def __key(name: str, suffix: str) -> str:
+        return CIRCUIT_PREFIX + name + suffix
+
+
+# Circuit breaker instance shared by the scrapers
+circuit_breaker = CircuitBreaker(redis_cache)
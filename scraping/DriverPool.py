@@ -0,0 +1,272 @@
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from celery.signals import worker_process_shutdown
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from BrowserWatchdog import driver_pid, kill_orphaned_browsers, kill_process_tree, process_tree_rss
+from config import CHEGG_BASE_URL, DRIVER_MAX_PAGES, DRIVER_MAX_RSS_MB, DRIVER_POOL_SIZE
+from extensions import logger
+
+# Got help from:
+# https://chromedevtools.github.io/devtools-protocol/tot/Network/#method-clearBrowserCookies
+# https://chromedevtools.github.io/devtools-protocol/tot/Storage/#method-clearDataForOrigin
+# https://chromedevtools.github.io/devtools-protocol/tot/Page/#method-addScriptToEvaluateOnNewDocument
+# https://docs.celeryq.dev/en/stable/userguide/signals.html#worker-process-shutdown
+
+# Hides the webdriver automation flag. Registered once per browser, it runs before every page's own scripts.
+HIDE_WEBDRIVER_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+
+# Gets the origin of a web page URL (e.g. https://www.chegg.com), or None for other URLs such as about:blank.
+def origin_of(url: str) -> Optional[str]:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+# Identifies drivers started with the same options, which are interchangeable between leases.
+def options_key(options: Options) -> Tuple:
+    return tuple(options.arguments), repr(sorted(options.experimental_options.items()))
+
+
+# Gets the proxy server of the drivers started with the options of a key, or None when they connect directly.
+def proxy_server_of(key: Tuple) -> Optional[str]:
+    arguments, _ = key
+    return next((argument.split("=", 1)[1] for argument in arguments if argument.startswith("--proxy-server=")), None)
+
+
+# Starts a Chrome driver with the given options and hides its automation flag.
+def start_chrome(options: Options) -> webdriver.Chrome:
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": HIDE_WEBDRIVER_SCRIPT})
+    return driver
+
+
+# Gets the resident memory of a driver's chromedriver and browser processes in bytes.
+def driver_rss(driver) -> int:
+    pid = driver_pid(driver)
+    return process_tree_rss(pid) if pid is not None else 0
+
+
+# Pool of warm Chrome drivers shared by every scrape of a worker process.
+# Starting Chrome costs seconds, so drivers are kept between scrapes and handed out one lease at a time.
+# Every lease starts from a clean session: cookies, storage and caches of the previous lease are wiped
+# when the driver comes back. Chrome only clears storage origin by origin, so the storage of the scraped sites
+# (origins) and of every page still open when the driver comes back is cleared. Drivers that fail to reset are quit, and every driver is quit on shutdown.
+# Long-lived browsers grow, so a driver is also recycled (quit and replaced on the next lease) once it has
+# loaded max_pages pages or its processes use more than max_rss bytes, and orphaned browsers are killed.
+class DriverPool:
+    # Maximum number of drivers alive at once
+    __size: int
+    # Starts a new driver from driver options
+    __driver_factory: Callable
+    # Idle drivers, keyed by the options they were started with
+    __idle: Dict[Tuple, List]
+    # Every driver alive, leased or idle
+    __drivers: List
+    # Number of pages each alive driver loaded
+    __pages: Dict
+    # Number of pages after which a driver is recycled
+    __max_pages: int
+    # Resident memory in bytes above which a driver is recycled
+    __max_rss: int
+    # Gets the resident memory of a driver
+    __rss_of: Callable
+    # Kills orphaned browser processes other than those of the given chromedriver process IDs, returning how many were killed
+    __sweep: Callable
+    # Origins whose storage is cleared between leases
+    __origins: List[str]
+    # Number of drivers recycled for their page count or memory
+    __recycled: int
+    # Number of orphaned browser processes killed
+    __orphans_killed: int
+    # Limits the number of drivers alive to the pool size
+    __slots: threading.BoundedSemaphore
+    # Guards the idle and alive drivers
+    __lock: threading.Lock
+
+    def __init__(
+        self,
+        size: int,
+        driver_factory: Callable = start_chrome,
+        max_pages: int = DRIVER_MAX_PAGES,
+        max_rss: int = DRIVER_MAX_RSS_MB * 1024 * 1024,
+        rss_of: Callable = driver_rss,
+        sweep: Callable = kill_orphaned_browsers,
+        origins: List[str] = (CHEGG_BASE_URL,),
+    ):
+        self.__size = size
+        self.__driver_factory = driver_factory
+        self.__idle = {}
+        self.__drivers = []
+        self.__pages = {}
+        self.__max_pages = max_pages
+        self.__max_rss = max_rss
+        self.__rss_of = rss_of
+        self.__sweep = sweep
+        self.__origins = [origin_of(url) for url in origins if origin_of(url)]
+        self.__recycled = 0
+        self.__orphans_killed = 0
+        self.__slots = threading.BoundedSemaphore(size)
+        self.__lock = threading.Lock()
+
+    # Leases a driver started with the given options for the duration of a with block, e.g.
+    # with driver_pool.lease(options) as driver: ...
+    # Blocks while every driver of the pool is leased.
+    @contextmanager
+    def lease(self, options: Options):
+        key = options_key(options)
+        self.__slots.acquire()
+        try:
+            driver = self.__take_idle(key)
+            if driver is None:
+                driver = self.__driver_factory(options)
+                with self.__lock:
+                    self.__drivers.append(driver)
+                    self.__pages[driver] = 0
+            try:
+                yield driver
+            finally:
+                self.__release(key, driver)
+        finally:
+            self.__slots.release()
+
+    # Gets an idle driver started with the given options. When only drivers with other options are idle,
+    # one of them is quit so the pool stays within its size.
+    def __take_idle(self, key: Tuple):
+        with self.__lock:
+            if self.__idle.get(key):
+                return self.__idle[key].pop()
+            stale = None
+            if len(self.__drivers) >= self.__size:
+                stale = next((drivers.pop() for drivers in self.__idle.values() if drivers), None)
+        if stale is not None:
+            self.__discard(stale)
+        return None
+
+    # Gets the proxy servers of the idle drivers (None for direct connections), so scrapes can lease a proxy a warm
+    # driver was started with rather than quit it and start a cold one.
+    def idle_proxy_servers(self) -> List[Optional[str]]:
+        with self.__lock:
+            return [proxy_server_of(key) for key, drivers in self.__idle.items() if drivers]
+
+    # Counts a page loaded by a leased driver (a navigation, a clicked link or a new tab).
+    def record_page(self, driver, count: int = 1):
+        with self.__lock:
+            if driver in self.__pages:
+                self.__pages[driver] += count
+
+    # Wipes the session of a returned driver and makes it idle, or quits it when the reset fails
+    # or the driver is due for recycling.
+    def __release(self, key: Tuple, driver):
+        if self.__needs_recycling(driver):
+            self.__discard(driver)
+            with self.__lock:
+                self.__recycled += 1
+            self.sweep()
+            return
+        try:
+            self.reset(driver)
+        except WebDriverException as e:
+            logger.error("Discarding Chrome driver that failed to reset: %s", e)
+            self.__discard(driver)
+            return
+        with self.__lock:
+            self.__idle.setdefault(key, []).append(driver)
+
+    # Clears cookies, storage and caches and leaves the driver on a blank page with a single window.
+    # The storage (local storage, IndexedDB, service workers...) of the pool's origins and of every open page is cleared.
+    def reset(self, driver):
+        origins = list(self.__origins)
+        for handle in reversed(driver.window_handles):
+            driver.switch_to.window(handle)
+            origins.append(origin_of(driver.current_url))
+            if handle != driver.window_handles[0]:
+                driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in dict.fromkeys(origin for origin in origins if origin is not None):
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+    # Checks whether a driver loaded too many pages or uses too much memory to be kept.
+    def __needs_recycling(self, driver) -> bool:
+        with self.__lock:
+            pages = self.__pages.get(driver, 0)
+        if pages >= self.__max_pages:
+            logger.info("Recycling Chrome driver after %s pages", pages)
+            return True
+        rss = self.__rss_of(driver)
+        if rss > self.__max_rss:
+            logger.info("Recycling Chrome driver using %s MB after %s pages", rss // (1024 * 1024), pages)
+            return True
+        return False
+
+    # Quits a driver and forgets it. A driver that fails to quit has its processes killed.
+    def __discard(self, driver):
+        with self.__lock:
+            if driver in self.__drivers:
+                self.__drivers.remove(driver)
+            self.__pages.pop(driver, None)
+        pid = driver_pid(driver)
+        try:
+            driver.quit()
+        except WebDriverException as e:
+            logger.error("Error quitting Chrome driver: %s", e)
+            if pid is not None:
+                kill_process_tree(pid)
+
+    # Kills orphaned browser processes of the worker, sparing the processes of its live drivers.
+    def sweep(self):
+        with self.__lock:
+            live_pids = [driver_pid(driver) for driver in self.__drivers]
+        killed = self.__sweep([pid for pid in live_pids if pid is not None])
+        with self.__lock:
+            self.__orphans_killed += killed
+
+    # Quits every driver of the pool.
+    def shutdown(self):
+        with self.__lock:
+            drivers = list(self.__drivers)
+            self.__idle.clear()
+        for driver in drivers:
+            self.__discard(driver)
+        self.sweep()
+
+    # Gets the number of drivers alive and idle, the pages and memory of the alive drivers,
+    # and the number of drivers recycled and orphaned browser processes killed so far.
+    def info(self):
+        with self.__lock:
+            drivers = list(self.__drivers)
+            info = {
+                "alive": len(drivers),
+                "idle": sum(len(idle) for idle in self.__idle.values()),
+                "size": self.__size,
+                "pages": sum(self.__pages.values()),
+                "recycled": self.__recycled,
+                "orphansKilled": self.__orphans_killed,
+            }
+        info["rssMB"] = sum(self.__rss_of(driver) for driver in drivers) // (1024 * 1024)
+        return info
+
+
+# Driver pool of this worker process
+driver_pool = DriverPool(DRIVER_POOL_SIZE)
+
+
+# Quits the drivers of a worker process when Celery stops it
+@worker_process_shutdown.connect
+def shutdown_driver_pool(**kwargs):
+    driver_pool.shutdown()
+
+
+# Also quits them when a process exits without Celery, e.g. the scheduler or a script
+atexit.register(driver_pool.shutdown)
@@ -0,0 +1,73 @@
+import json
+from typing import List, Optional
+
+import redis
+
+from config import FINGERPRINT_CACHE_TTL
+from extensions import redis_cache, logger
+from Similarity import AssignmentFingerprint, fingerprint_key
+
+# Redis key prefix of cached fingerprints, keyed by the hash of the assignment text and key phrases
+FINGERPRINT_PREFIX = "fingerprint:"
+# Redis key prefix mapping an assignment ID to the hash of its current fingerprint
+ASSIGNMENT_PREFIX = "fingerprint:assignment:"
+
+
+# Cache of assignment fingerprints shared by every scraper worker through Redis.
+# Fingerprints are keyed by a hash of the assignment text and key phrases, so an edited assignment
+# never reads a stale fingerprint. The cache also remembers which fingerprint each assignment uses
+# so the old entry can be dropped as soon as the assignment text changes. Fingerprints of only part of an
+# assignment (e.g. one question of a sharded scan) are not tracked, so they never evict the fingerprint of the
+# whole assignment, and expire on their own.
+class FingerprintCache:
+    # Redis instance storing the fingerprints
+    __store: redis.StrictRedis
+    # Time in seconds a fingerprint is kept after it was last computed
+    __ttl: int
+
+    def __init__(self, store: redis.StrictRedis, ttl: int):
+        self.__store = store
+        self.__ttl = ttl
+
+    # Gets the fingerprint of an assignment, computing and caching it on a miss. track is False when the text is
+    # only part of the assignment, so the fingerprint does not become the one of the assignment.
+    # The cache is an optimization only, so Redis errors fall back to computing the fingerprint.
+    def get(self, assignment_id, text: str, keywords: Optional[List[str]], track: bool = True) -> AssignmentFingerprint:
+        key = fingerprint_key(text, keywords)
+        try:
+            cached = self.__store.get(FINGERPRINT_PREFIX + key)
+            if cached:
+                return AssignmentFingerprint.from_dict(json.loads(cached))
+        except redis.exceptions.RedisError as e:
+            logger.error("Error reading fingerprint for assignment %s: %s", assignment_id, e)
+            return AssignmentFingerprint.from_text(text, keywords)
+
+        fingerprint = AssignmentFingerprint.from_text(text, keywords)
+        try:
+            self.__store.set(
+                FINGERPRINT_PREFIX + key, json.dumps(fingerprint.to_dict()), ex=self.__ttl
+            )
+            if not track:
+                return fingerprint
+            # Point the assignment at its new fingerprint and drop the one for its previous text
+            previous_key = self.__store.getset(ASSIGNMENT_PREFIX + str(assignment_id), key)
+            self.__store.expire(ASSIGNMENT_PREFIX + str(assignment_id), self.__ttl)
+            if previous_key and previous_key != key:
+                self.__store.delete(FINGERPRINT_PREFIX + previous_key)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error caching fingerprint for assignment %s: %s", assignment_id, e)
+        return fingerprint
+
+    # Drops the cached fingerprint of an assignment, e.g. when its text changes or its scan is removed.
+    def invalidate(self, assignment_id):
+        try:
+            key = self.__store.get(ASSIGNMENT_PREFIX + str(assignment_id))
+            if key:
+                self.__store.delete(FINGERPRINT_PREFIX + key)
+            self.__store.delete(ASSIGNMENT_PREFIX + str(assignment_id))
+        except redis.exceptions.RedisError as e:
+            logger.error("Error invalidating fingerprint for assignment %s: %s", assignment_id, e)
+
+
+# Fingerprint cache instance shared by the scrapers and the task scheduler
+fingerprint_cache = FingerprintCache(redis_cache, FINGERPRINT_CACHE_TTL)
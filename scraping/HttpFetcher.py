@@ -0,0 +1,73 @@
+from typing import Dict, Optional
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_POOL_SIZE, HTTP_TIMEOUT
+
+# Got help from:
+# https://requests.readthedocs.io/en/latest/user/advanced/#session-objects
+# https://requests.readthedocs.io/en/latest/api/#requests.adapters.HTTPAdapter
+# https://lxml.de/lxmlhtml.html#parsing-html
+
+# Status codes bot protection answers with instead of the page
+BLOCKED_STATUS_CODES = (403, 429, 503)
+# Text found on bot protection challenge pages (captcha, "press and hold", access denied)
+BLOCKED_MARKERS = (
+    "px-captcha",
+    "captcha-delivery",
+    "cf-challenge",
+    "Access to this page has been denied",
+    "Please verify you are a human",
+)
+
+
+# Raised when a page was answered with a bot protection challenge instead of its content
+class FetchBlocked(Exception):
+    pass
+
+
+# Fetches pages over plain HTTP with a pool of keep-alive connections and parses them with lxml.
+# Costs tens of milliseconds of network I/O per page instead of seconds of browser time, but only
+# sees the HTML the server sends, so pages rendered by scripts need the browser.
+class HttpFetcher:
+    # Session keeping connections and cookies between requests
+    __session: requests.Session
+    # Seconds to wait for a response
+    __timeout: float
+
+    def __init__(self, user_agent: str, proxies: Optional[Dict[str, str]] = None, pool_size: int = HTTP_POOL_SIZE, timeout: float = HTTP_TIMEOUT):
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+        self.__session.headers.update(
+            {
+                "User-Agent": user_agent,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+            }
+        )
+        if proxies:
+            self.__session.proxies.update(proxies)
+        self.__timeout = timeout
+
+    # Fetches a page and parses it, raising FetchBlocked for bot protection challenges and
+    # requests.exceptions.RequestException for network and HTTP errors.
+    def fetch(self, url: str) -> lxml.html.HtmlElement:
+        response = self.__session.get(url, timeout=self.__timeout)
+        if response.status_code in BLOCKED_STATUS_CODES or any(
+            marker in response.text for marker in BLOCKED_MARKERS
+        ):
+            raise FetchBlocked(f"{response.status_code} from {url}")
+        response.raise_for_status()
+        return lxml.html.document_fromstring(response.content, base_url=response.url)
+
+    # Drops the cookies of previous requests, so scans do not share a session with the site.
+    def clear_cookies(self):
+        self.__session.cookies.clear()
+
+    # Closes every pooled connection.
+    def close(self):
+        self.__session.close()
@@ -0,0 +1,192 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from AssignmentRegistry import read_scheduled_assignments
+from config import IDF_MODEL_PATH, SCRAPED_CORPUS_PATH
+from Similarity import tokenize
+
+# Got help from:
+# https://scikit-learn.org/stable/modules/feature_extraction.html#tfidf-term-weighting
+# https://numpy.org/doc/stable/reference/generated/numpy.load.html (mmap_mode)
+
+# File names of the artifact files inside a model version directory
+TERMS_FILE = "terms.npy"
+IDF_FILE = "idf.npy"
+META_FILE = "meta.json"
+# Directory holding one directory per saved model version, inside a model directory
+VERSIONS_DIR = "versions"
+# Symlink to the version directory of the current model, inside a model directory
+CURRENT_LINK = "current"
+# Number of versions kept on disk, the current one included, so recent loaders can still open theirs
+KEPT_VERSIONS = 3
+# Terms longer than this are left out of the vocabulary, which keeps the fixed-width term array compact
+MAX_TERM_LENGTH = 32
+
+
+# Vocabulary and IDF table fitted on a background corpus and loaded as read-only memory-mapped arrays,
+# so every worker process on a machine shares a single copy through the OS page cache.
+# IDF follows TfidfVectorizer(smooth_idf=True): ln((1 + n) / (1 + df)) + 1. Terms missing from the
+# vocabulary are weighted as if they never appeared in the corpus, since an assignment-specific term
+# that was never seen before is the strongest signal there is.
+class IdfModel:
+    # Sorted vocabulary
+    __terms: np.ndarray
+    # IDF of each vocabulary term
+    __idf: np.ndarray
+    # IDF given to terms missing from the vocabulary
+    __unseen_idf: float
+
+    def __init__(self, terms: np.ndarray, idf: np.ndarray, num_documents: int):
+        self.__terms = terms
+        self.__idf = idf
+        self.__unseen_idf = math.log(1 + num_documents) + 1
+
+    # Loads the current model of a directory written by save_model, memory-mapping its arrays.
+    # The current link is resolved once, so all files come from the same version even if it is switched meanwhile.
+    @classmethod
+    def load(cls, directory: str):
+        directory = os.path.realpath(os.path.join(directory, CURRENT_LINK))
+        with open(os.path.join(directory, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        return cls(
+            np.load(os.path.join(directory, TERMS_FILE), mmap_mode="r"),
+            np.load(os.path.join(directory, IDF_FILE), mmap_mode="r"),
+            meta["documents"],
+        )
+
+    # Gets the IDF of each term.
+    def lookup(self, terms: List[str]) -> np.ndarray:
+        idf = np.full(len(terms), self.__unseen_idf)
+        if len(terms) == 0 or len(self.__terms) == 0:
+            return idf
+        # Longer terms would be truncated by the fixed-width conversion, and are never in the vocabulary
+        fits = np.fromiter((len(term) <= MAX_TERM_LENGTH for term in terms), dtype=bool, count=len(terms))
+        queries = np.asarray(terms, dtype=self.__terms.dtype)
+        positions = np.minimum(np.searchsorted(self.__terms, queries), len(self.__terms) - 1)
+        found = fits & (self.__terms[positions] == queries)
+        idf[found] = self.__idf[positions[found]]
+        return idf
+
+    def __len__(self):
+        return len(self.__terms)
+
+
+# Fits a vocabulary and IDF table on a corpus, ignoring terms found in fewer than min_df documents.
+def fit_idf(documents: Iterable[str], min_df: int = 1):
+    document_frequency = Counter()
+    num_documents = 0
+    for document in documents:
+        num_documents += 1
+        document_frequency.update(
+            term for term in set(tokenize(document)) if len(term) <= MAX_TERM_LENGTH
+        )
+    terms = sorted(term for term, df in document_frequency.items() if df >= min_df)
+    df = np.fromiter((document_frequency[term] for term in terms), dtype=np.float64, count=len(terms))
+    idf = np.log((1 + num_documents) / (1 + df)) + 1
+    return np.asarray(terms, dtype=f"<U{MAX_TERM_LENGTH}"), idf.astype(np.float32), num_documents
+
+
+# Writes a fitted model into a new version directory and switches the current link to it with a single
+# rename, so a loader sees either the old or the new model and never a mix of both. Processes that already
+# memory-mapped an older version keep reading it, and only versions older than the last few are removed.
+def save_model(directory: str, terms: np.ndarray, idf: np.ndarray, num_documents: int):
+    versions = os.path.join(directory, VERSIONS_DIR)
+    os.makedirs(versions, exist_ok=True)
+    # Named after the save time so versions sort oldest first
+    version = f"{time.time_ns()}-{os.getpid()}"
+    version_directory = os.path.join(versions, version)
+    os.makedirs(version_directory)
+    for file_name, array in ((TERMS_FILE, terms), (IDF_FILE, idf)):
+        with open(os.path.join(version_directory, file_name), "wb") as array_file:
+            np.save(array_file, array)
+    with open(os.path.join(version_directory, META_FILE), "w") as meta_file:
+        json.dump({"documents": num_documents, "terms": len(terms)}, meta_file)
+
+    link = os.path.join(directory, CURRENT_LINK)
+    os.symlink(os.path.join(VERSIONS_DIR, version), f"{link}.{version}.tmp")
+    os.replace(f"{link}.{version}.tmp", link)
+
+    for old_version in sorted(os.listdir(versions))[:-KEPT_VERSIONS]:
+        if old_version != version:
+            shutil.rmtree(os.path.join(versions, old_version), ignore_errors=True)
+
+
+# Model used by every scorer in this process, loaded from IDF_MODEL_PATH on first use and again once it is switched
+_model: Optional[IdfModel] = None
+# Target of the current link the model was loaded from, None when there was no model
+_model_version: Optional[str] = None
+
+
+# Gets the IDF model configured for this process, or None when scores use a two-document IDF fit.
+# The current link is read on every call (a single readlink), so a model saved by save_model is picked up
+# by running workers without restarting them.
+def get_idf_model() -> Optional[IdfModel]:
+    global _model, _model_version
+    if not IDF_MODEL_PATH:
+        return None
+    try:
+        version = os.readlink(os.path.join(IDF_MODEL_PATH, CURRENT_LINK))
+    except OSError:
+        version = None
+    if version != _model_version:
+        try:
+            _model = IdfModel.load(IDF_MODEL_PATH) if version is not None else None
+            _model_version = version
+        except OSError:
+            # The version was removed right after the link was read, the next call loads the new one
+            pass
+    return _model
+
+
+# Appends scraped texts to the background corpus file, when one is configured.
+def archive_texts(texts: List[str]):
+    if not SCRAPED_CORPUS_PATH:
+        return
+    with open(SCRAPED_CORPUS_PATH, "a") as corpus_file:
+        for text in texts:
+            corpus_file.write(json.dumps({"text": text}) + "\n")
+
+
+# Reads every document of a corpus file: one JSON object with a "text" field per line, or plain text.
+def read_corpus_file(path: str) -> Iterator[str]:
+    with open(path) as corpus_file:
+        if not path.endswith(".jsonl"):
+            yield corpus_file.read()
+            return
+        for line in corpus_file:
+            if line.strip():
+                yield json.loads(line)["text"]
+
+
+# Offline command fitting a model on stored assignments and scraped texts, e.g.
+# python IdfModel.py models/idf --corpus log/scraped_texts.jsonl --scheduled-assignments
+def main():
+    parser = argparse.ArgumentParser(description="Fit the IDF model used for similarity scoring.")
+    parser.add_argument("output", help="Directory to write the model to")
+    parser.add_argument("--corpus", action="append", default=[], help="Corpus file (.jsonl or plain text), repeatable")
+    parser.add_argument("--scheduled-assignments", action="store_true", help="Include the text of every scheduled scan")
+    parser.add_argument("--min-df", type=int, default=1, help="Minimum number of documents a term must appear in")
+    args = parser.parse_args()
+
+    def documents():
+        for path in args.corpus:
+            yield from read_corpus_file(path)
+        if args.scheduled_assignments:
+            for _, text_to_search in read_scheduled_assignments().values():
+                yield text_to_search
+
+    terms, idf, num_documents = fit_idf(documents(), args.min_df)
+    save_model(args.output, terms, idf, num_documents)
+    print(f"Fitted {len(terms)} terms on {num_documents} documents into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
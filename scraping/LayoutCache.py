@@ -0,0 +1,68 @@
+from typing import Optional
+
+import redis
+
+from config import LAYOUT_CACHE_TTL, LAYOUT_REPROBE_FAILURES
+from extensions import redis_cache, logger
+
+# Redis key prefix of the layout each platform currently serves
+LAYOUT_PREFIX = "layout:"
+# Redis key suffix of the number of scrapes that failed with the remembered layout
+FAILURES_SUFFIX = ":failures"
+
+
+# Cache of the page layout each platform currently serves, shared by every scraper worker through Redis.
+# Probing a layout that is not served costs a browser wait of up to 25 seconds, so once a layout works
+# every worker goes straight to it. The layout is probed again when its entry expires, or once
+# max_failures scrapes in a row failed with it (e.g. the platform rolled out a new layout).
+class LayoutCache:
+    # Redis instance storing the layouts
+    __store: redis.StrictRedis
+    # Time in seconds a layout is remembered before it is probed again
+    __ttl: int
+    # Number of failed scrapes in a row after which a layout is forgotten
+    __max_failures: int
+
+    def __init__(self, store: redis.StrictRedis, ttl: int, max_failures: int):
+        self.__store = store
+        self.__ttl = ttl
+        self.__max_failures = max_failures
+
+    # Gets the layout currently served by a platform, or None when it has to be probed.
+    # The cache is an optimization only, so Redis errors fall back to probing.
+    def get(self, platform: str) -> Optional[str]:
+        try:
+            return self.__store.get(LAYOUT_PREFIX + platform)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error reading layout of %s: %s", platform, e)
+            return None
+
+    # Remembers the layout a platform served a successful scrape with, for ttl seconds (by default the TTL of the cache).
+    def remember(self, platform: str, layout: str, ttl: Optional[int] = None):
+        try:
+            self.__store.set(LAYOUT_PREFIX + platform, layout, ex=ttl or self.__ttl)
+            self.__store.delete(LAYOUT_PREFIX + platform + FAILURES_SUFFIX)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error caching layout of %s: %s", platform, e)
+
+    # Records a successful scrape with the remembered layout, without extending how long it is remembered.
+    def record_success(self, platform: str):
+        try:
+            self.__store.delete(LAYOUT_PREFIX + platform + FAILURES_SUFFIX)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error resetting layout failures of %s: %s", platform, e)
+
+    # Records a failed scrape with the remembered layout, forgetting the layout after too many in a row.
+    def record_failure(self, platform: str):
+        try:
+            failures = self.__store.incr(LAYOUT_PREFIX + platform + FAILURES_SUFFIX)
+            self.__store.expire(LAYOUT_PREFIX + platform + FAILURES_SUFFIX, self.__ttl)
+            if failures >= self.__max_failures:
+                logger.info("Forgetting layout of %s after %s failed scrapes", platform, failures)
+                self.__store.delete(LAYOUT_PREFIX + platform, LAYOUT_PREFIX + platform + FAILURES_SUFFIX)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error recording layout failure of %s: %s", platform, e)
+
+
+# Layout cache instance shared by the scrapers
+layout_cache = LayoutCache(redis_cache, LAYOUT_CACHE_TTL, LAYOUT_REPROBE_FAILURES)
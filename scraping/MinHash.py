@@ -0,0 +1,138 @@
+import zlib
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Got help from:
+# https://en.wikipedia.org/wiki/MinHash
+# http://infolab.stanford.edu/~ullman/mmds/ch3n.pdf (section 3.4, locality-sensitive hashing for documents)
+
+# Number of hash permutations in each MinHash signature
+NUM_PERMUTATIONS = 128
+# Number of consecutive words in each shingle
+SHINGLE_SIZE = 3
+# Number of shingles in each window of a long text. Jaccard similarity is meaningless between a short
+# page and a much longer assignment, so long texts get one signature per overlapping window instead.
+WINDOW_SHINGLES = 200
+# Number of shingles between the starts of two consecutive windows
+WINDOW_STRIDE = 100
+
+# Permutations are computed as (a * hash + b) mod MERSENNE_PRIME, truncated to 32 bits
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed, so every worker computes the same signatures and they can be shared through Redis
+_random_state = np.random.RandomState(1)
+PERMUTATION_A = _random_state.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+PERMUTATION_B = _random_state.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+# Hashes every run of SHINGLE_SIZE consecutive tokens. Texts shorter than a shingle become a single shingle.
+def shingle_hashes(tokens: Sequence[str]) -> np.ndarray:
+    if len(tokens) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    num_shingles = max(len(tokens) - SHINGLE_SIZE + 1, 1)
+    return np.fromiter(
+        (
+            zlib.crc32(" ".join(tokens[idx : idx + SHINGLE_SIZE]).encode("utf-8"))
+            for idx in range(num_shingles)
+        ),
+        dtype=np.uint64,
+        count=num_shingles,
+    )
+
+
+# Applies every permutation to every shingle hash, giving one row per shingle.
+def _permute(hashes: np.ndarray) -> np.ndarray:
+    # uint64 overflow in the multiplication is intended, the result only needs to be well mixed
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(hashes, PERMUTATION_A) + PERMUTATION_B) % MERSENNE_PRIME
+    return np.bitwise_and(permuted, MAX_HASH)
+
+
+# Computes the MinHash signature of a set of shingle hashes, or None for an empty set.
+def signature(hashes: np.ndarray) -> Optional[np.ndarray]:
+    if len(hashes) == 0:
+        return None
+    return _permute(np.unique(hashes)).min(axis=0)
+
+
+# Computes one MinHash signature per overlapping window of shingles (a single one for short texts).
+# Each stride-sized block of shingles is reduced once, and every window is the minimum of its blocks.
+def window_signatures(hashes: np.ndarray) -> np.ndarray:
+    if len(hashes) == 0:
+        return np.zeros((0, NUM_PERMUTATIONS), dtype=np.uint64)
+    if len(hashes) <= WINDOW_SHINGLES:
+        return signature(hashes).reshape(1, -1)
+    block_starts = np.arange(0, len(hashes), WINDOW_STRIDE)
+    block_minimums = np.minimum.reduceat(_permute(hashes), block_starts, axis=0)
+    blocks_per_window = WINDOW_SHINGLES // WINDOW_STRIDE
+    # Windows start on every block and the last one ends with the last block
+    num_windows = max(len(block_minimums) - blocks_per_window + 1, 1)
+    windows = block_minimums[:num_windows].copy()
+    for offset in range(1, blocks_per_window):
+        np.minimum(windows, block_minimums[offset : offset + num_windows], out=windows)
+    return windows
+
+
+# Checks whether a signature collides with any of the given signatures in at least one LSH band,
+# which is exactly the test LSHIndex.query runs against every indexed signature.
+def shares_band(signatures: np.ndarray, signature: np.ndarray, rows_per_band: int) -> bool:
+    if len(signatures) == 0 or signature is None:
+        return False
+    bands = NUM_PERMUTATIONS // rows_per_band
+    matches = signatures[:, : bands * rows_per_band] == signature[: bands * rows_per_band]
+    return bool(matches.reshape(len(signatures), bands, rows_per_band).all(axis=2).any())
+
+
+# Locality-sensitive hashing index of MinHash signatures, split into bands of rows_per_band rows.
+# A query returns every key with at least one signature that matches the query signature in a whole band,
+# so one page can be checked against every indexed assignment with NUM_PERMUTATIONS / rows_per_band lookups.
+# Fewer rows per band catch lower similarities at the cost of more false candidates.
+class LSHIndex:
+    # Number of signature rows hashed together in each band
+    __rows_per_band: int
+    # One bucket table per band, mapping a band's values to the keys that have them
+    __buckets: List[Dict[bytes, Set[Hashable]]]
+    # Buckets each key was added to, used to remove keys
+    __entries: Dict[Hashable, List[Tuple[int, bytes]]]
+
+    def __init__(self, rows_per_band: int = 1):
+        self.__rows_per_band = rows_per_band
+        self.__buckets = [{} for _ in range(NUM_PERMUTATIONS // rows_per_band)]
+        self.__entries = {}
+
+    # Splits a signature into the bucket keys of each band.
+    def __band_keys(self, signature: np.ndarray):
+        rows = self.__rows_per_band
+        for band in range(len(self.__buckets)):
+            yield band, signature[band * rows : (band + 1) * rows].tobytes()
+
+    # Indexes the signatures of a key, replacing any signatures indexed for it before.
+    def add(self, key: Hashable, signatures: np.ndarray):
+        self.remove(key)
+        entries = set()
+        for window_signature in signatures:
+            for band, band_key in self.__band_keys(window_signature):
+                self.__buckets[band].setdefault(band_key, set()).add(key)
+                entries.add((band, band_key))
+        self.__entries[key] = list(entries)
+
+    # Removes a key from the index.
+    def remove(self, key: Hashable):
+        for band, band_key in self.__entries.pop(key, []):
+            bucket = self.__buckets[band][band_key]
+            bucket.discard(key)
+            if len(bucket) == 0:
+                del self.__buckets[band][band_key]
+
+    # Gets every key sharing at least one band with the signature.
+    def query(self, signature: Optional[np.ndarray]) -> Set[Hashable]:
+        candidates = set()
+        if signature is None:
+            return candidates
+        for band, band_key in self.__band_keys(signature):
+            candidates.update(self.__buckets[band].get(band_key, ()))
+        return candidates
+
+    def __len__(self):
+        return len(self.__entries)
@@ -0,0 +1,135 @@
+import math
+import random
+import time
+from typing import Callable, Optional
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import (
+    NETWORK_IDLE_SECONDS,
+    NETWORK_IDLE_TIMEOUT,
+    PACING_DELAY_DISTRIBUTION,
+    PACING_DELAY_MEAN,
+    PACING_DELAY_SPREAD,
+)
+
+# Got help from:
+# https://www.selenium.dev/documentation/webdriver/waits/#explicit-waits
+# https://developer.mozilla.org/en-US/docs/Web/API/Performance/getEntriesByType
+# https://en.wikipedia.org/wiki/Log-normal_distribution (mean of a log-normal distribution)
+# https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+
+# Reads the load state of the document and the number of network requests it made so far
+NETWORK_STATE_SCRIPT = "return [document.readyState, performance.getEntriesByType('resource').length]"
+
+
+# Expected condition that holds once the document finished loading and made no new network request
+# for quiet_seconds, i.e. the scripts of the page are done fetching what they render.
+class network_idle:
+    # Seconds without a new request before the network counts as idle
+    __quiet_seconds: float
+    # Number of requests seen by the last poll
+    __requests: Optional[int]
+    # Time the number of requests last changed
+    __changed_at: float
+
+    def __init__(self, quiet_seconds: float):
+        self.__quiet_seconds = quiet_seconds
+        self.__requests = None
+        self.__changed_at = time.monotonic()
+
+    def __call__(self, driver):
+        ready_state, requests = driver.execute_script(NETWORK_STATE_SCRIPT)
+        if requests != self.__requests:
+            self.__requests = requests
+            self.__changed_at = time.monotonic()
+            return False
+        return ready_state == "complete" and time.monotonic() - self.__changed_at >= self.__quiet_seconds
+
+
+# Draws a human-like pause in seconds: "lognormal" is skewed towards short pauses with occasional long ones,
+# "uniform" spreads them evenly around the mean and "none" disables pauses. spread is the sigma of the
+# log-normal distribution, or the half-width of the uniform distribution as a fraction of the mean.
+def draw_delay(distribution: str, mean: float, spread: float, rng: random.Random = random) -> float:
+    if distribution == "lognormal" and mean > 0:
+        # Shifts mu so the distribution has the configured mean whatever its sigma
+        return rng.lognormvariate(math.log(mean) - spread ** 2 / 2, spread)
+    if distribution == "uniform":
+        return max(rng.uniform(mean * (1 - spread), mean * (1 + spread)), 0.0)
+    return 0.0
+
+
+# Draws the delay in seconds before retry number retries + 1: exponential backoff from base, capped at maximum,
+# with "equal jitter" (half the backoff is kept, the other half is random) so retries of scans that failed
+# together do not hit the site together again.
+def backoff_delay(retries: int, base: float, maximum: float, rng: random.Random = random) -> float:
+    backoff = min(maximum, base * 2 ** retries)
+    return backoff / 2 + rng.uniform(0, backoff / 2)
+
+
+# Paces a scrape: waits on concrete page conditions instead of fixed sleeps, adds optional human-like pauses
+# between actions, and keeps track of how much of the scrape was spent waiting rather than working.
+class Pacer:
+    # Name of the pause distribution (see draw_delay)
+    __distribution: str
+    # Mean pause in seconds
+    __mean: float
+    # Spread of the pause distribution
+    __spread: float
+    # Time the scrape started
+    __started_at: float
+    # Seconds spent waiting on page conditions
+    __waited: float
+    # Seconds spent in human-like pauses
+    __paused: float
+
+    def __init__(
+        self,
+        distribution: str = PACING_DELAY_DISTRIBUTION,
+        mean: float = PACING_DELAY_MEAN,
+        spread: float = PACING_DELAY_SPREAD,
+    ):
+        self.__distribution = distribution
+        self.__mean = mean
+        self.__spread = spread
+        self.start()
+
+    # Resets the clock and counters at the start of a scrape.
+    def start(self):
+        self.__started_at = time.monotonic()
+        self.__waited = 0.0
+        self.__paused = 0.0
+
+    # Waits until a condition holds, raising TimeoutException after timeout seconds like WebDriverWait.
+    def wait_until(self, driver, condition: Callable, timeout: float):
+        started_at = time.monotonic()
+        try:
+            return WebDriverWait(driver, timeout).until(condition)
+        finally:
+            self.__waited += time.monotonic() - started_at
+
+    # Waits until the page finished loading and went quiet on the network. Pages that keep polling never
+    # go quiet, so this gives up silently after NETWORK_IDLE_TIMEOUT seconds.
+    def wait_for_network_idle(self, driver, timeout: float = NETWORK_IDLE_TIMEOUT):
+        try:
+            self.wait_until(driver, network_idle(NETWORK_IDLE_SECONDS), timeout)
+        except TimeoutException:
+            pass
+
+    # Pauses for a human-like delay drawn from the configured distribution.
+    def human_delay(self):
+        delay = draw_delay(self.__distribution, self.__mean, self.__spread)
+        if delay > 0:
+            time.sleep(delay)
+            self.__paused += delay
+
+    # Gets the seconds spent waiting on pages, pausing and working since the scrape started.
+    def report(self):
+        elapsed = time.monotonic() - self.__started_at
+        return {
+            "waitingSeconds": round(self.__waited, 3),
+            "pausedSeconds": round(self.__paused, 3),
+            "workingSeconds": round(max(elapsed - self.__waited - self.__paused, 0.0), 3),
+            "totalSeconds": round(elapsed, 3),
+        }
@@ -0,0 +1,114 @@
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+# Got help from:
+# https://lxml.de/xpathxslt.html#the-xpath-class (precompiled XPath expressions)
+# https://lxml.de/lxmlhtml.html#parsing-html
+
+# Every field is read from a single copy of the page (the HTML of an HTTP response or the page_source of the
+# browser), parsed locally with precompiled XPaths. This costs one WebDriver round trip per page instead of one
+# per find_element, and there is no timeout to sit through when a field is missing.
+
+# Links of the Solutions search results in the old layout, in page order
+SERP_LINK_SELECTOR = "//a[starts-with(@data-test, 'section-1-serp-result-') and contains(@data-test, '-study-link')]"
+SERP_LINK_ELEMENT_XPATH = etree.XPath(SERP_LINK_SELECTOR)
+# Question snippets the search page shows for its Solutions results
+SERP_SNIPPET_XPATH = etree.XPath(
+    "//*[starts-with(@data-test, 'section-1-serp-result-') and contains(@data-test, '-study-question')]"
+)
+# Position of a search result in the data-test attribute of its link and snippet
+SERP_POSITION_PATTERN = re.compile(r"section-1-serp-result-(\d+)-")
+# Line with the number of search results
+RESULT_COUNT_XPATH = etree.XPath("//div[@data-test='search-result-count-line']")
+# Marker of a question posted as an image, whose transcribed text replaces the question body
+TRANSCRIBED_MARKER_XPATH = etree.XPath("//div[@data-test='transcribed-data-text']")
+# Transcribed image text of a question
+TRANSCRIBED_TEXT_XPATH = etree.XPath("//div[contains(@class, 'styled__TextContent')]")
+# Body of a question
+QUESTION_BODY_XPATH = etree.XPath("//div[@data-test='qna-question-body']")
+# Browser condition for a loaded question page, holding for image and text questions alike
+QUESTION_LOADED_SELECTOR = "//div[@data-test='transcribed-data-text'] | //div[@data-test='qna-question-body']"
+
+# Elements rendered on their own line, whose text must not run into the text around them
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "figure", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "ol", "p", "pre", "section", "table",
+    "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+# First number of a line, allowing thousands separators
+NUMBER_PATTERN = re.compile(r"\d[\d,]*")
+
+
+# Parses the HTML of a page, resolving its links against base_url.
+def parse_page(html: str, base_url: Optional[str] = None) -> lxml.html.HtmlElement:
+    return lxml.html.document_fromstring(html, base_url=base_url)
+
+
+# Gets the text of an element the way a browser lays it out: inline elements join their neighbours
+# ("sta<b>ck</b>" is "stack") while block elements are separated by a line break.
+def element_text(element: lxml.html.HtmlElement) -> str:
+    parts = []
+    for event, node in etree.iterwalk(element, events=("start", "end", "comment", "pi")):
+        if event in ("comment", "pi"):
+            # Comments and processing instructions only keep their tail
+            if node.tail:
+                parts.append(node.tail)
+            continue
+        block = node.tag.lower() in BLOCK_TAGS
+        if event == "start":
+            if block:
+                parts.append("\n")
+            if node.text:
+                parts.append(node.text)
+        else:
+            if block:
+                parts.append("\n")
+            if node.tail and node is not element:
+                parts.append(node.tail)
+    return "".join(parts).strip()
+
+
+# Gets the absolute URL and question snippet of every search result of a search page, in page order.
+# The snippet is None for results shown without one.
+def extract_search_results(page: lxml.html.HtmlElement, base_url: str) -> List[Dict[str, Optional[str]]]:
+    snippets = {}
+    for element in SERP_SNIPPET_XPATH(page):
+        match = SERP_POSITION_PATTERN.match(element.get("data-test"))
+        if match:
+            snippets[match.group(1)] = element_text(element)
+    search_results = []
+    for element in SERP_LINK_ELEMENT_XPATH(page):
+        match = SERP_POSITION_PATTERN.match(element.get("data-test"))
+        search_results.append(
+            {
+                "url": urljoin(base_url, element.get("href")),
+                "snippet": snippets.get(match.group(1)) if match else None,
+            }
+        )
+    return search_results
+
+
+# Gets the number of search results shown on a search page, or None when the page does not show it.
+def extract_result_count(page: lxml.html.HtmlElement) -> Optional[int]:
+    elements = RESULT_COUNT_XPATH(page)
+    if len(elements) == 0:
+        return None
+    match = NUMBER_PATTERN.search(element_text(elements[0]))
+    return int(match.group().replace(",", "")) if match else None
+
+
+# Gets the text of the question on a question page: the transcribed image text for questions posted
+# as images, else the question body. None when the page has neither.
+def extract_question_text(page: lxml.html.HtmlElement) -> Optional[str]:
+    if len(TRANSCRIBED_MARKER_XPATH(page)) > 0:
+        transcribed = TRANSCRIBED_TEXT_XPATH(page)
+        if len(transcribed) > 0:
+            return element_text(transcribed[0])
+    body = QUESTION_BODY_XPATH(page)
+    if len(body) > 0:
+        return element_text(body[0])
+    return None
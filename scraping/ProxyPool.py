@@ -0,0 +1,235 @@
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import redis
+
+from config import (
+    PROXY_BUDGET_WINDOW,
+    PROXY_EJECT_SECONDS,
+    PROXY_MAX_CAPTCHA_RATE,
+    PROXY_MIN_REQUESTS,
+    PROXY_MIN_SUCCESS_RATE,
+    PROXY_REQUEST_BUDGET,
+    PROXY_SERVERS,
+    PROXY_STATS_WINDOW,
+)
+from extensions import redis_cache, logger
+
+# Got help from:
+# https://redis.io/commands/hincrby/
+# https://redis.io/docs/manual/patterns/rate-limiter/ (fixed window counters)
+
+# Redis key prefix of everything stored about a proxy
+PROXY_PREFIX = "proxy:"
+# Redis key suffixes of the outcome counters of a proxy, of its ejection, of its requests in the current
+# budget window and of the scrapes currently using it (a sorted set of lease IDs scored by when they expire)
+STATS_SUFFIX = ":stats"
+EJECTED_SUFFIX = ":ejected"
+BUDGET_SUFFIX = ":budget:"
+LEASES_SUFFIX = ":leases"
+# Outcomes of a request or scrape through a proxy, counted in its stats
+SUCCESS = "successes"
+CAPTCHA = "captchas"
+FAILURE = "failures"
+
+
+# Raised when every proxy of the pool is ejected or has spent its request budget
+class NoProxyAvailable(Exception):
+    pass
+
+
+# Pool of the proxies scrapes go through, shared by every scraper worker through Redis.
+# Every scrape leases one proxy, picked at random among the healthy proxies that have not spent their request
+# budget for the current window, weighted by their health and how many scrapes already use them. The browser is
+# started for one proxy, so a scrape prefers the proxies of the warm drivers of its worker when they are available.
+# The health of a proxy comes from the outcomes of the requests and scrapes that went through it over the last
+# stats window (success rate, captcha rate and latency). A proxy that serves too many captchas or failures is
+# ejected from the pool for a while, and comes back with fresh stats.
+class ProxyPool:
+    # Redis instance storing the proxy stats
+    __store: redis.StrictRedis
+    # Proxy servers of the pool, empty to connect directly
+    __proxies: List[str]
+    # Requests a proxy may serve per budget window, 0 for no budget
+    __request_budget: int
+    # Length in seconds of a budget window
+    __budget_window: int
+    # Length in seconds of the window the stats of a proxy are counted over
+    __stats_window: int
+    # Seconds a proxy stays out of the pool once ejected
+    __eject_seconds: int
+    # Outcomes counted before a proxy may be ejected
+    __min_requests: int
+    # Captcha rate from which a proxy is ejected
+    __max_captcha_rate: float
+    # Success rate below which a proxy is ejected
+    __min_success_rate: float
+    # Random source of the proxy picks
+    __random: random.Random
+
+    def __init__(
+        self,
+        store: redis.StrictRedis,
+        proxies: List[str],
+        request_budget: int = PROXY_REQUEST_BUDGET,
+        budget_window: int = PROXY_BUDGET_WINDOW,
+        stats_window: int = PROXY_STATS_WINDOW,
+        eject_seconds: int = PROXY_EJECT_SECONDS,
+        min_requests: int = PROXY_MIN_REQUESTS,
+        max_captcha_rate: float = PROXY_MAX_CAPTCHA_RATE,
+        min_success_rate: float = PROXY_MIN_SUCCESS_RATE,
+        rng: random.Random = None,
+    ):
+        self.__store = store
+        self.__proxies = proxies
+        self.__request_budget = request_budget
+        self.__budget_window = budget_window
+        self.__stats_window = stats_window
+        self.__eject_seconds = eject_seconds
+        self.__min_requests = min_requests
+        self.__max_captcha_rate = max_captcha_rate
+        self.__min_success_rate = min_success_rate
+        self.__random = rng or random.Random()
+
+    # Leases a proxy for a scrape, yielding None when the pool is empty (direct connections).
+    # A proxy of preferred (e.g. the ones warm drivers were started with) is leased when any of them is available.
+    # Raises NoProxyAvailable when every proxy is ejected or out of budget, so the scrape backs off.
+    # Each lease expires on its own after the stats window, so the leases of killed workers stop counting.
+    # The pool is an optimization only, so Redis errors fall back to a random proxy.
+    @contextmanager
+    def lease(self, preferred: List[Optional[str]] = ()):
+        if len(self.__proxies) == 0:
+            yield None
+            return
+        proxy = self.__pick(preferred)
+        key = self.__key(proxy, LEASES_SUFFIX)
+        lease_id = uuid.uuid4().hex
+        try:
+            self.__store.zadd(key, {lease_id: time.time() + self.__stats_window})
+            self.__store.expire(key, self.__stats_window)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error leasing proxy %s: %s", proxy, e)
+        try:
+            yield proxy
+        finally:
+            try:
+                self.__store.zrem(key, lease_id)
+            except redis.exceptions.RedisError as e:
+                logger.error("Error releasing proxy %s: %s", proxy, e)
+
+    # Counts a request sent through a proxy against its budget for the current window.
+    def count_request(self, proxy: Optional[str]):
+        if proxy is None:
+            return
+        key = self.__budget_key(proxy)
+        try:
+            if self.__store.incr(key) == 1:
+                self.__store.expire(key, self.__budget_window)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error counting request through proxy %s: %s", proxy, e)
+
+    # Records the outcome (SUCCESS, CAPTCHA or FAILURE) and latency in seconds, when known, of a request or scrape
+    # through a proxy, ejecting the proxy once its captcha or success rate crosses its threshold.
+    def record(self, proxy: Optional[str], outcome: str, latency: Optional[float] = None):
+        if proxy is None:
+            return
+        key = self.__key(proxy, STATS_SUFFIX)
+        try:
+            # The stats window starts with the first outcome, so rates always cover recent outcomes only
+            if self.__store.hincrby(key, "requests", 1) == 1:
+                self.__store.expire(key, self.__stats_window)
+            self.__store.hincrby(key, outcome, 1)
+            if latency is not None:
+                self.__store.hincrbyfloat(key, "latencySeconds", latency)
+                self.__store.hincrby(key, "latencyCount", 1)
+            stats = self.__stats(proxy)
+            if stats["requests"] >= self.__min_requests and (
+                stats["captchaRate"] >= self.__max_captcha_rate or stats["successRate"] < self.__min_success_rate
+            ):
+                logger.info("Ejecting proxy %s for %s seconds: %s", proxy, self.__eject_seconds, stats)
+                self.__store.set(self.__key(proxy, EJECTED_SUFFIX), 1, ex=self.__eject_seconds)
+                self.__store.delete(key)
+        except redis.exceptions.RedisError as e:
+            logger.error("Error recording outcome of proxy %s: %s", proxy, e)
+
+    # Gets the stats, ejection, budget and leases of every proxy of the pool, for logging.
+    def info(self) -> List[Dict]:
+        proxies = []
+        for proxy in self.__proxies:
+            try:
+                proxies.append(
+                    dict(
+                        self.__stats(proxy),
+                        proxy=proxy,
+                        ejected=bool(self.__store.exists(self.__key(proxy, EJECTED_SUFFIX))),
+                        budgetUsed=int(self.__store.get(self.__budget_key(proxy)) or 0),
+                        leases=self.__leases(proxy),
+                    )
+                )
+            except redis.exceptions.RedisError as e:
+                logger.error("Error reading stats of proxy %s: %s", proxy, e)
+        return proxies
+
+    # Picks a proxy among the ones that are not ejected and have budget left, weighted by health over load.
+    # Only the preferred ones are picked from when any of them is available.
+    def __pick(self, preferred: List[Optional[str]]) -> str:
+        try:
+            candidates = []
+            weights = []
+            for proxy in self.__proxies:
+                if self.__store.exists(self.__key(proxy, EJECTED_SUFFIX)):
+                    continue
+                budget_used = int(self.__store.get(self.__budget_key(proxy)) or 0)
+                if self.__request_budget > 0 and budget_used >= self.__request_budget:
+                    continue
+                leases = self.__leases(proxy)
+                candidates.append(proxy)
+                # Unhealthy proxies keep a small chance, so they can prove they recovered
+                weights.append(max(self.__health(self.__stats(proxy)), 0.01) / (1 + leases))
+        except redis.exceptions.RedisError as e:
+            logger.error("Error reading proxy pool, picking a random proxy: %s", e)
+            return self.__random.choice(self.__proxies)
+        if len(candidates) == 0:
+            raise NoProxyAvailable(f"All {len(self.__proxies)} proxies are ejected or out of budget")
+        if any(proxy in preferred for proxy in candidates):
+            weights = [weight if proxy in preferred else 0 for proxy, weight in zip(candidates, weights)]
+        return self.__random.choices(candidates, weights=weights)[0]
+
+    # Gets the number of scrapes using a proxy, dropping the leases that expired.
+    def __leases(self, proxy: str) -> int:
+        key = self.__key(proxy, LEASES_SUFFIX)
+        self.__store.zremrangebyscore(key, "-inf", time.time())
+        return self.__store.zcard(key)
+
+    # Gets the counters and rates of a proxy over the current stats window.
+    # The success rate starts at 1/2 and moves towards the observed rate as outcomes are counted.
+    def __stats(self, proxy: str) -> Dict:
+        counters = self.__store.hgetall(self.__key(proxy, STATS_SUFFIX))
+        requests = int(counters.get("requests", 0))
+        latency_count = int(counters.get("latencyCount", 0))
+        return {
+            "requests": requests,
+            "successRate": (int(counters.get(SUCCESS, 0)) + 1) / (requests + 2),
+            "captchaRate": int(counters.get(CAPTCHA, 0)) / requests if requests else 0.0,
+            "latencySeconds": float(counters.get("latencySeconds", 0)) / latency_count if latency_count else 0.0,
+        }
+
+    # Gets the health of a proxy from its stats, between 0 and 1: likely to succeed, without captchas, and fast.
+    @staticmethod
+    def __health(stats: Dict) -> float:
+        return stats["successRate"] * (1 - stats["captchaRate"]) / (1 + stats["latencySeconds"])
+
+    @staticmethod
+    def __key(proxy: str, suffix: str) -> str:
+        return PROXY_PREFIX + proxy + suffix
+
+    # Gets the key of the request counter of a proxy for the current budget window.
+    def __budget_key(self, proxy: str) -> str:
+        return self.__key(proxy, BUDGET_SUFFIX) + str(int(time.time() // self.__budget_window))
+
+
+# Proxy pool instance shared by the scrapers
+proxy_pool = ProxyPool(redis_cache, PROXY_SERVERS)
@@ -0,0 +1,143 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import urldefrag
+
+import numpy as np
+
+from Similarity import tokenize
+from TextNormalizer import normalize_text
+
+# Got help from:
+# https://en.wikipedia.org/wiki/Tf%E2%80%93idf
+# https://docs.python.org/3/library/urllib.parse.html#urllib.parse.urldefrag
+
+# Sentence boundaries: end punctuation followed by whitespace, or a line break
+SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.?!])\s+|\n+")
+# Sentences with fewer words carry too little to search for on their own
+MIN_SENTENCE_WORDS = 5
+
+
+# Start of a numbered question: "1.", "2)", "(3)", "Q4", "Question 5:", "Problem 6", "Exercise 7" at the start of a line
+QUESTION_START_PATTERN = re.compile(
+    r"^[ \t]*(?:(?P<word>question|problem|exercise|q)[ \t]*(?P<word_number>\d+)[.):]?"
+    r"|(?P<number>\d+)[ \t]*(?P<end>[.)])|\((?P<parenthesized>\d+)\))(?=\s)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+# Gets the kind of marker ("question", "q", ".", ")", "()"...) and the number of a numbered question start.
+def _question_marker(match: re.Match):
+    if match.group("word"):
+        return match.group("word").lower(), int(match.group("word_number"))
+    if match.group("number"):
+        return match.group("end"), int(match.group("number"))
+    return "()", int(match.group("parenthesized"))
+
+
+# Splits a text made of numbered questions into one text per question, merging neighbouring questions
+# when there are more than max_questions. Text before the first question (e.g. instructions) is left out.
+# Only top-level questions are split on: markers of the same kind as the first one, numbered one after the other,
+# so numbered steps inside a question ("1.", "2)" under "Question 1") stay with their question.
+# Returns the whole text alone when it has fewer than two questions.
+def split_questions(text: str, max_questions: int) -> List[str]:
+    starts = []
+    first_kind, last_number = None, None
+    for match in QUESTION_START_PATTERN.finditer(text):
+        kind, number = _question_marker(match)
+        if first_kind is None or (kind == first_kind and number == last_number + 1):
+            starts.append(match.start())
+            first_kind, last_number = kind, number
+    questions = [
+        text[start:end].strip() for start, end in zip(starts, starts[1:] + [len(text)]) if text[start:end].strip()
+    ]
+    if len(questions) < 2:
+        return [text]
+    # Spread the questions evenly over at most max_questions groups, keeping their order
+    groups = np.array_split(np.arange(len(questions)), min(max_questions, len(questions)))
+    return ["\n".join(questions[idx] for idx in group) for group in groups]
+
+
+# Splits a text into sentences, keeping their original wording.
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY_PATTERN.split(text) if sentence.strip()]
+
+
+# Plans a small set of search queries for a text, in order of expected value:
+# - its most distinctive sentences, scored by the mean TF-IDF weight of their terms, with a bonus for
+#   terms of the key phrases, and cut to max_words words
+# - the key phrases themselves, when there are any, in their order and cut to max_words words
+# IDF comes from the corpus-fitted model when there is one, or else from the sentences of the text itself,
+# which favours sentences with terms the rest of the text does not repeat (e.g. the specifics of a question).
+# Without with_key_phrases, the key phrases only weigh the sentences, e.g. for all but one question of a scan
+# split into questions, which would otherwise all send the same key phrase search.
+def plan_queries(
+    text: str,
+    keywords: Optional[List[str]],
+    max_queries: int,
+    max_words: int,
+    idf_model=None,
+    with_key_phrases: bool = True,
+) -> List[str]:
+    sentences = [
+        sentence for sentence in split_sentences(text) if len(sentence.split()) >= MIN_SENTENCE_WORDS
+    ]
+    keyword_terms = set(tokenize(" ".join(keywords))) if keywords else set()
+    queries = []
+    if len(sentences) > 0:
+        sentence_tokens = [tokenize(sentence) for sentence in sentences]
+        idf = _term_idf(sentence_tokens, idf_model)
+        scores = np.array(
+            [
+                np.mean([idf[term] * (2.0 if term in keyword_terms else 1.0) for term in tokens]) if tokens else 0.0
+                for tokens in sentence_tokens
+            ]
+        )
+        for idx in np.argsort(-scores, kind="stable"):
+            queries.append(" ".join(normalize_text(sentences[idx]).split()[:max_words]))
+    if keywords and with_key_phrases:
+        queries.insert(min(len(queries), max_queries - 1), key_phrase_query(keywords, max_words))
+    if len(queries) == 0:
+        queries.append(" ".join(normalize_text(text).split()[:max_words]))
+    # Drop repeated queries, keeping their first position
+    return list(dict.fromkeys(query for query in queries if query))[:max_queries]
+
+
+# Joins the key phrases into one query of at most max_words words. Key phrases come best first, so the query
+# keeps the first ones whole and stops at the first phrase that does not fit, cutting it only when it is the first.
+def key_phrase_query(keywords: List[str], max_words: int) -> str:
+    words = []
+    for keyword in keywords:
+        keyword_words = normalize_text(keyword).split()
+        if len(words) + len(keyword_words) > max_words:
+            if len(words) == 0:
+                words = keyword_words[:max_words]
+            break
+        words.extend(keyword_words)
+    return " ".join(words)
+
+
+# Gets the IDF of every term of the sentences, from the model or from the sentences as documents.
+def _term_idf(sentence_tokens: List[List[str]], idf_model=None) -> Dict[str, float]:
+    terms = sorted(set(term for tokens in sentence_tokens for term in tokens))
+    if idf_model is not None:
+        return dict(zip(terms, idf_model.lookup(terms)))
+    document_frequency = Counter(term for tokens in sentence_tokens for term in set(tokens))
+    num_sentences = len(sentence_tokens)
+    return {term: math.log((1 + num_sentences) / (1 + document_frequency[term])) + 1 for term in terms}
+
+
+# Merges the search results of several queries rank by rank (every query's first result, then every second one...),
+# keeping the first result for every URL (ignoring fragments and trailing slashes).
+def merge_search_results(search_results_per_query: List[List[Dict]]) -> List[Dict]:
+    merged = {}
+    for rank in range(max((len(search_results) for search_results in search_results_per_query), default=0)):
+        for search_results in search_results_per_query:
+            if rank >= len(search_results):
+                continue
+            search_result = search_results[rank]
+            url = urldefrag(search_result["url"])[0].rstrip("/")
+            if url not in merged:
+                merged[url] = dict(search_result, url=url)
+    return list(merged.values())
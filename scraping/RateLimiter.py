@@ -0,0 +1,111 @@
+import time
+
+import redis
+
+from config import RATE_LIMIT_BURST, RATE_LIMIT_MAX_WAIT, RATE_LIMIT_RATE
+from extensions import redis_cache, logger
+
+# Got help from:
+# https://en.wikipedia.org/wiki/Token_bucket
+# https://redis.io/docs/interact/programmability/eval-intro/
+# https://redis.io/commands/time/
+
+# Redis key prefix of the token bucket of each platform
+BUCKET_PREFIX = "ratelimit:"
+
+# Takes a token from the bucket of KEYS[1], refilled at ARGV[1] tokens per second up to ARGV[2] tokens.
+# When the bucket is empty, the token is reserved ahead of its refill if it comes within ARGV[3] seconds (always
+# when ARGV[3] is negative), which lets the bucket go negative so later callers queue up behind it. Returns the
+# seconds to wait before using the token and whether it was taken (0 when the wait is too long and nothing was taken).
+# The bucket is kept until it would have refilled to ARGV[2] tokens, after which a new one is the same.
+# The clock of Redis is used, so workers with skewed clocks share one bucket fairly.
+TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+end
+local taken = 0
+if max_wait < 0 or wait <= max_wait then
+    tokens = tokens - 1
+    taken = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+return {tostring(wait), taken}
+"""
+
+
+# Raised when a request would have to wait longer than the limiter allows, so the scan is requeued instead
+class RateLimited(Exception):
+    # Seconds until a token is expected to be available
+    retry_after: float
+
+    def __init__(self, message: str, retry_after: float):
+        super(RateLimited, self).__init__(message)
+        self.retry_after = retry_after
+
+
+# Token bucket rate limiter shared by every scraper worker through Redis, with one bucket per platform.
+# Every request to a platform takes a token first. Tokens refill at rate per second up to burst, so workers
+# together send at most burst requests at once and rate requests per second over time, however many of them
+# there are. A request that has to wait for its token sleeps when the wait is at most max_wait seconds, and
+# raises RateLimited otherwise, so the scan is requeued instead of holding its worker. Only the first request
+# of a scan may be refused: once a scan sent requests, requeuing it would redo them, so it waits its turn.
+class RateLimiter:
+    # Redis instance storing the buckets
+    __store: redis.StrictRedis
+    # Sustained requests per second of a platform, 0 for no limit
+    __rate: float
+    # Requests a platform may get at once after being idle
+    __burst: int
+    # Seconds a request may sleep for its token
+    __max_wait: float
+    # Token bucket script registered with Redis
+    __take_token: redis.commands.core.Script
+
+    def __init__(
+        self,
+        store: redis.StrictRedis,
+        rate: float = RATE_LIMIT_RATE,
+        burst: int = RATE_LIMIT_BURST,
+        max_wait: float = RATE_LIMIT_MAX_WAIT,
+    ):
+        self.__store = store
+        self.__rate = rate
+        self.__burst = burst
+        self.__max_wait = max_wait
+        self.__take_token = store.register_script(TAKE_TOKEN_SCRIPT) if rate > 0 else None
+
+    # Takes a token for a request to a platform, sleeping until it is due, or raises RateLimited when it is due
+    # in more than max_wait seconds and the request may be deferred (the first request of a scan).
+    # The limiter protects the site rather than the scan, but a Redis outage must not stop every scan,
+    # so Redis errors let requests through.
+    def acquire(self, platform: str, may_defer: bool = True):
+        if self.__take_token is None:
+            return
+        try:
+            wait, taken = self.__take_token(
+                keys=[BUCKET_PREFIX + platform],
+                args=[self.__rate, self.__burst, self.__max_wait if may_defer else -1],
+            )
+        except redis.exceptions.RedisError as e:
+            logger.error("Error taking request token of %s: %s", platform, e)
+            return
+        wait = float(wait)
+        if not int(taken):
+            raise RateLimited(f"Next request token of {platform} is due in {wait:.1f}s", wait)
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Rate limiter instance shared by the scrapers
+rate_limiter = RateLimiter(redis_cache)
@@ -1,12 +1,74 @@
 from datetime import datetime
+import threading
+import time
+import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.proxy import Proxy, ProxyType
-from typing import Dict, List
+from typing import Dict, List, Optional
 from abc import ABC, abstractmethod
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import scipy
+import numpy as np
+
+from AssignmentRegistry import get_active_assignments
+from config import (
+    MINHASH_PREFILTER,
+    MINHASH_PREFILTER_MIN_WORDS,
+    MINHASH_ROWS_PER_BAND,
+    PASSAGE_MODE,
+    PASSAGE_STRIDE_WORDS,
+    PASSAGE_WINDOW_WORDS,
+    PROXY_SERVER,
+    QUERY_MAX_QUERIES,
+    QUERY_MAX_WORDS,
+)
+from DriverPool import driver_pool
+from FingerprintCache import fingerprint_cache
+from HttpFetcher import FetchBlocked, HttpFetcher
+from IdfModel import get_idf_model
+from Pacing import Pacer
+from ProxyPool import CAPTCHA, FAILURE, SUCCESS, proxy_pool
+from QueryPlanner import plan_queries
+from RateLimiter import rate_limiter
+from Similarity import (
+    AssignmentFingerprint,
+    score_fingerprint,
+    score_pair,
+    score_passages,
+    score_texts,
+    shares_band_with,
+)
+
+# Utilizing a single user agent to seem more natural
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+
+
+# Kinds of scrape failures, retried differently: a captcha (or any page that never loaded) clears after a while
+# on another proxy exit, while a missing element usually means the page layout changed. A scrape that found
+# every proxy ejected or out of budget never reached the site, and waits for a proxy to come back.
+CAPTCHA_FAILURE = "captcha"
+ELEMENT_FAILURE = "element"
+PROXY_FAILURE = "proxy"
+
+
+# Gets the proxy settings of the HTTP fetcher for a proxy server, or None to connect directly.
+def proxy_settings(proxy_server: Optional[str]) -> Optional[Dict[str, str]]:
+    if not proxy_server:
+        return None
+    return {"http": f"http://{proxy_server}", "https": f"http://{proxy_server}"}
+
+
+# HTTP fetchers of this worker process by proxy, whose connection pools are shared by every scrape through the proxy
+http_fetchers: Dict[Optional[str], HttpFetcher] = {}
+# Lock of the HTTP fetchers, shared by the fetching threads of a scrape
+http_fetchers_lock = threading.Lock()
+
+
+# Gets the HTTP fetcher of this worker process going through a proxy, or connecting directly for None.
+def http_fetcher_for(proxy_server: Optional[str]) -> HttpFetcher:
+    with http_fetchers_lock:
+        if proxy_server not in http_fetchers:
+            http_fetchers[proxy_server] = HttpFetcher(USER_AGENT, proxy_settings(proxy_server))
+        return http_fetchers[proxy_server]
 
 # Superclass to potentially multiple platform-specific subclasses.
 # This class contains all of the common properties and functionality that can be used for scraping any homework help website.
@@ -15,6 +77,10 @@ class Scraper(ABC):
     __id: int
     # URL of the website to be scraped
     __url: str
+    # Origin of the website pages are fetched from
+    __base_url: str
+    # Name of the website in shared caches and limits
+    __platform: str
     # List of keywords to be used to strengthen text similarity score
     __keywords: List[str]
     # Text to be scanned for
@@ -25,6 +91,20 @@ class Scraper(ABC):
     __driver_options: Options
     # Webdriver to be used to scrape
     __driver: webdriver
+    # Proxy pages are fetched through, None when connecting directly
+    __proxy_server: Optional[str]
+    # HTTP fetcher going through the proxy
+    __http_fetcher: HttpFetcher
+    # Waits, pauses and timing of the scraping session
+    __pacer: Pacer
+    # Kind of failure of the last scrape (CAPTCHA_FAILURE, ELEMENT_FAILURE or PROXY_FAILURE), None when it did not fail
+    __failure: Optional[str]
+    # Whether the turn of the next request was taken up front (see acquire_first_request_token)
+    __prepaid_token: bool
+    # Lock of the prepaid turn, shared by the fetching threads of a scrape
+    __token_lock: threading.Lock
+    # Whether the key phrases are searched for on their own, besides weighing the sentences searched for
+    __search_key_phrases: bool
 
     # Got help from:
     # https://www.zenrows.com/blog/selenium-avoid-bot-detection#disable-automation-indicator-webdriver-flags
@@ -35,7 +115,7 @@ class Scraper(ABC):
         self.__keywords = keywords
         self.__text_to_search = text_to_search
         # Utilizing a single user agent to seem more natural
-        self.__user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+        self.__user_agent = USER_AGENT
         # Driver options object
         options = Options()
         # options.headless = False
@@ -65,12 +145,16 @@ class Scraper(ABC):
             }
         })
 
-        # Set up the rotating proxies to work with the webdriver
-        proxy = "us.smartproxy.com:10000"
-        options.add_argument(f"--proxy-server={proxy}")
-
         # Set the driver options
         self.set_driver_options(options)
+        # Set up the rotating proxies to work with the webdriver and the HTTP fetcher
+        self.set_proxy_server(PROXY_SERVER)
+        # Pace the session on page conditions and human-like pauses rather than fixed sleeps
+        self.__pacer = Pacer()
+        self.__failure = None
+        self.__prepaid_token = False
+        self.__token_lock = threading.Lock()
+        self.__search_key_phrases = True
 
     # Sets the URL of the website to be scraped.
     def set_url(self, url: str):
@@ -80,6 +164,22 @@ class Scraper(ABC):
     def get_url(self):
         return self.__url
 
+    # Sets the origin of the website pages are fetched from, e.g. a local stand-in instead of the live site.
+    def set_base_url(self, base_url: str):
+        self.__base_url = base_url.rstrip("/")
+
+    # Gets the origin of the website pages are fetched from.
+    def get_base_url(self):
+        return self.__base_url
+
+    # Sets the name of the website in shared caches and limits.
+    def set_platform(self, platform: str):
+        self.__platform = platform
+
+    # Gets the name of the website in shared caches and limits.
+    def get_platform(self):
+        return self.__platform
+
     # Sets the keywords to be emphasized in the text similarity score.
     def set_keywords(self, keywords: List[str]):
         self.__keywords = keywords
@@ -112,6 +212,20 @@ class Scraper(ABC):
     def get_driver_options(self):
         return self.__driver_options
 
+    # Sets the proxy the browser and the HTTP fetcher go through, or None to connect directly (e.g. to a local stand-in).
+    def set_proxy_server(self, proxy_server: Optional[str]):
+        proxy_server = proxy_server or None
+        arguments = self.get_driver_options().arguments
+        arguments[:] = [argument for argument in arguments if not argument.startswith("--proxy-server=")]
+        if proxy_server:
+            arguments.append(f"--proxy-server={proxy_server}")
+        self.__proxy_server = proxy_server
+        self.__http_fetcher = http_fetcher_for(proxy_server)
+
+    # Gets the proxy the browser and the HTTP fetcher go through.
+    def get_proxy_server(self):
+        return self.__proxy_server
+
     # Sets the webdriver.
     def set_driver(self, driver: webdriver):
         self.__driver = driver
@@ -120,6 +234,86 @@ class Scraper(ABC):
     def get_driver(self):
         return self.__driver
 
+    # Gets the pacer of the scraping session.
+    def get_pacer(self):
+        return self.__pacer
+
+    # Sets the kind of failure of the last scrape, or None when it did not fail.
+    def set_failure(self, failure: Optional[str]):
+        self.__failure = failure
+
+    # Gets the kind of failure of the last scrape (CAPTCHA_FAILURE, ELEMENT_FAILURE or PROXY_FAILURE), or None when it did not fail.
+    def get_failure(self):
+        return self.__failure
+
+    # Waits until a condition (e.g. an expected condition of the page) holds, or raises TimeoutException.
+    def wait_until(self, condition, timeout: float):
+        return self.__pacer.wait_until(self.get_driver(), condition, timeout)
+
+    # Fetches a page over HTTP without the browser and parses it (see HttpFetcher.fetch).
+    # The request counts against the budget of the proxy, and its outcome and latency towards its health.
+    def fetch_page(self, url: str):
+        self.acquire_request_token()
+        proxy_pool.count_request(self.__proxy_server)
+        start = time.monotonic()
+        try:
+            page = self.__http_fetcher.fetch(url)
+        except FetchBlocked:
+            proxy_pool.record(self.__proxy_server, CAPTCHA)
+            raise
+        except requests.exceptions.RequestException:
+            proxy_pool.record(self.__proxy_server, FAILURE)
+            raise
+        proxy_pool.record(self.__proxy_server, SUCCESS, time.monotonic() - start)
+        return page
+
+    # Starts a new HTTP session with the site, dropping the cookies of previous scrapes.
+    def clear_http_cookies(self):
+        self.__http_fetcher.clear_cookies()
+
+    # Takes the turn of the first request of a scrape up front, before any page is fetched or loaded (see RateLimiter).
+    # Raises RateLimited when that turn is too far away, so the scan is deferred before it sent anything.
+    def acquire_first_request_token(self):
+        rate_limiter.acquire(self.__platform)
+        with self.__token_lock:
+            self.__prepaid_token = True
+
+    # Waits for the turn of the next request to the website, shared by every worker (see RateLimiter).
+    # Must be called before every page fetched or loaded, possibly by several fetching threads at once.
+    # The first request uses the turn taken by acquire_first_request_token, and later requests always wait for theirs.
+    def acquire_request_token(self):
+        with self.__token_lock:
+            if self.__prepaid_token:
+                self.__prepaid_token = False
+                return
+        rate_limiter.acquire(self.__platform, may_defer=False)
+
+    # Counts a page loaded by the webdriver, so the driver pool recycles drivers that loaded too many,
+    # and against the budget of the proxy.
+    def record_page(self):
+        driver_pool.record_page(self.get_driver())
+        proxy_pool.count_request(self.__proxy_server)
+
+    # Sets whether the key phrases are searched for on their own, e.g. only by the first shard of a sharded scan.
+    def set_search_key_phrases(self, search_key_phrases: bool):
+        self.__search_key_phrases = search_key_phrases
+
+    # Gets whether the key phrases are searched for on their own.
+    def get_search_key_phrases(self):
+        return self.__search_key_phrases
+
+    # Plans the search queries for the text to be scanned for: its most distinctive sentences and its key phrases,
+    # instead of the whole text, which makes for huge URLs and poor search results.
+    def get_search_queries(self) -> List[str]:
+        return plan_queries(
+            self.__text_to_search,
+            self.__keywords,
+            QUERY_MAX_QUERIES,
+            QUERY_MAX_WORDS,
+            get_idf_model(),
+            self.__search_key_phrases,
+        )
+
     # URL constructor to be implemented for each scraper subclass.
     @abstractmethod
     def url_builder(self, search_query: str):
@@ -128,34 +322,77 @@ class Scraper(ABC):
     # Got help from:
     # https://spotintelligence.com/2022/12/19/text-similarity-python/
     # This function generates a text similarity score given 2 pieces of text and any keywords to emphasize.
+    # The score is the cosine similarity of the TF-IDF vectors of both texts (IDF fitted on the 2 texts),
+    # with the TF-IDF vector of the keywords appended to both when keywords are provided. It is computed
+    # directly from term counts, dot products and norms rather than by building the vectors.
     def calc_text_similarity(self, text_1: str, text_2: str, keywords: List[str]):
-        # Stores the final similarity score
-        similarity_score = -1
-        # Initialize a TF-IDF vectorizer
-        text_vectorizer = TfidfVectorizer()
-        # Fit it to text 1 and 2 to create TF-IDF feature vectors
-        text_vectors = text_vectorizer.fit_transform([text_1, text_2])
-        # 2 paths: if there are keywords provided and if there are no keywords provided
-        if keywords != None:
-            # Initialize a TF-IDF vectorizer with vocabulary from text_vectorizer
-            keyword_vectorizer = TfidfVectorizer(
-                vocabulary=text_vectorizer.get_feature_names_out()
+        return score_pair(text_1, text_2, keywords)
+
+    # Batch version of calc_text_similarity that scores text_1 against every text in texts at once.
+    # Each score matches calc_text_similarity for that pair, but all pairs are computed in one
+    # vectorized sparse-matrix pass instead of refitting two vectorizers per text.
+    def calc_text_similarity_batch(self, text_1: str, texts: List[str], keywords: List[str]) -> np.ndarray:
+        # Nothing to score
+        if len(texts) == 0:
+            return np.zeros(0)
+        return score_texts(text_1, texts, keywords)
+
+    # Gets the fingerprint of the text to be scanned for and its keywords from the shared cache.
+    def get_fingerprint(self, assignment_id) -> AssignmentFingerprint:
+        return fingerprint_cache.get(assignment_id, self.__text_to_search, self.__keywords)
+
+    # Same as calc_text_similarity_batch, but reuses a precomputed fingerprint of the first text and its keywords.
+    # When a corpus-fitted IDF model is configured, TF-IDF weights come from it instead of a two-document fit.
+    def calc_fingerprint_similarity_batch(self, fingerprint: AssignmentFingerprint, texts: List[str]) -> np.ndarray:
+        # Nothing to score
+        if len(texts) == 0:
+            return np.zeros(0)
+        return score_fingerprint(fingerprint, texts, get_idf_model())
+
+    # Scores short texts, such as the snippets of search results, against a fingerprint without the MinHash pre-filter,
+    # which needs more shingles than a snippet has. The keyword boost is left out too: appending the key phrases to
+    # both vectors lifts even unrelated texts to about half the score, which would defeat a threshold on snippets.
+    # With passage mode on, a long text to be scanned for is also scored window by window, so a snippet of one
+    # of its questions is not diluted by the rest.
+    def calc_snippet_similarity_batch(self, fingerprint: AssignmentFingerprint, texts: List[str]) -> np.ndarray:
+        # Nothing to score
+        if len(texts) == 0:
+            return np.zeros(0)
+        text_fingerprint = AssignmentFingerprint(fingerprint.terms, fingerprint.counts, None, fingerprint.signatures)
+        scores = score_fingerprint(text_fingerprint, texts, get_idf_model())
+        if PASSAGE_MODE and fingerprint.counts.sum() > PASSAGE_WINDOW_WORDS:
+            passage_scores, _ = self.calc_passage_similarity_batch(self.__text_to_search, texts, None)
+            scores = np.maximum(scores, passage_scores)
+        return scores
+
+    # Passage mode version of calc_text_similarity_batch: scores overlapping windows of text_1 against every
+    # text and returns the best window score of each text along with the character offset of that window.
+    def calc_passage_similarity_batch(self, text_1: str, texts: List[str], keywords: List[str]):
+        return score_passages(
+            text_1, texts, keywords, PASSAGE_WINDOW_WORDS, PASSAGE_STRIDE_WORDS, get_idf_model()
+        )
+
+    # Same as calc_passage_similarity_batch against the text to be scanned for, but when that text is long,
+    # texts sharing no MinHash band with its fingerprint are skipped with a score of 0. Scoring every window
+    # of a long text costs several times the check, and most scraped pages share nothing with the assignment.
+    def calc_prefiltered_passage_similarity_batch(
+        self, fingerprint: AssignmentFingerprint, texts: List[str], keywords: List[str]
+    ):
+        scores = np.zeros(len(texts))
+        offsets = np.zeros(len(texts), dtype=np.int64)
+        kept = np.arange(len(texts))
+        if MINHASH_PREFILTER and fingerprint.counts.sum() >= MINHASH_PREFILTER_MIN_WORDS:
+            kept = np.flatnonzero(shares_band_with(fingerprint, texts, MINHASH_ROWS_PER_BAND))
+        if len(kept) > 0:
+            scores[kept], offsets[kept] = self.calc_passage_similarity_batch(
+                self.__text_to_search, [texts[idx] for idx in kept], keywords
             )
-            # Convert keywords into TF-IDF vector
-            keyword_vector = keyword_vectorizer.fit_transform([" ".join(keywords)])
-            # Get the number of rows in text_vectors
-            text_num_rows = text_vectors.shape[0]
-            # Make keyword_vector match the number of rows in text_vectors
-            keyword_vector = scipy.sparse.vstack([keyword_vector] * text_num_rows)
-            # Combine keyword_vector and text_vectors
-            combined_vectors = scipy.sparse.hstack([text_vectors, keyword_vector])
-            # Generate similarity score using cosine similarity function
-            similarity = cosine_similarity(combined_vectors[0], combined_vectors[1])
-            # Update final similarity score variable
-            similarity_score = similarity[0][0]
-        else:
-            # Calculate similarity score using cosine similarity function of just the text_vectors
-            similarity = cosine_similarity(text_vectors)
-            # Update final similarity score variable
-            similarity_score = similarity[0][0]
-        return similarity_score
\ No newline at end of file
+        return scores, offsets
+
+    # Cross-assignment scoring: scores every text against all active assignments with one sparse matrix multiply.
+    # Returns the IDs of the assignments and an (assignments x texts) score matrix, or None without active assignments.
+    def calc_active_assignments_similarity(self, texts: List[str]):
+        active_assignments = get_active_assignments(MINHASH_ROWS_PER_BAND)
+        if active_assignments is None or len(texts) == 0:
+            return None
+        return active_assignments.assignment_ids, active_assignments.score(texts, get_idf_model())
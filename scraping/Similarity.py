@@ -0,0 +1,372 @@
+import base64
+import hashlib
+import json
+import math
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse
+
+import MinHash
+from TextNormalizer import TOKEN_PATTERN, normalize_text, token_cache
+
+# IDF that a TfidfVectorizer fitted on exactly two documents gives a term found in only one of them.
+# Terms found in both documents get an IDF of exactly 1.
+UNSHARED_IDF = 1 + math.log(3 / 2)
+# Version of the fingerprint format, part of the fingerprint key so cached fingerprints of an
+# older format are never read back
+FINGERPRINT_VERSION = 3
+
+
+# Splits normalized text into the same tokens TfidfVectorizer would produce.
+# Tokens are memoized per worker process, so identical texts are never tokenized twice.
+def tokenize(text: str) -> Sequence[str]:
+    return token_cache.tokenize(text)
+
+
+# Builds a sparse term count matrix (one row per token list), adding unseen terms to the vocabulary.
+def build_count_matrix(
+    token_lists: Sequence[Sequence[str]], vocabulary: Dict[str, int]
+) -> scipy.sparse.csr_matrix:
+    indptr = [0]
+    indices = []
+    for tokens in token_lists:
+        for token in tokens:
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float64)
+    matrix = scipy.sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(token_lists), len(vocabulary)),
+    )
+    # Duplicate (row, term) entries are summed into counts
+    matrix.sum_duplicates()
+    return matrix
+
+
+# Computes the similarity score of every query row against every candidate row in one pass.
+# The score of each pair is identical to what a TfidfVectorizer fitted on the two documents only gives
+# (l2-normalized TF-IDF cosine similarity, optionally with the keyword vector appended).
+# Because a two-document fit only gives IDF 1 (shared term) or UNSHARED_IDF (unshared term), the
+# per-pair norms can be derived from a handful of sparse products instead of refitting per pair.
+# query_keywords holds one binary keyword indicator row per query, or None to skip keyword boosting.
+def pairwise_similarity(
+    query_counts: scipy.sparse.csr_matrix,
+    candidate_counts: scipy.sparse.csr_matrix,
+    query_keywords: Optional[scipy.sparse.csr_matrix] = None,
+) -> np.ndarray:
+    num_terms = max(query_counts.shape[1], candidate_counts.shape[1])
+    query_counts = _resize(query_counts, num_terms)
+    candidate_counts = _resize(candidate_counts, num_terms)
+    query_present = query_counts.sign()
+    candidate_present = candidate_counts.sign()
+    query_squares = query_counts.multiply(query_counts).tocsr()
+    candidate_squares = candidate_counts.multiply(candidate_counts).tocsr()
+    unshared_sq = UNSHARED_IDF**2
+
+    # Shared terms have IDF 1 in both documents, so the weighted dot product is the raw count dot product
+    dot = (query_counts @ candidate_counts.T).toarray()
+    # Squared norms: every term starts as unshared, then shared terms are discounted back to IDF 1
+    query_norm_sq = unshared_sq * np.asarray(query_squares.sum(axis=1)) - (
+        unshared_sq - 1
+    ) * (query_squares @ candidate_present.T).toarray()
+    candidate_norm_sq = unshared_sq * np.asarray(candidate_squares.sum(axis=1)).T - (
+        unshared_sq - 1
+    ) * (query_present @ candidate_squares.T).toarray()
+    norm_product = np.sqrt(query_norm_sq * candidate_norm_sq)
+    cosine = np.divide(dot, norm_product, out=np.zeros_like(dot), where=norm_product > 0)
+    if query_keywords is None:
+        return cosine
+
+    return _keyword_boost(
+        cosine, query_norm_sq > 0, candidate_norm_sq > 0, query_present, candidate_present, query_keywords
+    )
+
+
+# Same as pairwise_similarity, but with TF-IDF weights from an IDF table fitted on a background corpus
+# (idf holds one value per vocabulary column) instead of a two-document fit per pair.
+# Every text is then transformed once, independently of the text it is compared to.
+def pairwise_similarity_idf(
+    query_counts: scipy.sparse.csr_matrix,
+    candidate_counts: scipy.sparse.csr_matrix,
+    idf: np.ndarray,
+    query_keywords: Optional[scipy.sparse.csr_matrix] = None,
+) -> np.ndarray:
+    num_terms = len(idf)
+    query_counts = _resize(query_counts, num_terms)
+    candidate_counts = _resize(candidate_counts, num_terms)
+    query_weights = _l2_normalize(query_counts @ scipy.sparse.diags(idf))
+    candidate_weights = _l2_normalize(candidate_counts @ scipy.sparse.diags(idf))
+    cosine = (query_weights @ candidate_weights.T).toarray()
+    if query_keywords is None:
+        return cosine
+
+    query_unit = np.asarray(query_weights.getnnz(axis=1) > 0).reshape(-1, 1)
+    candidate_unit = np.asarray(candidate_weights.getnnz(axis=1) > 0).reshape(1, -1)
+    return _keyword_boost(
+        cosine, query_unit, candidate_unit, query_counts.sign(), candidate_counts.sign(), query_keywords
+    )
+
+
+# Appends the keyword vector to both sides of every pair and recomputes the cosine similarity.
+def _keyword_boost(
+    cosine: np.ndarray,
+    query_unit: np.ndarray,
+    candidate_unit: np.ndarray,
+    query_present: scipy.sparse.csr_matrix,
+    candidate_present: scipy.sparse.csr_matrix,
+    query_keywords: scipy.sparse.csr_matrix,
+) -> np.ndarray:
+    query_keywords = _resize(query_keywords, query_present.shape[1]).sign()
+    keyword_in_query = np.asarray(query_keywords.multiply(query_present).sum(axis=1)) > 0
+    keyword_in_candidate = (query_keywords @ candidate_present.T).toarray() > 0
+    return keyword_boosted_cosine(cosine, query_unit, candidate_unit, keyword_in_query | keyword_in_candidate)
+
+
+# Fused keyword boost: the cosine similarity of two l2-normalized vectors after the same l2-normalized
+# keyword vector is appended to both. The keyword vector contributes 1 to the dot product and to both
+# squared norms when any keyword term appears in the vocabulary of the pair, and 0 otherwise, so the
+# result only depends on the plain cosine, whether each vector is non-empty and whether a keyword matched.
+# Works on scalars and element-wise on arrays.
+def keyword_boosted_cosine(cosine, unit_1, unit_2, keyword):
+    keyword = np.asarray(keyword, dtype=np.float64)
+    combined = np.asarray(cosine + keyword, dtype=np.float64)
+    combined_norm = np.sqrt((unit_1 + keyword) * (unit_2 + keyword))
+    return np.divide(
+        combined, combined_norm, out=np.zeros_like(combined), where=combined_norm > 0
+    )
+
+
+# Scores a single pair of texts exactly like pairwise_similarity, from term counts alone.
+# No vectorizer is fitted and no sparse matrix is built, which makes it the cheapest path for one pair.
+def score_pair(text_1: str, text_2: str, keywords: Optional[List[str]]) -> float:
+    counts_1 = Counter(tokenize(text_1))
+    counts_2 = Counter(tokenize(text_2))
+    shared = counts_1.keys() & counts_2.keys()
+    unshared_sq = UNSHARED_IDF**2
+    dot = sum(counts_1[term] * counts_2[term] for term in shared)
+    # Squared norms: every term starts as unshared, then shared terms are discounted back to IDF 1
+    norm_1_sq = unshared_sq * sum(count * count for count in counts_1.values()) - (
+        unshared_sq - 1
+    ) * sum(counts_1[term] ** 2 for term in shared)
+    norm_2_sq = unshared_sq * sum(count * count for count in counts_2.values()) - (
+        unshared_sq - 1
+    ) * sum(counts_2[term] ** 2 for term in shared)
+    cosine = dot / math.sqrt(norm_1_sq * norm_2_sq) if norm_1_sq > 0 and norm_2_sq > 0 else 0.0
+    if keywords == None:
+        return cosine
+    keyword = any(
+        term in counts_1 or term in counts_2 for term in tokenize(" ".join(keywords))
+    )
+    return float(keyword_boosted_cosine(cosine, norm_1_sq > 0, norm_2_sq > 0, keyword))
+
+
+# Precomputed representation of an assignment: its term counts, the terms of its key phrases and
+# MinHash signatures of its shingles. This is everything the scoring path needs from the assignment,
+# so it can be cached and reused instead of re-tokenizing the same assignment text on every scan.
+class AssignmentFingerprint:
+    # Terms of the assignment text
+    terms: List[str]
+    # Number of occurrences of each term
+    counts: np.ndarray
+    # Terms of the key phrases, or None when the assignment has no key phrases
+    keyword_terms: Optional[List[str]]
+    # MinHash signature of each window of the assignment shingles
+    signatures: np.ndarray
+
+    def __init__(
+        self,
+        terms: List[str],
+        counts: np.ndarray,
+        keyword_terms: Optional[List[str]],
+        signatures: np.ndarray,
+    ):
+        self.terms = terms
+        self.counts = counts
+        self.keyword_terms = keyword_terms
+        self.signatures = signatures
+
+    # Builds the fingerprint of an assignment text and its key phrases.
+    # MinHash signatures are only needed by the pre-filter, so they can be skipped for one-off scoring.
+    @classmethod
+    def from_text(cls, text: str, keywords: Optional[List[str]], with_signatures: bool = True):
+        tokens = tokenize(text)
+        term_counts = Counter(tokens)
+        keyword_terms = None
+        if keywords != None:
+            keyword_terms = sorted(set(tokenize(" ".join(keywords))))
+        return cls(
+            list(term_counts.keys()),
+            np.fromiter(term_counts.values(), dtype=np.float64, count=len(term_counts)),
+            keyword_terms,
+            MinHash.window_signatures(MinHash.shingle_hashes(tokens if with_signatures else [])),
+        )
+
+    # Serializes the fingerprint into a JSON-compatible dictionary.
+    def to_dict(self):
+        return {
+            "terms": self.terms,
+            "counts": self.counts.tolist(),
+            "keywordTerms": self.keyword_terms,
+            "signatures": base64.b64encode(self.signatures.tobytes()).decode("ascii"),
+        }
+
+    # Rebuilds a fingerprint serialized with to_dict.
+    @classmethod
+    def from_dict(cls, data):
+        signatures = np.frombuffer(base64.b64decode(data["signatures"]), dtype=np.uint64)
+        return cls(
+            data["terms"],
+            np.asarray(data["counts"], dtype=np.float64),
+            data["keywordTerms"],
+            signatures.reshape(-1, MinHash.NUM_PERMUTATIONS),
+        )
+
+
+# Hash identifying an assignment text together with its key phrases.
+def fingerprint_key(text: str, keywords: Optional[List[str]]) -> str:
+    digest = hashlib.sha256(str(FINGERPRINT_VERSION).encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(text.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(json.dumps(keywords).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Scores an assignment fingerprint against many candidate texts, returning one score per candidate.
+# With an idf_model (see IdfModel.py), TF-IDF weights come from the model instead of a two-document fit.
+def score_fingerprint(
+    fingerprint: AssignmentFingerprint,
+    candidate_texts: Sequence[str],
+    idf_model=None,
+) -> np.ndarray:
+    candidate_tokens = [tokenize(candidate) for candidate in candidate_texts]
+    # The assignment terms take the first vocabulary indices, so its count row is used as is
+    vocabulary = {term: index for index, term in enumerate(fingerprint.terms)}
+    query_counts = scipy.sparse.csr_matrix(fingerprint.counts.reshape(1, -1))
+    candidate_counts = build_count_matrix(candidate_tokens, vocabulary)
+    query_keywords = None
+    if fingerprint.keyword_terms != None:
+        query_keywords = build_count_matrix([fingerprint.keyword_terms], vocabulary)
+    if idf_model is None:
+        return pairwise_similarity(query_counts, candidate_counts, query_keywords)[0]
+    idf = idf_model.lookup(list(vocabulary.keys()))
+    return pairwise_similarity_idf(query_counts, candidate_counts, idf, query_keywords)[0]
+
+
+# MinHash pre-filter: checks which candidate texts share at least one LSH band with a window of the assignment.
+# The check costs more than TF-IDF scoring a candidate against the whole assignment, so it only pays off
+# in front of scoring every passage window of a long assignment.
+def shares_band_with(
+    fingerprint: AssignmentFingerprint, candidate_texts: Sequence[str], rows_per_band: int
+) -> np.ndarray:
+    return np.fromiter(
+        (
+            MinHash.shares_band(
+                fingerprint.signatures,
+                MinHash.signature(MinHash.shingle_hashes(tokenize(candidate))),
+                rows_per_band,
+            )
+            for candidate in candidate_texts
+        ),
+        dtype=bool,
+        count=len(candidate_texts),
+    )
+
+
+# Scores one text against many candidate texts, returning one score per candidate.
+def score_texts(
+    text: str, candidate_texts: Sequence[str], keywords: Optional[List[str]]
+) -> np.ndarray:
+    return score_fingerprint(
+        AssignmentFingerprint.from_text(text, keywords, with_signatures=False), candidate_texts
+    )
+
+
+# Streams overlapping windows of window_words tokens, stride_words apart, over a text in chunks of at
+# most chunk_size windows. Each window is yielded with the character offset it starts at in the
+# normalized text.
+# Tokens are read lazily and only the current window is kept, so memory stays flat however long the text is.
+# A text shorter than one window yields a single window holding the whole text.
+def iter_passages(
+    text: str, window_words: int, stride_words: int, chunk_size: int = 256
+) -> Iterator[List[Tuple[int, List[str]]]]:
+    window = deque(maxlen=window_words)
+    chunk = []
+    since_last_window = 0
+    emitted = False
+    for match in TOKEN_PATTERN.finditer(normalize_text(text)):
+        window.append((match.start(), match.group().lower()))
+        since_last_window += 1
+        # Emit the first full window, then one window every stride_words tokens
+        if len(window) == window_words and (not emitted or since_last_window >= stride_words):
+            chunk.append((window[0][0], [token for _, token in window]))
+            since_last_window = 0
+            emitted = True
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    # The tail of the text is not covered by the last window, or the text is shorter than a window
+    if since_last_window > 0 and len(window) > 0:
+        chunk.append((window[0][0], [token for _, token in window]))
+    if len(chunk) > 0:
+        yield chunk
+
+
+# Passage mode: scores overlapping windows of an assignment against every candidate and keeps the best
+# window per candidate, so a verbatim copy of one question of a long assignment is not diluted by the
+# rest of the assignment. Each chunk of windows is scored against all candidates in one matrix operation.
+# Returns the best window score of each candidate and the character offset of that window.
+def score_passages(
+    text: str,
+    candidate_texts: Sequence[str],
+    keywords: Optional[List[str]],
+    window_words: int,
+    stride_words: int,
+    idf_model=None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    best_scores = np.zeros(len(candidate_texts))
+    best_offsets = np.zeros(len(candidate_texts), dtype=np.int64)
+    if len(candidate_texts) == 0:
+        return best_scores, best_offsets
+
+    vocabulary: Dict[str, int] = {}
+    candidate_counts = build_count_matrix(
+        [tokenize(candidate) for candidate in candidate_texts], vocabulary
+    )
+    keyword_terms = tokenize(" ".join(keywords)) if keywords != None else None
+    for chunk in iter_passages(text, window_words, stride_words):
+        offsets = np.array([offset for offset, _ in chunk], dtype=np.int64)
+        window_counts = build_count_matrix([tokens for _, tokens in chunk], vocabulary)
+        window_keywords = None
+        if keyword_terms != None:
+            window_keywords = build_count_matrix([keyword_terms] * len(chunk), vocabulary)
+        if idf_model is None:
+            scores = pairwise_similarity(window_counts, candidate_counts, window_keywords)
+        else:
+            idf = idf_model.lookup(list(vocabulary.keys()))
+            scores = pairwise_similarity_idf(window_counts, candidate_counts, idf, window_keywords)
+        # Best window of this chunk for every candidate, kept when it beats earlier chunks
+        chunk_best = scores.argmax(axis=0)
+        chunk_scores = scores[chunk_best, np.arange(len(candidate_texts))]
+        improved = chunk_scores > best_scores
+        best_scores[improved] = chunk_scores[improved]
+        best_offsets[improved] = offsets[chunk_best[improved]]
+    return best_scores, best_offsets
+
+
+# Scales every row of a sparse matrix to unit length, leaving empty rows empty.
+def _l2_normalize(matrix: scipy.sparse.csr_matrix) -> scipy.sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return scipy.sparse.diags(scale) @ matrix
+
+
+# Pads a sparse matrix with empty columns so matrices built against a growing vocabulary line up.
+def _resize(matrix: scipy.sparse.csr_matrix, num_terms: int) -> scipy.sparse.csr_matrix:
+    if matrix.shape[1] == num_terms:
+        return matrix
+    matrix = matrix.copy()
+    matrix.resize((matrix.shape[0], num_terms))
+    return matrix
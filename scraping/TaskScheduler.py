@@ -4,6 +4,8 @@ from redbeat import RedBeatSchedulerEntry
 
 from extensions import celery, logger
 from Chegg_Scraper import Chegg_Scraper
+from FingerprintCache import fingerprint_cache
+from AssignmentRegistry import register_assignment, unregister_assignment
 
 # Number of tries for scraping
 NUM_OF_TRIES = 5
@@ -43,6 +45,8 @@ def add_task_to_queue(assignment_id, platform, frequency, keywords, text_to_sear
 
     # Add the task
     task_to_add.save()
+    # Make the assignment part of the cross-assignment scoring of every scan
+    register_assignment(assignment_id, keywords, text_to_search)
 
 # Removes task from job queue
 def remove_task_from_queue(assignment_id, platform, frequency, keywords, text_to_search):
@@ -59,8 +63,11 @@ def remove_task_from_queue(assignment_id, platform, frequency, keywords, text_to
 
     # Delete the task
     task_to_remove.delete()
+    # The assignment is no longer scanned, so its cached fingerprint is not needed anymore
+    fingerprint_cache.invalidate(assignment_id)
+    unregister_assignment(assignment_id)
 
-# Updates task with new frequency
+# Updates task with new frequency, text to search and keywords
 def update_task_in_queue(assignment_id, platform, oldFrequency, frequency, keywords, text_to_search):
     schedule = frequency_to_crontab[frequency]
 
@@ -80,11 +87,14 @@ def update_task_in_queue(assignment_id, platform, oldFrequency, frequency, keywo
         f"{assignment_id}-scrape-{platform}-{frequency}",
         f"Tasks.scrape_{platform}",
         schedule,
-        args=(keywords, text_to_search),
+        args=(assignment_id, keywords, text_to_search),
         app=celery,
     )
     # Add the new task
     new_task.save()
+    # The text or keywords may have changed, so drop the cached fingerprint of the old ones
+    fingerprint_cache.invalidate(assignment_id)
+    register_assignment(assignment_id, keywords, text_to_search)
 
 # On-demand scan function
 def run_scan_now(assignment_id, platform, keywords, text_to_search):
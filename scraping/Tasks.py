@@ -1,27 +1,205 @@
-from extensions import celery
-from Chegg_Scraper import Chegg_Scraper
-import time
+from celery import chord
+from celery.exceptions import SoftTimeLimitExceeded
+
+from extensions import celery, logger
+from Chegg_Scraper import PLATFORM, Chegg_Scraper
+from CircuitBreaker import circuit_breaker
+from config import (
+    CAPTCHA_BACKOFF_BASE,
+    ELEMENT_MAX_RETRIES,
+    MAX_SHARDS,
+    QUESTION_SHARDING,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    SCORING_MODE,
+    SCORING_QUEUE,
+    SCRAPE_MAX_RETRIES,
+    SHARD_MAX_RETRIES,
+    SHARD_TIME_LIMIT,
+)
+from DriverPool import driver_pool
+from Pacing import backoff_delay
+from ProxyPool import proxy_pool
+from QueryPlanner import merge_search_results, split_questions
+from RateLimiter import RateLimited
+from Scraper import CAPTCHA_FAILURE, ELEMENT_FAILURE, PROXY_FAILURE
+from TextNormalizer import token_cache
+
+
+# Got help from:
+# https://docs.celeryq.dev/en/stable/userguide/tasks.html#retrying
+# Gets the number of retries a scrape that failed with the given kind of failure gets, out of max_retries.
+# A missing element usually means the layout changed, which retrying does not fix past a reprobe of the layout.
+def retry_budget(failure, max_retries: int) -> int:
+    return min(max_retries, ELEMENT_MAX_RETRIES) if failure == ELEMENT_FAILURE else max_retries
+
+
+# Gets the seconds to back off before retrying a scrape that failed retries times with the given kind of failure.
+# Captchas get a longer backoff, so the proxy has moved to another exit and the site has calmed down, and so do scrapes
+# that found no proxy, so the budget of a proxy has refilled or an ejected one is back.
+def retry_countdown(failure, retries: int) -> float:
+    base = CAPTCHA_BACKOFF_BASE if failure in (CAPTCHA_FAILURE, PROXY_FAILURE) else RETRY_BACKOFF_BASE
+    return backoff_delay(retries, base, RETRY_BACKOFF_MAX)
 
-# Number of tries for scraping
-NUM_OF_TRIES = 5
 
 # Always annotate each task using the format @<celery_instance_name>.task
-# Task for scraping Chegg
-@celery.task
-def scrape_Chegg(assignment_id, keywords, text_to_search):
+# Task for scraping Chegg. A failed scrape is rescheduled through Celery with exponential backoff instead of
+# sleeping in the task, so the worker scans other assignments while this one backs off.
+@celery.task(bind=True, max_retries=SCRAPE_MAX_RETRIES)
+def scrape_Chegg(self, assignment_id, keywords, text_to_search):
     print("Scraping Chegg")
+    # Assignments made of several questions are scanned question by question, in parallel
+    questions = split_questions(text_to_search, MAX_SHARDS) if QUESTION_SHARDING else [text_to_search]
+    # While Chegg blocks scans across the cluster, defer the scan instead of starting a browser.
+    # When the circuit is half-open and this scan is its probe, the probe passes to the shards of a sharded scan.
+    if not circuit_breaker.allow(PLATFORM):
+        countdown = circuit_breaker.retry_after(PLATFORM) + retry_countdown(CAPTCHA_FAILURE, 0)
+        defer_scan(self, assignment_id, keywords, text_to_search, countdown, "circuit open")
+        return
     # Create Chegg Scraper object
     chegg_scraper = Chegg_Scraper(keywords, text_to_search)
-    # Try scraping Chegg a total of 5 times
-    for num in range(1, NUM_OF_TRIES + 1):
-        # Scrape Chegg
+    # Scrape Chegg
+    try:
+        if len(questions) > 1:
+            scrape_Chegg_sharded(assignment_id, keywords, text_to_search, questions)
+            return
         scrape_try = chegg_scraper.scrape(assignment_id)
-        # If that scrape fails, then retry
-        # Else, end task
-        if scrape_try == False:
-            print(f"Retrying scrape: retry #{num}")
-            time.sleep(3 * num)
-            pass
-        else:
-            print("Scrape successful")
-            break
\ No newline at end of file
+    except RateLimited as e:
+        # Chegg got all the requests the workers may send for now, so hand the worker to another scan
+        circuit_breaker.release_probe(PLATFORM)
+        countdown = e.retry_after + retry_countdown(None, 0)
+        defer_scan(self, assignment_id, keywords, text_to_search, countdown, "rate limited")
+        return
+    except Exception:
+        circuit_breaker.release_probe(PLATFORM)
+        raise
+    # Time the attempt spent waiting on pages and pausing versus working
+    logger.info(
+        "Pacing of scrape #%s for assignment %s: %s",
+        self.request.retries + 1,
+        assignment_id,
+        chegg_scraper.get_pacer().report(),
+    )
+    record_circuit(chegg_scraper, scrape_try)
+    log_worker_counters(assignment_id)
+    # If that scrape fails, then retry once it backed off, else end task
+    if scrape_try == False:
+        failure = chegg_scraper.get_failure()
+        max_retries = retry_budget(failure, self.max_retries)
+        if self.request.retries >= max_retries:
+            logger.error(
+                "Giving up on assignment %s after %s tries (%s)", assignment_id, self.request.retries + 1, failure
+            )
+            return
+        countdown = retry_countdown(failure, self.request.retries)
+        print(f"Retrying scrape: retry #{self.request.retries + 1} in {countdown:.0f}s ({failure})")
+        raise self.retry(countdown=countdown, max_retries=max_retries)
+    print("Scrape successful")
+
+
+# Requeues a scan to run in countdown seconds. Deferring is not a failed try, so the scan keeps its retries.
+def defer_scan(task, assignment_id, keywords, text_to_search, countdown, reason):
+    logger.info("Deferring assignment %s by %.0fs (%s)", assignment_id, countdown, reason)
+    task.apply_async((assignment_id, keywords, text_to_search), countdown=countdown, retries=task.request.retries)
+
+
+# Records the outcome of a scrape (False when it failed) in the circuit of the platform. Only captchas count as blocked scans:
+# missing elements are the layout's fault and a lack of proxies is our own budget rather than the site blocking us,
+# so they only release the probe the scrape may hold.
+def record_circuit(chegg_scraper, scrape_try):
+    if scrape_try != False:
+        circuit_breaker.record_success(PLATFORM)
+    elif chegg_scraper.get_failure() == CAPTCHA_FAILURE:
+        circuit_breaker.record_failure(PLATFORM)
+    else:
+        circuit_breaker.release_probe(PLATFORM)
+
+
+# Logs the counters of the caches and browsers of this worker process after a scan.
+def log_worker_counters(assignment_id):
+    # Token cache counters, for sizing SCRAPER_TOKEN_CACHE_SIZE
+    logger.info("Token cache after scanning assignment %s: %s", assignment_id, token_cache.info())
+    # Browser counters (drivers alive, pages, memory, recycled drivers and killed orphans) of this worker process
+    logger.info("Driver pool after scanning assignment %s: %s", assignment_id, driver_pool.info())
+    # Health, budget and leases of every proxy, shared by all workers
+    logger.info("Proxy pool after scanning assignment %s: %s", assignment_id, proxy_pool.info())
+    logger.info("Circuit of %s after scanning assignment %s: %s", PLATFORM, assignment_id, circuit_breaker.info(PLATFORM))
+
+# Task for scoring the search results scraped by scrape_Chegg. Routed to the scoring queue (see extensions.py),
+# so CPU-bound scoring runs on its own worker pool and never holds up a browser session.
+@celery.task
+def score_Chegg(assignment_id, keywords, text_to_search, search_results):
+    chegg_scraper = Chegg_Scraper(keywords, text_to_search)
+    chegg_scraper.post_scan_results(chegg_scraper.build_scan_results(search_results, assignment_id))
+    logger.info("Token cache after scoring assignment %s: %s", assignment_id, token_cache.info())
+
+
+# Got help from:
+# https://docs.celeryq.dev/en/stable/userguide/canvas.html#chords
+# Scans every question of an assignment as its own subtask on any scan worker, then scores the search results
+# of all of them against the whole assignment in a single batch and posts them together.
+def scrape_Chegg_sharded(assignment_id, keywords, text_to_search, questions):
+    logger.info("Scanning assignment %s as %s question shards", assignment_id, len(questions))
+    # The scoring queue only has workers when scoring is offloaded, else the scan workers score
+    score_queue = SCORING_QUEUE if SCORING_MODE == "queue" else celery.conf.task_default_queue
+    # The key phrases are the same for every question, so only the first shard searches for them
+    chord(
+        scrape_Chegg_shard.s(assignment_id, keywords, question, idx == 0) for idx, question in enumerate(questions)
+    )(score_Chegg_shards.s(assignment_id, keywords, text_to_search).set(queue=score_queue))
+
+
+# Task scraping the search results of one question of an assignment, with its own time limit and retries.
+# A shard that keeps failing returns no search results rather than failing, so the other shards still get scored.
+@celery.task(bind=True, soft_time_limit=SHARD_TIME_LIMIT, max_retries=SHARD_MAX_RETRIES)
+def scrape_Chegg_shard(self, assignment_id, keywords, question, search_key_phrases=True):
+    # The scan was let through the circuit (as its probe when it was half-open), so shards only wait when it opened since
+    if circuit_breaker.is_open(PLATFORM):
+        if self.request.retries >= self.max_retries:
+            logger.error("Circuit of %s still open, dropping shard of assignment %s", PLATFORM, assignment_id)
+            return []
+        raise self.retry(countdown=circuit_breaker.retry_after(PLATFORM) + retry_countdown(CAPTCHA_FAILURE, 0))
+    chegg_scraper = Chegg_Scraper(keywords, question)
+    chegg_scraper.set_search_key_phrases(search_key_phrases)
+    try:
+        search_results = chegg_scraper.collect(assignment_id)
+    except SoftTimeLimitExceeded:
+        logger.error("Shard of assignment %s ran out of time", assignment_id)
+        circuit_breaker.release_probe(PLATFORM)
+        return []
+    except RateLimited as e:
+        circuit_breaker.release_probe(PLATFORM)
+        # The chord waits on this task, so it retries rather than being requeued as a new one
+        if self.request.retries >= self.max_retries:
+            logger.error("Shard of assignment %s still rate limited, dropping it", assignment_id)
+            return []
+        raise self.retry(countdown=e.retry_after + retry_countdown(None, 0))
+    except Exception:
+        # Failing would fail the chord and lose the search results of every other shard
+        logger.exception("Shard of assignment %s failed", assignment_id)
+        circuit_breaker.release_probe(PLATFORM)
+        return []
+    logger.info("Pacing of shard of assignment %s: %s", assignment_id, chegg_scraper.get_pacer().report())
+    record_circuit(chegg_scraper, search_results is not None)
+    if search_results is not None:
+        return search_results
+    failure = chegg_scraper.get_failure()
+    max_retries = retry_budget(failure, self.max_retries)
+    if self.request.retries >= max_retries:
+        logger.error("Shard of assignment %s failed %s times (%s)", assignment_id, self.request.retries + 1, failure)
+        return []
+    countdown = retry_countdown(failure, self.request.retries)
+    print(f"Retrying shard: retry #{self.request.retries + 1} in {countdown:.0f}s ({failure})")
+    raise self.retry(countdown=countdown, max_retries=max_retries)
+
+
+# Task scoring the search results of every shard of a scan against the whole assignment and posting them.
+@celery.task
+def score_Chegg_shards(shard_search_results, assignment_id, keywords, text_to_search):
+    # Questions of the same assignment often find the same pages
+    search_results = merge_search_results(shard_search_results)
+    if len(search_results) == 0:
+        logger.error("No shard of assignment %s found search results", assignment_id)
+        return
+    chegg_scraper = Chegg_Scraper(keywords, text_to_search)
+    chegg_scraper.post_scan_results(chegg_scraper.build_scan_results(search_results, assignment_id))
+    logger.info("Token cache after scoring assignment %s: %s", assignment_id, token_cache.info())
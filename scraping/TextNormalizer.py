@@ -0,0 +1,101 @@
+import hashlib
+import html
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Tuple
+
+from config import TOKEN_CACHE_SIZE
+
+# Token pattern used by scikit-learn's TfidfVectorizer by default (applied after lowercasing)
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+# HTML tags left in scraped text. Only real tag names are matched, so inequalities like "a < b" survive.
+HTML_TAG_PATTERN = re.compile(
+    r"</?(?:a|b|br|code|div|em|h[1-6]|i|img|li|ol|p|pre|span|strong|sub|sup|table|tbody|td|th|thead|tr|u|ul)"
+    r"(?:\s+[\w-]+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s>]+))?)*\s*/?>",
+    re.IGNORECASE,
+)
+# LaTeX commands such as \frac or \alpha, reduced to their name so "\alpha" matches a written "alpha"
+LATEX_COMMAND_PATTERN = re.compile(r"\\([a-zA-Z]+)")
+# LaTeX delimiters and grouping characters, which separate words but carry no meaning themselves
+LATEX_SYNTAX_PATTERN = re.compile(r"[$\\{}^_]")
+# Interface text the question pages wrap around the question itself
+PAGE_BOILERPLATE_PATTERN = re.compile(
+    r"\b(?:show transcribed image text|transcribed image text|copy code|expert-verified|see answer)\b",
+    re.IGNORECASE,
+)
+# Runs of whitespace, including the non-breaking spaces scraped text is full of
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+# Normalizes scraped or stored text before tokenization: decodes HTML entities and strips HTML tags,
+# folds compatibility characters (ligatures, full-width letters, superscript digits) with NFKC,
+# reduces LaTeX markup to plain words, drops page boilerplate and collapses whitespace.
+def normalize_text(text: str) -> str:
+    text = html.unescape(HTML_TAG_PATTERN.sub(" ", text))
+    text = unicodedata.normalize("NFKC", text)
+    text = LATEX_COMMAND_PATTERN.sub(r" \1 ", text)
+    text = LATEX_SYNTAX_PATTERN.sub(" ", text)
+    text = PAGE_BOILERPLATE_PATTERN.sub(" ", text)
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+# Least recently used memo of tokenized texts, keyed by a hash of the text so large texts are not kept as keys.
+# Shared by every thread of the worker process, with hit and miss counters for sizing it.
+class TokenCache:
+    # Maximum number of tokenized texts kept
+    __maxsize: int
+    # Tokens of each text, least recently used first
+    __entries: "OrderedDict[bytes, Tuple[str, ...]]"
+    # Number of lookups answered from the cache
+    __hits: int
+    # Number of lookups that had to tokenize
+    __misses: int
+    # Guards the entries and counters
+    __lock: threading.Lock
+
+    def __init__(self, maxsize: int):
+        self.__maxsize = maxsize
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    # Gets the normalized tokens of a text, tokenizing it only if it was not seen recently.
+    def tokenize(self, text: str) -> Tuple[str, ...]:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self.__lock:
+            tokens = self.__entries.get(key)
+            if tokens is not None:
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                return tokens
+            self.__misses += 1
+        tokens = tuple(TOKEN_PATTERN.findall(normalize_text(text).lower()))
+        with self.__lock:
+            self.__entries[key] = tokens
+            if len(self.__entries) > self.__maxsize:
+                self.__entries.popitem(last=False)
+        return tokens
+
+    # Gets the hit and miss counters and the current size of the cache.
+    def info(self):
+        with self.__lock:
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "size": len(self.__entries),
+                "maxsize": self.__maxsize,
+            }
+
+    # Empties the cache and resets its counters.
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+
+# Token cache of this worker process
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
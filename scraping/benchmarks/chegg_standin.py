@@ -0,0 +1,217 @@
+import argparse
+import html
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from Pacing import draw_delay
+
+# Got help from:
+# https://docs.python.org/3/library/http.server.html
+# https://developer.mozilla.org/en-US/docs/Web/HTTP/Proxy_servers_and_tunneling (absolute-form request targets)
+
+# Local stand-in for Chegg serving recorded search and question pages, so scans can be benchmarked and
+# regression-tested without the live site or the proxy. Point the scraper at it with either
+# SCRAPER_CHEGG_BASE_URL=http://127.0.0.1:<port> and SCRAPER_PROXY_SERVER= (empty), or
+# SCRAPER_PROXY_SERVER=127.0.0.1:<port> and SCRAPER_CHEGG_BASE_URL=http://www.chegg.com (plain HTTP only).
+# Run from the scraping directory:
+# python -m benchmarks.chegg_standin [--pages recorded_pages] [--latency 0.2] [--captcha-rate 0.1]
+
+# Path of the search page, which is served for every query
+SEARCH_PATH = "/search"
+# Challenge page answered instead of the page when a captcha is injected, as served by the bot protection
+CAPTCHA_PAGE = "<html><body><div id='px-captcha'></div><p>Please verify you are a human</p></body></html>"
+# Seconds an injected timeout keeps the connection waiting, longer than any scraper timeout
+DEFAULT_HANG_SECONDS = 30.0
+
+
+# Loads recorded pages from a directory mirroring the URL paths of the site, e.g. search.html for the search
+# page and homework-help/<question>.html for a question page, as saved from the page_source of the browser.
+def load_recorded_pages(directory: str) -> Dict[str, str]:
+    pages = {}
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            if not file_name.endswith(".html"):
+                continue
+            file_path = os.path.join(root, file_name)
+            url_path = "/" + os.path.relpath(file_path, directory)[: -len(".html")].replace(os.sep, "/")
+            with open(file_path, encoding="utf-8") as page_file:
+                pages[url_path] = page_file.read()
+    return pages
+
+
+# Builds pages in the markup of the old Chegg layout for a list of question texts: a search page listing
+# every question as a Solutions result with its snippet, and one question page per question.
+def build_pages(questions: List[str], snippet_words: int = 30) -> Dict[str, str]:
+    results = []
+    pages = {}
+    for position, question in enumerate(questions, start=1):
+        path = f"/homework-help/question-{position}"
+        snippet = " ".join(question.split()[:snippet_words])
+        results.append(
+            f"<div><a data-test='section-1-serp-result-{position}-study-link' href='{path}'>Question {position}</a>"
+            f"<span data-test='section-1-serp-result-{position}-study-question'>{html.escape(snippet)}</span></div>"
+        )
+        pages[path] = (
+            "<html><body><h1>Question</h1>"
+            f"<div data-test='qna-question-body'><p>{html.escape(question)}</p></div></body></html>"
+        )
+    pages[SEARCH_PATH] = (
+        "<html><body><a data-test='search-tabs-link-study' href='#'>Solutions</a>"
+        f"<div data-test='search-result-count-line'>{len(questions)} results</div>"
+        f"{''.join(results)}</body></html>"
+    )
+    return pages
+
+
+# HTTP stand-in for Chegg with tunable latency and injected captchas and timeouts. Each request is delayed by
+# a log-normal latency, then answered with a captcha with probability captcha_rate, left waiting for
+# hang_seconds with probability timeout_rate, or else answered with its page.
+class CheggStandIn:
+    # Recorded pages by URL path
+    __pages: Dict[str, str]
+    # Mean latency of a response in seconds
+    __latency: float
+    # Sigma of the log-normal latency
+    __latency_spread: float
+    # Probability of answering with a captcha
+    __captcha_rate: float
+    # Probability of leaving a request waiting
+    __timeout_rate: float
+    # Seconds an injected timeout keeps the connection waiting
+    __hang_seconds: float
+    # Random source of the injected latencies and faults
+    __random: random.Random
+    # Lock of the random source and counters, shared by the request threads
+    __lock: threading.Lock
+    # Number of requests answered with a page, a captcha, a timeout or not found
+    __counts: Dict[str, int]
+    # HTTP server, while the stand-in is running
+    __server: Optional[ThreadingHTTPServer]
+
+    def __init__(
+        self,
+        pages: Dict[str, str],
+        latency: float = 0.0,
+        latency_spread: float = 0.5,
+        captcha_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = DEFAULT_HANG_SECONDS,
+        seed: Optional[int] = None,
+    ):
+        self.__pages = pages
+        self.__latency = latency
+        self.__latency_spread = latency_spread
+        self.__captcha_rate = captcha_rate
+        self.__timeout_rate = timeout_rate
+        self.__hang_seconds = hang_seconds
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__counts = {"pages": 0, "captchas": 0, "timeouts": 0, "notFound": 0}
+        self.__server = None
+
+    # Starts serving in a background thread, on a free port unless one is given, and returns the base URL.
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin.respond(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self.get_url()
+
+    # Stops serving.
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    # Gets the base URL the stand-in serves on.
+    def get_url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # Gets the number of requests answered with a page, a captcha, a timeout or not found.
+    def get_counts(self) -> Dict[str, int]:
+        with self.__lock:
+            return dict(self.__counts)
+
+    # Answers a request after its latency, with its page or an injected fault. Requests sent to the stand-in
+    # as a proxy have an absolute URL as their target, which is served by its path alike.
+    def respond(self, request: BaseHTTPRequestHandler):
+        path = urlsplit(request.path).path.rstrip("/") or "/"
+        with self.__lock:
+            latency = draw_delay("lognormal", self.__latency, self.__latency_spread, self.__random)
+            fault = self.__random.random()
+        time.sleep(latency)
+        if fault < self.__captcha_rate:
+            self.__count("captchas")
+            self.__send(request, 403, CAPTCHA_PAGE)
+        elif fault < self.__captcha_rate + self.__timeout_rate:
+            self.__count("timeouts")
+            time.sleep(self.__hang_seconds)
+            self.__send(request, 504, "<html><body>Gateway Timeout</body></html>")
+        elif path in self.__pages:
+            self.__count("pages")
+            self.__send(request, 200, self.__pages[path])
+        else:
+            self.__count("notFound")
+            self.__send(request, 404, "<html><body>Not Found</body></html>")
+
+    def __count(self, outcome: str):
+        with self.__lock:
+            self.__counts[outcome] += 1
+
+    @staticmethod
+    def __send(request: BaseHTTPRequestHandler, status: int, body: str):
+        try:
+            request.send_response(status)
+            request.send_header("Content-Type", "text/html; charset=utf-8")
+            request.send_header("Content-Length", str(len(body.encode("utf-8"))))
+            request.end_headers()
+            request.wfile.write(body.encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            # The scraper gave up on the request first, e.g. after an injected timeout
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded Chegg pages locally.")
+    parser.add_argument("--pages", required=True, help="Directory of recorded pages (see load_recorded_pages)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to serve on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to serve on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean latency of a response in seconds")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Probability of answering with a captcha")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Probability of leaving a request waiting")
+    parser.add_argument("--seed", type=int, help="Seed of the injected latencies and faults")
+    args = parser.parse_args()
+
+    standin = CheggStandIn(
+        load_recorded_pages(args.pages),
+        latency=args.latency,
+        captcha_rate=args.captcha_rate,
+        timeout_rate=args.timeout_rate,
+        seed=args.seed,
+    )
+    print(f"Serving {args.pages} on {standin.start(args.host, args.port)}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print(f"Requests: {standin.get_counts()}")
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
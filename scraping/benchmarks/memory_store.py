@@ -0,0 +1,183 @@
+import redis
+
+# Got help from:
+# https://redis.io/commands/ (replies of each command with decode_responses on)
+
+
+# In-memory stand-in for the Redis commands used by the shared caches, pools and limiters, so the tests and
+# the benchmarks never touch Redis. Values are kept as strings like Redis returns them, and keys expire on
+# a clock that only moves when now is changed.
+class MemoryStore:
+    def __init__(self):
+        # Current time in seconds, moved forward by tests
+        self.now = 0
+        self.__values = {}
+        self.__expiries = {}
+
+    def __expire_keys(self):
+        for key, expiry in list(self.__expiries.items()):
+            if expiry <= self.now:
+                self.__values.pop(key, None)
+                self.__expiries.pop(key)
+
+    def __hash(self, key):
+        self.__expire_keys()
+        return self.__values.setdefault(key, {})
+
+    def get(self, key):
+        self.__expire_keys()
+        return self.__values.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        self.__expire_keys()
+        if nx and key in self.__values:
+            return None
+        self.__values[key] = str(value)
+        self.__expiries.pop(key, None)
+        if ex is not None:
+            self.__expiries[key] = self.now + ex
+        return True
+
+    def getset(self, key, value):
+        previous = self.get(key)
+        self.set(key, value)
+        return previous
+
+    def exists(self, *keys):
+        self.__expire_keys()
+        return sum(key in self.__values for key in keys)
+
+    def ttl(self, key):
+        self.__expire_keys()
+        if key not in self.__values:
+            return -2
+        return self.__expiries[key] - self.now if key in self.__expiries else -1
+
+    def delete(self, *keys):
+        deleted = 0
+        for key in keys:
+            deleted += self.__values.pop(key, None) is not None
+            self.__expiries.pop(key, None)
+        return deleted
+
+    def expire(self, key, ttl):
+        self.__expire_keys()
+        if key not in self.__values:
+            return False
+        self.__expiries[key] = self.now + ttl
+        return True
+
+    def incr(self, key):
+        return self.incrby(key, 1)
+
+    def decr(self, key):
+        return self.incrby(key, -1)
+
+    def incrby(self, key, amount):
+        self.__expire_keys()
+        value = int(self.__values.get(key, 0)) + amount
+        self.__values[key] = str(value)
+        return value
+
+    def hincrby(self, key, field, amount):
+        counters = self.__hash(key)
+        counters[field] = str(int(counters.get(field, 0)) + amount)
+        return int(counters[field])
+
+    def hincrbyfloat(self, key, field, amount):
+        counters = self.__hash(key)
+        counters[field] = str(float(counters.get(field, 0)) + amount)
+        return float(counters[field])
+
+    def hset(self, key, mapping):
+        fields = self.__hash(key)
+        added = sum(field not in fields for field in mapping)
+        fields.update({field: str(value) for field, value in mapping.items()})
+        return added
+
+    def hmget(self, key, fields):
+        self.__expire_keys()
+        values = self.__values.get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hgetall(self, key):
+        self.__expire_keys()
+        return dict(self.__values.get(key, {}))
+
+    def zadd(self, key, mapping):
+        members = self.__hash(key)
+        added = sum(member not in members for member in mapping)
+        members.update({member: float(score) for member, score in mapping.items()})
+        return added
+
+    def zrem(self, key, *members):
+        self.__expire_keys()
+        stored = self.__values.get(key, {})
+        return sum(stored.pop(member, None) is not None for member in members)
+
+    def zremrangebyscore(self, key, min_score, max_score):
+        self.__expire_keys()
+        stored = self.__values.get(key, {})
+        removed = [member for member, score in stored.items() if float(min_score) <= score <= float(max_score)]
+        for member in removed:
+            del stored[member]
+        return len(removed)
+
+    def zcard(self, key):
+        self.__expire_keys()
+        return len(self.__values.get(key, {}))
+
+    def time(self):
+        return int(self.now), int(round((self.now - int(self.now)) * 1000000))
+
+    # Got help from:
+    # https://github.com/scoder/lupa
+    # Registers a Lua script the way Redis runs it, with redis.call bound to the commands above.
+    # Needs the lupa package, which only the tests of scripts use.
+    def register_script(self, script):
+        import lupa
+
+        runtime = lupa.LuaRuntime(unpack_returned_tuples=False)
+        commands = {
+            "TIME": lambda: [str(part) for part in self.time()],
+            "HMGET": lambda key, *fields: self.hmget(key, list(fields)),
+            "HSET": lambda key, *pairs: self.hset(key, dict(zip(pairs[::2], pairs[1::2]))),
+            "EXPIRE": lambda key, ttl: int(self.expire(key, int(ttl))),
+            "GET": self.get,
+            "DEL": self.delete,
+        }
+
+        # Lua tables are 1-based, and Redis turns Lua numbers into integers and nil into a missing value
+        def to_lua(reply):
+            if isinstance(reply, list):
+                return runtime.table_from({idx + 1: to_lua(item) for idx, item in enumerate(reply)})
+            return False if reply is None else reply
+
+        def to_python(reply):
+            if lupa.lua_type(reply) == "table":
+                return [to_python(reply[idx]) for idx in range(1, len(reply) + 1)]
+            if isinstance(reply, float):
+                return int(reply)
+            return reply
+
+        def call(command, *args):
+            return to_lua(commands[command.upper()](*args))
+
+        function = runtime.eval("function(redis, KEYS, ARGV) " + script + " end")
+
+        def run(keys=(), args=()):
+            redis_table = runtime.table_from({"call": lambda command, *call_args: call(command, *call_args)})
+            return to_python(
+                function(redis_table, runtime.table_from(list(keys)), runtime.table_from([str(arg) for arg in args]))
+            )
+
+        return run
+
+
+# Stand-in for Redis when it is down, failing every command.
+class BrokenStore:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.exceptions.ConnectionError("Redis is down")
+
+        return fail
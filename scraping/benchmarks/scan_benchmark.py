@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from selenium.common.exceptions import WebDriverException
+
+import Chegg_Scraper as chegg
+import Scraper as scraper_module
+from BrowserWatchdog import process_tree_rss
+from Chegg_Scraper import Chegg_Scraper
+from config import LAYOUT_CACHE_TTL, LAYOUT_REPROBE_FAILURES
+from DriverPool import driver_pool
+from LayoutCache import LayoutCache
+from ProxyPool import ProxyPool
+from RateLimiter import RateLimiter
+from Similarity import AssignmentFingerprint
+from benchmarks.chegg_standin import CheggStandIn, build_pages, load_recorded_pages
+from benchmarks.memory_store import MemoryStore
+from benchmarks.similarity_benchmark import SyntheticCorpus, git_commit
+
+# End-to-end benchmark of Chegg scans against the offline stand-in of chegg_standin.py: scans per minute,
+# latency of every stage of a scan and memory of the worker and its browser. No live site, proxy or Redis is used:
+# the proxy pool is empty, requests are not rate limited, the layout cache is kept in memory and fingerprints
+# are computed on every scan, as on a cache miss, so a benchmark never changes what the workers have cached.
+# Run from the scraping directory:
+# python -m benchmarks.scan_benchmark --output scan_results.json [--browser] [--latency 0.2] [--compare baseline.json]
+
+# Range of the number of words in each synthetic question
+QUESTION_SIZE_RANGE = (40, 150)
+# Questions of the stand-in copied into each synthetic assignment
+COPIED_QUESTIONS = 2
+# Words of each synthetic assignment not copied from the stand-in
+ASSIGNMENT_FILLER_WORDS = 100
+
+
+# Chegg scraper recording how long every stage of its scans takes, pointed at the stand-in.
+# The stand-in only serves the old layout, so the new layout is never probed.
+class StageTimedScraper(Chegg_Scraper):
+    def __init__(self, keywords, text_to_search, base_url: str, browser: bool, stage_seconds):
+        super(StageTimedScraper, self).__init__(keywords, text_to_search)
+        self.set_base_url(base_url)
+        self.__browser = browser
+        self.__stage_seconds = stage_seconds
+        # Search results of the last scan, None when it failed
+        self.search_results = None
+
+    def timed(self, stage: str, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.__stage_seconds[stage].append(time.perf_counter() - start)
+
+    def scrape_http(self, assignment_id):
+        return False if self.__browser else super(StageTimedScraper, self).scrape_http(assignment_id)
+
+    def get_fingerprint(self, assignment_id):
+        return AssignmentFingerprint.from_text(self.get_text_to_search(), self.get_keywords())
+
+    def scrape_new_site(self, assignment_id):
+        return False
+
+    def fetch_page(self, url: str):
+        stage = "searchPage" if "/search?" in url else "resultPage"
+        return self.timed(stage, super(StageTimedScraper, self).fetch_page, url)
+
+    def search_old_site(self, query: str):
+        return self.timed("searchPage", super(StageTimedScraper, self).search_old_site, query)
+
+    def scrape_result_tabs(self, result_urls, search_results, assignment_id):
+        return self.timed(
+            "resultTabs", super(StageTimedScraper, self).scrape_result_tabs, result_urls, search_results, assignment_id
+        )
+
+    def select_search_results(self, search_page_results, assignment_id):
+        return self.timed(
+            "snippetSelection", super(StageTimedScraper, self).select_search_results, search_page_results, assignment_id
+        )
+
+    # Scores the search results like a scoring worker would, without posting them to the API
+    def submit_search_results(self, search_results, assignment_id):
+        self.search_results = search_results
+        self.timed(
+            "scoring",
+            lambda: self.calc_fingerprint_similarity_batch(
+                self.get_fingerprint(assignment_id), [result["text"] for result in search_results]
+            ),
+        )
+
+
+# Gets throughput and latency percentiles in milliseconds of a list of durations in seconds.
+def summarize(seconds):
+    seconds = np.array(seconds)
+    return {
+        "count": int(len(seconds)),
+        "p50Ms": float(np.percentile(seconds, 50) * 1000),
+        "p99Ms": float(np.percentile(seconds, 99) * 1000),
+        "totalSeconds": float(seconds.sum()),
+    }
+
+
+# Runs scans of synthetic assignments, one after the other like a scan worker, against the stand-in.
+def run(standin: CheggStandIn, questions, num_scans: int, browser: bool, seed: int):
+    corpus = SyntheticCorpus(seed)
+    rng = random.Random(seed)
+    stage_seconds = defaultdict(list)
+    scan_seconds = []
+    peak_rss = 0
+    succeeded = 0
+    opened = 0
+    start = time.perf_counter()
+    for assignment_id in range(num_scans):
+        copied = rng.sample(questions, min(COPIED_QUESTIONS, len(questions)))
+        text = " ".join(copied + corpus.words(ASSIGNMENT_FILLER_WORDS))
+        scraper = StageTimedScraper(None, text, standin.get_url(), browser, stage_seconds)
+        scan_start = time.perf_counter()
+        try:
+            if scraper.scrape(assignment_id) != False and scraper.search_results is not None:
+                succeeded += 1
+                opened += len(scraper.search_results)
+        except WebDriverException as e:
+            # HTTP runs fall back to the browser on captchas and timeouts, which may not be installed
+            print(f"scan {assignment_id + 1}/{num_scans} could not start the browser: {e.msg}")
+        scan_seconds.append(time.perf_counter() - scan_start)
+        peak_rss = max(peak_rss, process_tree_rss(os.getpid()))
+        print(f"scan {assignment_id + 1}/{num_scans} {scan_seconds[-1]:.2f}s pacing={scraper.get_pacer().report()}")
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "scansPerMinute": float(num_scans / elapsed * 60),
+        "succeededScans": succeeded,
+        "openedResultsPerScan": float(opened / max(succeeded, 1)),
+        "scan": summarize(scan_seconds),
+        "stages": {stage: summarize(seconds) for stage, seconds in stage_seconds.items()},
+        "peakRssMB": round(peak_rss / 2 ** 20, 1),
+        "standIn": standin.get_counts(),
+    }
+    if browser:
+        report["driverPool"] = driver_pool.info()
+    return report
+
+
+# Prints the change in throughput, latency of every stage and memory against a previous results file.
+def compare(report, baseline_path: str):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = baseline["report"]
+    print(f"\nCompared to {baseline_path} ({baseline.get('commit')}):")
+    print(f"{'scans/min':>18} {(report['scansPerMinute'] / previous['scansPerMinute'] - 1) * 100:+.1f}%")
+    for stage, result in report["stages"].items():
+        old = previous["stages"].get(stage)
+        if old is not None:
+            print(f"{stage:>18} p50 {(result['p50Ms'] / old['p50Ms'] - 1) * 100:+.1f}%")
+    print(f"{'peak RSS':>18} {(report['peakRssMB'] / max(previous['peakRssMB'], 1e-9) - 1) * 100:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Chegg scans against an offline stand-in.")
+    parser.add_argument("--scans", type=int, default=20, help="Scans to run")
+    parser.add_argument("--results", type=int, default=10, help="Search results of the synthetic search page")
+    parser.add_argument("--pages", help="Directory of recorded pages to serve instead of synthetic ones")
+    parser.add_argument("--browser", action="store_true", help="Scrape with Chrome instead of the HTTP fast path")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean latency of the stand-in in seconds")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Probability of a captcha per request")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Probability of a timeout per request")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic pages, assignments and faults")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON results file of a previous run to compare against")
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(args.seed)
+    rng = random.Random(args.seed)
+    questions = [" ".join(corpus.words(rng.randint(*QUESTION_SIZE_RANGE))) for _ in range(args.results)]
+    pages = load_recorded_pages(args.pages) if args.pages else build_pages(questions)
+    standin = CheggStandIn(
+        pages,
+        latency=args.latency,
+        captcha_rate=args.captcha_rate,
+        timeout_rate=args.timeout_rate,
+        seed=args.seed,
+    )
+    standin.start()
+    chegg.layout_cache = LayoutCache(MemoryStore(), LAYOUT_CACHE_TTL, LAYOUT_REPROBE_FAILURES)
+    # Connect to the stand-in directly, as fast as it answers
+    chegg.proxy_pool = ProxyPool(MemoryStore(), [])
+    scraper_module.rate_limiter = RateLimiter(MemoryStore(), rate=0)
+    try:
+        report = run(standin, questions, args.scans, args.browser, args.seed)
+    finally:
+        standin.stop()
+    print(json.dumps(report, indent=2))
+
+    results = {
+        "commit": git_commit(),
+        "time": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "mode": "browser" if args.browser else "http",
+        "arguments": vars(args),
+        "report": report,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from Chegg_Scraper import Chegg_Scraper
+from Similarity import AssignmentFingerprint
+
+# Benchmark of the similarity scoring path. Runs fully offline: no browser, proxy or Redis is used.
+# Run from the scraping directory:
+# python -m benchmarks.similarity_benchmark --output bench_results.json [--compare baseline.json]
+
+# Number of words in each synthetic assignment
+ASSIGNMENT_SIZES = [100, 1000, 5000, 20000]
+# Number of key phrases of each synthetic assignment
+KEY_PHRASE_COUNTS = [0, 5, 50]
+# Number of scraped question texts scored against each assignment
+CANDIDATES_PER_ASSIGNMENT = 10
+# Range of the number of words in each scraped question text
+CANDIDATE_SIZE_RANGE = (50, 500)
+# Number of distinct words in the synthetic vocabulary
+VOCABULARY_SIZE = 20000
+
+
+# Generates synthetic assignments and scraped question texts with a Zipf-like word distribution.
+# Half of the scraped texts contain a passage copied from the assignment, like a posted question would.
+class SyntheticCorpus:
+    def __init__(self, seed: int):
+        self.__random = random.Random(seed)
+        self.__vocabulary = [f"w{idx}x" for idx in range(VOCABULARY_SIZE)]
+        ranks = np.arange(1, VOCABULARY_SIZE + 1)
+        self.__weights = list(1 / ranks)
+
+    def words(self, count: int):
+        return self.__random.choices(self.__vocabulary, weights=self.__weights, k=count)
+
+    def assignment(self, num_words: int, num_key_phrases: int):
+        words = self.words(num_words)
+        key_phrases = [" ".join(self.words(self.__random.randint(1, 3))) for _ in range(num_key_phrases)]
+        return " ".join(words), key_phrases
+
+    def candidates(self, assignment: str, count: int):
+        assignment_words = assignment.split()
+        candidates = []
+        for idx in range(count):
+            num_words = self.__random.randint(*CANDIDATE_SIZE_RANGE)
+            words = self.words(num_words)
+            if idx % 2 == 0:
+                start = self.__random.randint(0, max(len(assignment_words) - num_words, 0))
+                copied = assignment_words[start : start + num_words // 2]
+                words[: len(copied)] = copied
+            candidates.append(" ".join(words))
+        return candidates
+
+    # Scraped question texts sharing nothing with the assignment, like most pages a scan finds
+    def unrelated_candidates(self, count: int):
+        return [" ".join(self.words(self.__random.randint(*CANDIDATE_SIZE_RANGE))) for _ in range(count)]
+
+
+# Times repeated calls of a function, returning throughput, latency percentiles and peak traced memory.
+# Memory is traced on one separate call, since tracing slows down every allocation it sees.
+def measure(function, repeat: int):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies = np.array(latencies)
+    return {
+        "callsPerSecond": float(len(latencies) / latencies.sum()),
+        "p50Ms": float(np.percentile(latencies, 50) * 1000),
+        "p99Ms": float(np.percentile(latencies, 99) * 1000),
+        "peakMemoryBytes": int(peak_memory),
+    }
+
+
+# Runs every scoring path on every assignment size and key phrase count.
+def run(repeat: int, seed: int):
+    corpus = SyntheticCorpus(seed)
+    results = []
+    for num_words in ASSIGNMENT_SIZES:
+        for num_key_phrases in KEY_PHRASE_COUNTS:
+            text, key_phrases = corpus.assignment(num_words, num_key_phrases)
+            keywords = key_phrases if num_key_phrases > 0 else None
+            candidates = corpus.candidates(text, CANDIDATES_PER_ASSIGNMENT)
+            unrelated = corpus.unrelated_candidates(CANDIDATES_PER_ASSIGNMENT)
+            scraper = Chegg_Scraper(keywords, text)
+            fingerprint = AssignmentFingerprint.from_text(text, keywords)
+            cases = {
+                # One pair per call, once for every candidate, like the original per-result scoring
+                "pairwise": lambda: [
+                    scraper.calc_text_similarity(text, candidate, keywords) for candidate in candidates
+                ],
+                "batch": lambda: scraper.calc_text_similarity_batch(text, candidates, keywords),
+                "fingerprint": lambda: AssignmentFingerprint.from_text(text, keywords),
+                "cachedFingerprintBatch": lambda: scraper.calc_fingerprint_similarity_batch(
+                    fingerprint, candidates
+                ),
+                "passageBatch": lambda: scraper.calc_passage_similarity_batch(text, candidates, keywords),
+                # Passage scoring behind the MinHash pre-filter, against the same candidates and unrelated ones
+                "prefilteredPassageBatch": lambda: scraper.calc_prefiltered_passage_similarity_batch(
+                    fingerprint, candidates, keywords
+                ),
+                "unrelatedPassageBatch": lambda: scraper.calc_passage_similarity_batch(text, unrelated, keywords),
+                "prefilteredUnrelatedPassageBatch": lambda: scraper.calc_prefiltered_passage_similarity_batch(
+                    fingerprint, unrelated, keywords
+                ),
+            }
+            for name, function in cases.items():
+                result = measure(function, repeat)
+                result.update(
+                    {
+                        "case": name,
+                        "assignmentWords": num_words,
+                        "keyPhrases": num_key_phrases,
+                        "candidates": len(candidates),
+                    }
+                )
+                results.append(result)
+                print(
+                    f"{name:>32} words={num_words:<6} phrases={num_key_phrases:<3}"
+                    f" {result['callsPerSecond']:>10.1f} calls/s"
+                    f" p50={result['p50Ms']:.2f}ms p99={result['p99Ms']:.2f}ms"
+                    f" peak={result['peakMemoryBytes'] / 1024:.0f}KiB"
+                )
+    return results
+
+
+# Gets the commit the benchmark ran on, if the scraper is inside a git checkout.
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Prints the change in p50 latency and peak memory of every case against a previous results file.
+def compare(results, baseline_path: str):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    key = lambda result: (result["case"], result["assignmentWords"], result["keyPhrases"])
+    previous = {key(result): result for result in baseline["results"]}
+    print(f"\nCompared to {baseline_path} ({baseline.get('commit')}):")
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        print(
+            f"{result['case']:>32} words={result['assignmentWords']:<6} phrases={result['keyPhrases']:<3}"
+            f" p50 {(result['p50Ms'] / old['p50Ms'] - 1) * 100:+.1f}%"
+            f" peak memory {(result['peakMemoryBytes'] / max(old['peakMemoryBytes'], 1) - 1) * 100:+.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the similarity scoring path.")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls timed per case")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON results file of a previous run to compare against")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.seed)
+    report = {
+        "commit": git_commit(),
+        "time": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+
+# == Redis configuration ==
+REDIS_HOST = os.getenv("SCRAPER_REDIS_HOST", "redis")
+REDIS_PORT = os.getenv("SCRAPER_REDIS_PORT", 6379)
+REDIS_CACHE_DB = os.getenv(
+    "SCRAPER_CACHE_REDIS_DB", 3
+)  # 3 is the redis db for scraper caches (0 and 2 belong to the api, 1 to celery)
+
+# == Similarity configuration ==
+FINGERPRINT_CACHE_TTL = int(
+    os.getenv("SCRAPER_FINGERPRINT_CACHE_TTL", 60 * 60 * 24 * 45)
+)  # Time in seconds an unused assignment fingerprint is kept (longer than the monthly scan interval)
+MINHASH_PREFILTER = (
+    os.getenv("SCRAPER_MINHASH_PREFILTER", "true").lower() == "true"
+)  # Skip passage scoring of scraped pages sharing no MinHash band with the assignment
+MINHASH_PREFILTER_MIN_WORDS = int(
+    os.getenv("SCRAPER_MINHASH_PREFILTER_MIN_WORDS", 2000)
+)  # Shorter assignments are passage scored without the pre-filter, which would cost about as much as it saves
+MINHASH_ROWS_PER_BAND = int(
+    os.getenv("SCRAPER_MINHASH_ROWS_PER_BAND", 2)
+)  # Signature rows per LSH band, 1 lets most unrelated pages of a long assignment through and 4 misses copied ones
+IDF_MODEL_PATH = os.getenv(
+    "SCRAPER_IDF_MODEL_PATH", "models/idf"
+)  # Directory of the corpus-fitted IDF model (see IdfModel.py), scores use a two-document IDF fit without one
+SCRAPED_CORPUS_PATH = os.getenv(
+    "SCRAPER_CORPUS_PATH"
+)  # JSON lines file scraped texts are appended to for fitting the IDF model, disabled when unset
+PASSAGE_MODE = (
+    os.getenv("SCRAPER_PASSAGE_MODE", "true").lower() == "true"
+)  # Also score overlapping windows of long assignments, so copying one question is not diluted by the rest
+PASSAGE_WINDOW_WORDS = int(
+    os.getenv("SCRAPER_PASSAGE_WINDOW_WORDS", 150)
+)  # Words per passage window, roughly the length of one posted question
+PASSAGE_STRIDE_WORDS = int(
+    os.getenv("SCRAPER_PASSAGE_STRIDE_WORDS", 75)
+)  # Words between the starts of two consecutive passage windows
+CROSS_ASSIGNMENT_SCORING = (
+    os.getenv("SCRAPER_CROSS_ASSIGNMENT_SCORING", "true").lower() == "true"
+)  # Score every scraped page against all active assignments, not only the one being scanned
+CROSS_MATCH_MIN_CONFIDENCE = float(
+    os.getenv("SCRAPER_CROSS_MATCH_MIN_CONFIDENCE", 80.0)
+)  # Minimum confidence for a page to be reported for an assignment other than the one being scanned
+SNIPPET_PREFILTER = (
+    os.getenv("SCRAPER_SNIPPET_PREFILTER", "true").lower() == "true"
+)  # Score the snippets of the search page first and only open the results whose snippet looks like a match
+SNIPPET_MIN_CONFIDENCE = float(
+    os.getenv("SCRAPER_SNIPPET_MIN_CONFIDENCE", 15.0)
+)  # Minimum snippet confidence for a search result to be opened
+TOKEN_CACHE_SIZE = int(
+    os.getenv("SCRAPER_TOKEN_CACHE_SIZE", 1024)
+)  # Number of tokenized texts each worker process keeps in memory
+
+# == Scoring configuration ==
+SCORING_MODE = os.getenv(
+    "SCRAPER_SCORING_MODE", "inline"
+)  # "inline" scores scraped pages on the scan worker, "queue" sends them to the scoring workers
+SCORING_QUEUE = os.getenv(
+    "SCRAPER_SCORING_QUEUE", "scoring"
+)  # Celery queue consumed by the CPU-bound scoring workers
+
+# == Browser configuration ==
+CHEGG_BASE_URL = os.getenv(
+    "SCRAPER_CHEGG_BASE_URL", "https://www.chegg.com"
+)  # Origin Chegg pages are fetched from, e.g. the offline stand-in of benchmarks/chegg_standin.py
+PROXY_SERVER = os.getenv(
+    "SCRAPER_PROXY_SERVER", "us.smartproxy.com:10000"
+)  # Rotating proxy used by the browser and the HTTP fetcher, empty to connect directly
+PROXY_SERVERS = [
+    proxy.strip() for proxy in os.getenv("SCRAPER_PROXY_SERVERS", PROXY_SERVER).split(",") if proxy.strip()
+]  # Comma-separated proxies leased to scrapes by the proxy pool, SCRAPER_PROXY_SERVER alone when unset
+PROXY_REQUEST_BUDGET = int(
+    os.getenv("SCRAPER_PROXY_REQUEST_BUDGET", 0)
+)  # Requests a proxy may serve per budget window before it is no longer leased, 0 for no budget (the rate limiter alone)
+PROXY_BUDGET_WINDOW = int(
+    os.getenv("SCRAPER_PROXY_BUDGET_WINDOW", 60 * 10)
+)  # Length in seconds of a proxy budget window
+PROXY_STATS_WINDOW = int(
+    os.getenv("SCRAPER_PROXY_STATS_WINDOW", 60 * 30)
+)  # Length in seconds of the window the success rate, captcha rate and latency of a proxy are counted over
+PROXY_EJECT_SECONDS = int(
+    os.getenv("SCRAPER_PROXY_EJECT_SECONDS", 60 * 15)
+)  # Seconds an unhealthy proxy stays out of the pool
+PROXY_MIN_REQUESTS = int(
+    os.getenv("SCRAPER_PROXY_MIN_REQUESTS", 10)
+)  # Outcomes counted in the stats window before a proxy may be ejected
+PROXY_MAX_CAPTCHA_RATE = float(
+    os.getenv("SCRAPER_PROXY_MAX_CAPTCHA_RATE", 0.3)
+)  # Captcha rate from which a proxy is ejected
+PROXY_MIN_SUCCESS_RATE = float(
+    os.getenv("SCRAPER_PROXY_MIN_SUCCESS_RATE", 0.5)
+)  # Success rate below which a proxy is ejected
+RESULTS_TO_SCAN = int(
+    os.getenv("SCRAPER_RESULTS_TO_SCAN", 10)
+)  # Number of top search results scraped and scored per scan
+QUERY_MAX_QUERIES = int(
+    os.getenv("SCRAPER_QUERY_MAX_QUERIES", 3)
+)  # Search queries planned per scan, from the most distinctive sentences and the key phrases of the assignment
+QUERY_MAX_WORDS = int(
+    os.getenv("SCRAPER_QUERY_MAX_WORDS", 32)
+)  # Maximum words per search query
+RESULT_CONCURRENCY = int(
+    os.getenv("SCRAPER_RESULT_CONCURRENCY", 5)
+)  # Search results opened at the same time, as browser tabs or HTTP requests
+DRIVER_POOL_SIZE = int(
+    os.getenv("SCRAPER_DRIVER_POOL_SIZE", 1)
+)  # Chrome drivers each worker process keeps warm between scrapes
+DRIVER_MAX_PAGES = int(
+    os.getenv("SCRAPER_DRIVER_MAX_PAGES", 100)
+)  # Pages a Chrome driver loads before it is quit and replaced
+DRIVER_MAX_RSS_MB = int(
+    os.getenv("SCRAPER_DRIVER_MAX_RSS_MB", 1536)
+)  # Resident memory in MB of a Chrome driver and its browser processes above which it is replaced
+
+HTTP_FAST_PATH = (
+    os.getenv("SCRAPER_HTTP_FAST_PATH", "true").lower() == "true"
+)  # Fetch pages over plain HTTP first and only start the browser when that gets blocked
+HTTP_POOL_SIZE = int(
+    os.getenv("SCRAPER_HTTP_POOL_SIZE", 10)
+)  # Keep-alive connections each worker process keeps per host for the HTTP fast path
+HTTP_TIMEOUT = float(
+    os.getenv("SCRAPER_HTTP_TIMEOUT", 10)
+)  # Seconds to wait for a page fetched over plain HTTP
+HTTP_BLOCKED_TTL = int(
+    os.getenv("SCRAPER_HTTP_BLOCKED_TTL", 60 * 5)
+)  # Time in seconds every worker skips the HTTP fast path after it was blocked or failed
+LAYOUT_CACHE_TTL = int(
+    os.getenv("SCRAPER_LAYOUT_CACHE_TTL", 60 * 60 * 6)
+)  # Time in seconds the layout a platform currently serves is remembered before it is probed again
+LAYOUT_REPROBE_FAILURES = int(
+    os.getenv("SCRAPER_LAYOUT_REPROBE_FAILURES", 3)
+)  # Failed scrapes in a row with the remembered layout after which it is probed again
+
+# == Retry configuration ==
+SCRAPE_MAX_RETRIES = int(
+    os.getenv("SCRAPER_SCRAPE_MAX_RETRIES", 4)
+)  # Retries of a failed scan, rescheduled through Celery so the worker is free while it backs off
+RETRY_BACKOFF_BASE = float(
+    os.getenv("SCRAPER_RETRY_BACKOFF_BASE", 3)
+)  # Seconds of backoff before the first retry, doubled for every further retry
+CAPTCHA_BACKOFF_BASE = float(
+    os.getenv("SCRAPER_CAPTCHA_BACKOFF_BASE", 30)
+)  # Seconds of backoff before the first retry of a scan that hit a captcha, doubled for every further retry
+RETRY_BACKOFF_MAX = float(
+    os.getenv("SCRAPER_RETRY_BACKOFF_MAX", 600)
+)  # Maximum seconds of backoff before a retry
+ELEMENT_MAX_RETRIES = int(
+    os.getenv("SCRAPER_ELEMENT_MAX_RETRIES", 1)
+)  # Retries of a scan that failed on a missing element, which usually means the layout changed
+
+# == Circuit breaker configuration ==
+CIRCUIT_FAILURE_RATE = float(
+    os.getenv("SCRAPER_CIRCUIT_FAILURE_RATE", 0.5)
+)  # Share of scans blocked by captchas, across all workers, from which scans are deferred instead of run
+CIRCUIT_MIN_ATTEMPTS = int(
+    os.getenv("SCRAPER_CIRCUIT_MIN_ATTEMPTS", 6)
+)  # Scans counted in a window before the circuit may open
+CIRCUIT_WINDOW = int(
+    os.getenv("SCRAPER_CIRCUIT_WINDOW", 60 * 5)
+)  # Length in seconds of the window scans are counted over
+CIRCUIT_OPEN_SECONDS = int(
+    os.getenv("SCRAPER_CIRCUIT_OPEN_SECONDS", 60 * 10)
+)  # Seconds scans are deferred once the circuit opened, before a probe scan is let through
+CIRCUIT_PROBE_TIMEOUT = int(
+    os.getenv("SCRAPER_CIRCUIT_PROBE_TIMEOUT", 60 * 5)
+)  # Seconds a probe scan may take before another one is let through
+
+# == Rate limit configuration ==
+RATE_LIMIT_RATE = float(
+    os.getenv("SCRAPER_RATE_LIMIT_RATE", 1.0)
+)  # Sustained requests per second to a platform across all workers, 0 for no limit
+RATE_LIMIT_BURST = int(
+    os.getenv("SCRAPER_RATE_LIMIT_BURST", 10)
+)  # Requests to a platform allowed at once after it was idle
+RATE_LIMIT_MAX_WAIT = float(
+    os.getenv("SCRAPER_RATE_LIMIT_MAX_WAIT", 15)
+)  # Seconds a request may sleep for its turn, the scan is requeued when it would wait longer
+
+# == Pacing configuration ==
+PACING_DELAY_DISTRIBUTION = os.getenv(
+    "SCRAPER_PACING_DELAY_DISTRIBUTION", "lognormal"
+)  # Distribution of the human-like pauses between browser actions: "lognormal", "uniform" or "none"
+PACING_DELAY_MEAN = float(
+    os.getenv("SCRAPER_PACING_DELAY_MEAN", 1.0)
+)  # Mean human-like pause in seconds
+PACING_DELAY_SPREAD = float(
+    os.getenv("SCRAPER_PACING_DELAY_SPREAD", 0.5)
+)  # Sigma of the log-normal pauses, or half-width of the uniform pauses as a fraction of the mean
+NETWORK_IDLE_SECONDS = float(
+    os.getenv("SCRAPER_NETWORK_IDLE_SECONDS", 0.5)
+)  # Seconds without a new network request before a page counts as loaded
+NETWORK_IDLE_TIMEOUT = float(
+    os.getenv("SCRAPER_NETWORK_IDLE_TIMEOUT", 10)
+)  # Maximum seconds to wait for a page to go quiet on the network
+
+# == Sharding configuration ==
+QUESTION_SHARDING = (
+    os.getenv("SCRAPER_QUESTION_SHARDING", "true").lower() == "true"
+)  # Scan each numbered question of an assignment as its own parallel subtask
+MAX_SHARDS = int(
+    os.getenv("SCRAPER_MAX_SHARDS", 8)
+)  # Maximum subtasks per scan, neighbouring questions are scanned together beyond it
+SHARD_TIME_LIMIT = int(
+    os.getenv("SCRAPER_SHARD_TIME_LIMIT", 300)
+)  # Seconds a shard may run before it is stopped and contributes no search results
+SHARD_MAX_RETRIES = int(
+    os.getenv("SCRAPER_SHARD_MAX_RETRIES", 2)
+)  # Retries of a failed shard before it contributes no search results
@@ -1,8 +1,11 @@
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import redis
 from celery import Celery
 
+from config import REDIS_HOST, REDIS_PORT, REDIS_CACHE_DB, SCORING_QUEUE
+
 # Got help from:
 # https://docs.celeryq.dev/en/stable/getting-started/backends-and-brokers/redis.html
 # https://docs.celeryq.dev/en/stable/getting-started/first-steps-with-celery.html#keeping-results
@@ -16,6 +19,14 @@ celery = Celery(
 celery.conf.update(
     beat_max_loop_interval=30,
 )
+# Got help from:
+# https://docs.celeryq.dev/en/stable/userguide/routing.html#automatic-routing
+# Scoring tasks are CPU-bound, so they run on their own queue and workers instead of the browser workers
+celery.conf.task_routes = {"Tasks.score_*": {"queue": SCORING_QUEUE}}
+# Redis instance for caches shared by every scraper worker
+redis_cache = redis.StrictRedis(
+    host=REDIS_HOST, port=REDIS_PORT, db=REDIS_CACHE_DB, decode_responses=True
+)
 # Logger initialization
 if not os.path.exists("log"):
     os.mkdir("log")
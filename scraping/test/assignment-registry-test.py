@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import AssignmentRegistry as registry
+from AssignmentRegistry import ActiveAssignments, get_active_assignments
+from benchmarks.memory_store import MemoryStore
+from FingerprintCache import FingerprintCache
+from Similarity import AssignmentFingerprint, score_fingerprint, shares_band_with
+
+
+@pytest.fixture
+def assignments():
+    return {
+        "1": ("Implement a stack using two queues and analyze the cost of push and pop", ["stack"]),
+        "2": ("Prove that a binary search tree in-order traversal visits keys in sorted order", None),
+        "3": ("Write a SQL query joining the orders and customers tables on customer id", []),
+    }
+
+
+@pytest.fixture
+def active(assignments):
+    fingerprints = [
+        AssignmentFingerprint.from_text(text, keywords) for text, keywords in assignments.values()
+    ]
+    return ActiveAssignments(list(assignments.keys()), fingerprints, rows_per_band=1)
+
+
+def test_scores_match_single_assignment_scoring(active, assignments):
+    texts = [
+        "Implement a stack using two queues and analyze the cost of push and pop",
+        "Write a SQL query joining the orders and customers tables",
+        "Completely unrelated text about cooking pasta",
+    ]
+    scores = active.score(texts)
+
+    assert scores.shape == (3, 3)
+    for row, (text, keywords) in enumerate(assignments.values()):
+        fingerprint = AssignmentFingerprint.from_text(text, keywords)
+        expected = score_fingerprint(fingerprint, texts) * shares_band_with(fingerprint, texts, rows_per_band=1)
+        assert np.allclose(scores[row], expected)
+
+
+def test_matches_land_on_the_right_assignment(active):
+    scores = active.score(["Write a SQL query joining the orders and customers tables on customer id"])
+
+    assert active.assignment_ids[int(scores[:, 0].argmax())] == "3"
+    assert scores[2, 0] == pytest.approx(1.0)
+
+
+@pytest.fixture
+def schedule(monkeypatch):
+    monkeypatch.setattr(registry, "redis_cache", MemoryStore())
+    monkeypatch.setattr(registry, "fingerprint_cache", FingerprintCache(MemoryStore(), ttl=600))
+    monkeypatch.setattr(registry, "_active", None)
+    monkeypatch.setattr(registry, "_active_version", None)
+    scheduled = {}
+    reads = []
+
+    def read_scheduled_assignments():
+        reads.append(1)
+        return scheduled
+
+    monkeypatch.setattr(registry, "read_scheduled_assignments", read_scheduled_assignments)
+    return scheduled, reads
+
+
+def test_backfills_from_schedule_once(schedule):
+    scheduled, reads = schedule
+    scheduled["7"] = (["stack"], "Implement a stack using two queues")
+
+    active = get_active_assignments(rows_per_band=1)
+    assert active.assignment_ids == ["7"]
+    assert get_active_assignments(rows_per_band=1) is active
+    assert len(reads) == 1
+
+
+def test_empty_schedule_is_not_backfilled_again(schedule):
+    _, reads = schedule
+
+    for _ in range(3):
+        assert get_active_assignments(rows_per_band=1) is None
+    assert len(reads) == 1
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+import BrowserWatchdog
+
+
+def test_process_tree_rss_includes_children():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        parent = psutil.Process()
+        own_rss = parent.memory_info().rss
+        assert BrowserWatchdog.process_tree_rss(parent.pid) > own_rss
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_kill_process_tree_kills_grandchildren():
+    script = (
+        "import subprocess, sys, time; "
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); "
+        "time.sleep(30)"
+    )
+    child = subprocess.Popen([sys.executable, "-c", script])
+    try:
+        deadline = time.time() + 5
+        while not psutil.Process(child.pid).children() and time.time() < deadline:
+            time.sleep(0.05)
+        grandchildren = psutil.Process(child.pid).children()
+
+        assert BrowserWatchdog.kill_process_tree(child.pid) == 2
+        assert not any(grandchild.is_running() for grandchild in grandchildren)
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_process_tree_rss_of_missing_process():
+    assert BrowserWatchdog.process_tree_rss(2 ** 22 + 1) == 0
+
+
+def test_only_webdriver_processes_are_driver_processes():
+    assert not BrowserWatchdog.is_driver_process(psutil.Process())
+
+
+@pytest.fixture
+def orphaned_driver(monkeypatch):
+    # A process carrying the webdriver switch, orphaned as far as the sweep can tell
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)", BrowserWatchdog.WEBDRIVER_SWITCH])
+    monkeypatch.setattr(BrowserWatchdog.os, "getppid", os.getpid)
+    yield child
+    child.kill()
+    child.wait()
+
+
+def test_sweep_kills_orphaned_drivers(orphaned_driver):
+    assert BrowserWatchdog.kill_orphaned_browsers() == 1
+    assert orphaned_driver.wait(timeout=5) is not None
+
+
+def test_sweep_spares_live_drivers(orphaned_driver):
+    assert BrowserWatchdog.kill_orphaned_browsers([orphaned_driver.pid]) == 0
+    assert orphaned_driver.poll() is None
+
+
+def test_worker_running_as_init_does_not_sweep(orphaned_driver, monkeypatch):
+    monkeypatch.setattr(BrowserWatchdog.os, "getpid", lambda: 1)
+
+    assert BrowserWatchdog.kill_orphaned_browsers() == 0
+    assert orphaned_driver.poll() is None
@@ -0,0 +1,221 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+import Chegg_Scraper as chegg
+import Scraper as scraper_module
+from benchmarks.memory_store import MemoryStore
+from LayoutCache import LayoutCache
+from RateLimiter import RateLimited
+from Similarity import AssignmentFingerprint
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+# Browser keeping one URL per tab, where window.open adds a tab without switching to it
+class FakeTabDriver:
+    def __init__(self):
+        self.tabs = {"search": "https://www.chegg.com/search"}
+        self.current_window_handle = "search"
+        self.switch_to = FakeSwitchTo(self)
+        self.opened = 0
+        self.max_open = 0
+
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    @property
+    def current_url(self):
+        return self.tabs[self.current_window_handle]
+
+    def execute_script(self, script, url):
+        self.opened += 1
+        self.tabs[f"tab{self.opened}"] = url
+        self.max_open = max(self.max_open, len(self.tabs) - 1)
+
+    def close(self):
+        del self.tabs[self.current_window_handle]
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    monkeypatch.setattr(chegg, "RESULT_CONCURRENCY", 2)
+    scraper = chegg.Chegg_Scraper([], "Implement a stack")
+    scraper.set_driver(FakeTabDriver())
+    monkeypatch.setattr(scraper, "record_page", lambda: None)
+    monkeypatch.setattr(scraper, "acquire_request_token", lambda: None)
+    monkeypatch.setattr(scraper.get_pacer(), "human_delay", lambda: None)
+    return scraper
+
+
+def test_results_are_opened_in_batches_of_tabs(scraper, monkeypatch):
+    def scrape_tab(search_results, assignment_id):
+        search_results.append({"url": scraper.get_driver().current_url, "text": "text"})
+
+    monkeypatch.setattr(scraper, "scrape_old_search_result", scrape_tab)
+    urls = [f"https://www.chegg.com/q{idx}" for idx in range(5)]
+    search_results = []
+
+    scraper.scrape_result_tabs(urls, search_results, 1)
+
+    assert [result["url"] for result in search_results] == urls
+    assert scraper.get_driver().max_open == 2
+    assert scraper.get_driver().window_handles == ["search"]
+    assert scraper.get_driver().current_window_handle == "search"
+
+
+def test_results_that_fail_to_load_are_skipped(scraper, monkeypatch):
+    def scrape_tab(search_results, assignment_id):
+        if scraper.get_driver().current_url.endswith("q1"):
+            raise TimeoutException("captcha")
+        search_results.append({"url": scraper.get_driver().current_url, "text": "text"})
+
+    monkeypatch.setattr(scraper, "scrape_old_search_result", scrape_tab)
+    search_results = []
+
+    scraper.scrape_result_tabs(["https://www.chegg.com/q0", "https://www.chegg.com/q1"], search_results, 1)
+
+    assert [result["url"] for result in search_results] == ["https://www.chegg.com/q0"]
+
+
+def test_scan_fails_when_no_result_loads(scraper, monkeypatch):
+    def scrape_tab(search_results, assignment_id):
+        raise TimeoutException("captcha")
+
+    monkeypatch.setattr(scraper, "scrape_old_search_result", scrape_tab)
+
+    with pytest.raises(TimeoutException):
+        scraper.scrape_result_tabs(["https://www.chegg.com/q0"], [], 1)
+
+
+def test_search_results_are_selected_by_snippet_score(monkeypatch):
+    monkeypatch.setattr(chegg, "RESULTS_TO_SCAN", 3)
+    monkeypatch.setattr(chegg, "SNIPPET_MIN_CONFIDENCE", 15.0)
+    text = "Implement a stack using two queues and analyze the amortized cost of push and pop operations"
+    scraper = chegg.Chegg_Scraper(["queues"], text)
+    monkeypatch.setattr(scraper, "get_fingerprint", lambda assignment_id: AssignmentFingerprint.from_text(text, ["queues"]))
+    search_page_results = [
+        {"url": "unrelated", "snippet": "Balance the chemical equation for the combustion of methane"},
+        {"url": "partial", "snippet": "Implement a stack using an array"},
+        {"url": "no-snippet", "snippet": None},
+        {"url": "copied", "snippet": "Implement a stack using two queues and analyze the amortized cost of push"},
+    ]
+
+    assert scraper.select_search_results(search_page_results, 1) == ["copied", "partial", "no-snippet"]
+
+
+def test_all_search_results_are_kept_without_snippet_prefilter(monkeypatch):
+    monkeypatch.setattr(chegg, "RESULTS_TO_SCAN", 2)
+    monkeypatch.setattr(chegg, "SNIPPET_PREFILTER", False)
+    scraper = chegg.Chegg_Scraper([], "Implement a stack")
+    search_page_results = [{"url": f"q{idx}", "snippet": "Unrelated"} for idx in range(3)]
+
+    assert scraper.select_search_results(search_page_results, 1) == ["q0", "q1"]
+
+
+def test_scan_results_are_posted_per_assignment(monkeypatch):
+    posts = []
+    monkeypatch.setattr(chegg.requests, "post", lambda url, data, headers: posts.append(chegg.json.loads(data)))
+    scan_results = [
+        {"url": "q0", "assignmentId": 1},
+        {"url": "q0", "assignmentId": 2},
+        {"url": "q1", "assignmentId": 1},
+    ]
+
+    chegg.Chegg_Scraper([], "Implement a stack").post_scan_results(scan_results)
+
+    assert posts == [[scan_results[0], scan_results[2]], [scan_results[1]]]
+
+
+def test_no_proxy_available_is_not_a_captcha(monkeypatch):
+    class ExhaustedPool:
+        def lease(self, preferred):
+            raise chegg.NoProxyAvailable("Every proxy is out of budget")
+
+    monkeypatch.setattr(chegg, "proxy_pool", ExhaustedPool())
+    scraper = chegg.Chegg_Scraper([], "Implement a stack")
+    monkeypatch.setattr(scraper, "acquire_first_request_token", lambda: None)
+
+    assert scraper.scrape(1) == False
+    assert scraper.get_failure() == chegg.PROXY_FAILURE
+
+
+def test_rate_limited_scrape_is_deferred_before_leasing_a_proxy(monkeypatch):
+    class FullLimiter:
+        def acquire(self, platform, may_defer=True):
+            raise RateLimited("Chegg is busy", 5)
+
+    class UnusedPool:
+        def lease(self, preferred):
+            pytest.fail("leased a proxy")
+
+    monkeypatch.setattr(scraper_module, "rate_limiter", FullLimiter())
+    monkeypatch.setattr(chegg, "proxy_pool", UnusedPool())
+
+    with pytest.raises(RateLimited):
+        chegg.Chegg_Scraper([], "Implement a stack").scrape(1)
+
+
+def test_shards_do_not_track_their_fingerprint(monkeypatch):
+    tracked = []
+
+    class RecordingCache:
+        def get(self, assignment_id, text, keywords, track=True):
+            tracked.append((text, track))
+
+    monkeypatch.setattr(chegg, "fingerprint_cache", RecordingCache())
+    monkeypatch.setattr(chegg.Scraper, "get_fingerprint", lambda self, assignment_id: tracked.append((None, True)))
+    scraper = chegg.Chegg_Scraper([], "Implement a stack")
+    monkeypatch.setattr(scraper, "scrape", lambda assignment_id: scraper.get_fingerprint(assignment_id) or True)
+
+    scraper.collect(1)
+    scraper.get_fingerprint(1)
+
+    assert tracked == [("Implement a stack", False), (None, True)]
+
+
+def test_only_the_first_request_of_a_scrape_may_be_deferred(monkeypatch):
+    deferrable = []
+
+    class RecordingLimiter:
+        def acquire(self, platform, may_defer=True):
+            deferrable.append(may_defer)
+
+    monkeypatch.setattr(scraper_module, "rate_limiter", RecordingLimiter())
+    scraper = chegg.Chegg_Scraper([], "Implement a stack")
+
+    for _ in range(2):
+        scraper.acquire_first_request_token()
+        # The fetching threads of a scrape share its first turn, and none of them may defer the scan
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: scraper.acquire_request_token(), range(4)))
+
+    assert deferrable == [True, False, False, False, True, False, False, False]
+
+
+@pytest.mark.parametrize("failure, forgotten", [(chegg.CAPTCHA_FAILURE, False), (chegg.ELEMENT_FAILURE, True)])
+def test_only_missing_elements_count_against_the_cached_layout(monkeypatch, failure, forgotten):
+    class OneDriverPool:
+        @contextmanager
+        def lease(self, options):
+            yield FakeTabDriver()
+
+    monkeypatch.setattr(chegg, "driver_pool", OneDriverPool())
+    monkeypatch.setattr(chegg, "layout_cache", LayoutCache(MemoryStore(), ttl=600, max_failures=2))
+    chegg.layout_cache.remember(chegg.PLATFORM, "old")
+    scraper = chegg.Chegg_Scraper([], "Implement a stack")
+    monkeypatch.setattr(scraper, "scrape_old_site", lambda assignment_id: scraper.set_failure(failure) or False)
+
+    for _ in range(2):
+        assert scraper.scrape_browser(1) == False
+
+    assert (chegg.layout_cache.get(chegg.PLATFORM) is None) == forgotten
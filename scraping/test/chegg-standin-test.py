@@ -0,0 +1,124 @@
+import pytest
+import requests
+
+import Chegg_Scraper as chegg
+import Scraper as scraper_module
+from benchmarks.chegg_standin import SEARCH_PATH, CheggStandIn, build_pages, load_recorded_pages
+from benchmarks.memory_store import MemoryStore
+from LayoutCache import LAYOUT_PREFIX, LayoutCache
+from Similarity import AssignmentFingerprint
+
+QUESTIONS = [
+    "Implement a stack using two queues and analyse the cost of push and pop",
+    "Prove that Dijkstra's algorithm fails on graphs with negative edge weights",
+]
+
+
+@pytest.fixture
+def standin():
+    standins = []
+
+    def start(pages=None, **kwargs):
+        standin = CheggStandIn(pages or build_pages(QUESTIONS), seed=0, **kwargs)
+        standin.start()
+        standins.append(standin)
+        return standin
+
+    yield start
+    for standin in standins:
+        standin.stop()
+
+
+# Layout cache of the scrapers kept in memory
+@pytest.fixture(autouse=True)
+def layout_store(monkeypatch):
+    store = MemoryStore()
+    monkeypatch.setattr(chegg, "layout_cache", LayoutCache(store, ttl=600, max_failures=3))
+    return store
+
+
+def scraper_for(standin, monkeypatch):
+    scraper = chegg.Chegg_Scraper(None, QUESTIONS[0])
+    scraper.set_base_url(standin.get_url())
+    scraper.set_proxy_server(None)
+    submitted = []
+    monkeypatch.setattr(scraper, "acquire_request_token", lambda: None)
+    monkeypatch.setattr(scraper, "get_fingerprint", lambda assignment_id: AssignmentFingerprint.from_text(QUESTIONS[0], None))
+    monkeypatch.setattr(scraper, "submit_search_results", lambda results, assignment_id: submitted.extend(results))
+    return scraper, submitted
+
+
+def test_scrape_http_against_standin(standin, monkeypatch):
+    running = standin()
+    scraper, submitted = scraper_for(running, monkeypatch)
+
+    assert scraper.scrape_http(1)
+    assert submitted[0] == {"url": running.get_url() + "/homework-help/question-1", "text": QUESTIONS[0]}
+    assert running.get_counts()["pages"] == len(scraper.get_search_queries()) + len(submitted)
+
+
+def test_injected_captcha_falls_back_to_browser(standin, monkeypatch, layout_store):
+    running = standin(captcha_rate=1.0)
+    scraper, submitted = scraper_for(running, monkeypatch)
+
+    assert not scraper.scrape_http(1)
+    assert submitted == []
+    assert running.get_counts()["captchas"] > 0
+    # A block may only be the proxy, so the fast path is only skipped for a while
+    assert chegg.layout_cache.get(chegg.HTTP_PLATFORM) == "browser"
+    assert layout_store.ttl(LAYOUT_PREFIX + chegg.HTTP_PLATFORM) == chegg.HTTP_BLOCKED_TTL
+
+
+def test_script_rendered_pages_turn_the_fast_path_off(standin, monkeypatch, layout_store):
+    running = standin(pages={SEARCH_PATH: "<html><body><div id='app'></div></body></html>"})
+    scraper, submitted = scraper_for(running, monkeypatch)
+
+    assert not scraper.scrape_http(1)
+    assert layout_store.ttl(LAYOUT_PREFIX + chegg.HTTP_PLATFORM) == 600
+
+
+def test_search_without_results_keeps_the_fast_path(standin, monkeypatch):
+    running = standin(pages=build_pages([]))
+    scraper, submitted = scraper_for(running, monkeypatch)
+
+    assert not scraper.scrape_http(1)
+    assert chegg.layout_cache.get(chegg.HTTP_PLATFORM) is None
+
+
+def test_injected_timeout(standin):
+    running = standin(timeout_rate=1.0, hang_seconds=1.0)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        requests.get(running.get_url() + "/search?q=stack", timeout=0.2)
+    assert running.get_counts()["timeouts"] == 1
+
+
+def test_serves_absolute_targets_as_proxy(standin):
+    running = standin()
+    host = running.get_url()[len("http://"):]
+
+    response = requests.get("http://www.chegg.com/homework-help/question-2", proxies={"http": f"http://{host}"})
+
+    assert "negative edge weights" in response.text
+
+
+def test_load_recorded_pages(tmp_path):
+    (tmp_path / "homework-help").mkdir()
+    (tmp_path / "search.html").write_text("<html>search</html>")
+    (tmp_path / "homework-help" / "q1.html").write_text("<html>question</html>")
+
+    assert load_recorded_pages(str(tmp_path)) == {
+        "/search": "<html>search</html>",
+        "/homework-help/q1": "<html>question</html>",
+    }
+
+
+def test_set_proxy_server_updates_browser_and_fetcher():
+    scraper = chegg.Chegg_Scraper(None, QUESTIONS[0])
+
+    scraper.set_proxy_server("127.0.0.1:8765")
+    assert "--proxy-server=127.0.0.1:8765" in scraper.get_driver_options().arguments
+    scraper.set_proxy_server(None)
+    assert not any(argument.startswith("--proxy-server=") for argument in scraper.get_driver_options().arguments)
+    scraper.set_proxy_server(scraper_module.PROXY_SERVER)
+    assert scraper.get_driver_options().arguments.count(f"--proxy-server={scraper_module.PROXY_SERVER}") == 1
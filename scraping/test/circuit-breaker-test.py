@@ -0,0 +1,111 @@
+import pytest
+
+from benchmarks.memory_store import BrokenStore, MemoryStore
+from CircuitBreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def store():
+    return MemoryStore()
+
+
+@pytest.fixture
+def breaker(store):
+    return CircuitBreaker(store, failure_rate=0.5, min_attempts=4, window=300, open_seconds=600, probe_timeout=120)
+
+
+def open_circuit(breaker):
+    for _ in range(4):
+        breaker.record_failure("chegg")
+
+
+def test_opens_after_failure_rate(breaker):
+    breaker.record_success("chegg")
+    breaker.record_success("chegg")
+    breaker.record_failure("chegg")
+    assert breaker.allow("chegg")
+    breaker.record_failure("chegg")
+
+    assert not breaker.allow("chegg")
+    assert breaker.info("chegg")["state"] == OPEN
+    assert breaker.retry_after("chegg") == 600
+
+
+def test_stays_closed_below_failure_rate(breaker):
+    for _ in range(3):
+        breaker.record_success("chegg")
+    breaker.record_failure("chegg")
+
+    assert breaker.allow("chegg")
+    assert breaker.info("chegg") == {"state": CLOSED, "attempts": 4, "failures": 1, "retryAfter": 0}
+
+
+def test_circuits_are_independent(breaker):
+    open_circuit(breaker)
+
+    assert breaker.allow("other")
+
+
+def test_half_open_lets_a_single_probe_through(breaker, store):
+    open_circuit(breaker)
+    store.now = 600
+
+    assert breaker.info("chegg")["state"] == HALF_OPEN
+    assert breaker.allow("chegg")
+    assert not breaker.allow("chegg")
+    assert breaker.retry_after("chegg") == 120
+    # A probe that never reports back is replaced
+    store.now = 720
+    assert breaker.allow("chegg")
+
+
+def test_released_probe_lets_another_scan_probe(breaker, store):
+    open_circuit(breaker)
+    store.now = 600
+    assert breaker.allow("chegg")
+
+    breaker.release_probe("chegg")
+
+    assert breaker.info("chegg")["state"] == HALF_OPEN
+    assert breaker.allow("chegg")
+
+
+def test_is_open_does_not_take_the_probe(breaker, store):
+    open_circuit(breaker)
+    assert breaker.is_open("chegg")
+    store.now = 600
+
+    assert not breaker.is_open("chegg")
+    assert breaker.allow("chegg")
+
+
+def test_successful_probe_closes(breaker, store):
+    open_circuit(breaker)
+    store.now = 600
+    assert breaker.allow("chegg")
+
+    breaker.record_success("chegg")
+
+    assert breaker.info("chegg")["state"] == CLOSED
+    assert breaker.allow("chegg") and breaker.allow("chegg")
+
+
+def test_blocked_probe_reopens(breaker, store):
+    open_circuit(breaker)
+    store.now = 600
+    assert breaker.allow("chegg")
+
+    breaker.record_failure("chegg")
+
+    assert not breaker.allow("chegg")
+    assert breaker.retry_after("chegg") == 600
+
+
+def test_redis_errors_let_scans_run():
+    breaker = CircuitBreaker(BrokenStore())
+
+    breaker.record_failure("chegg")
+
+    assert breaker.allow("chegg")
+    assert not breaker.is_open("chegg")
+    assert breaker.retry_after("chegg") == 0
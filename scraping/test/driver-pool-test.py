@@ -0,0 +1,191 @@
+from types import SimpleNamespace
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from DriverPool import DriverPool
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window = handle
+
+
+class FakeDriver:
+    def __init__(self, options, fail_reset=False):
+        self.options = options
+        self.fail_reset = fail_reset
+        self.window_handles = ["main"]
+        self.current_window = "main"
+        self.switch_to = FakeSwitchTo(self)
+        self.cookies = set()
+        self.urls = {}
+        self.commands = []
+        self.cleared_origins = []
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        return self.urls.get(self.current_window, "about:blank")
+
+    def get(self, url):
+        self.url = url
+        self.urls[self.current_window] = url
+
+    def close(self):
+        self.window_handles.remove(self.current_window)
+
+    def execute_cdp_cmd(self, command, params):
+        if self.fail_reset:
+            raise WebDriverException("session deleted")
+        self.commands.append(command)
+        if command == "Storage.clearDataForOrigin":
+            self.cleared_origins.append(params["origin"])
+        if command == "Network.clearBrowserCookies":
+            self.cookies.clear()
+
+    def quit(self):
+        self.quit_called = True
+
+
+def options_with(*arguments):
+    options = Options()
+    for argument in arguments:
+        options.add_argument(argument)
+    return options
+
+
+def test_lease_reuses_warm_driver_with_clean_session():
+    started = []
+    pool = DriverPool(1, lambda options: started.append(FakeDriver(options)) or started[-1])
+    options = options_with("--headless")
+
+    with pool.lease(options) as driver:
+        driver.cookies.add("session")
+        driver.window_handles.append("tab")
+    with pool.lease(options_with("--headless")) as second_driver:
+        assert second_driver is driver
+
+    assert len(started) == 1
+    assert driver.cookies == set()
+    assert driver.window_handles == ["main"]
+    assert driver.url == "about:blank"
+    assert set(driver.cleared_origins) == {"https://www.chegg.com"}
+
+
+def test_lease_replaces_idle_driver_with_other_options():
+    started = []
+    pool = DriverPool(1, lambda options: started.append(FakeDriver(options)) or started[-1])
+
+    with pool.lease(options_with("--proxy-server=a")) as first_driver:
+        pass
+    with pool.lease(options_with("--proxy-server=b")) as second_driver:
+        assert second_driver is not first_driver
+
+    assert first_driver.quit_called
+    info = pool.info()
+    assert (info["alive"], info["idle"], info["size"]) == (1, 1, 1)
+
+
+def test_driver_failing_to_reset_is_discarded():
+    started = []
+    pool = DriverPool(2, lambda options: started.append(FakeDriver(options, fail_reset=True)) or started[-1])
+
+    with pool.lease(options_with()) as driver:
+        pass
+
+    assert driver.quit_called
+    assert pool.info()["alive"] == 0
+
+
+def test_shutdown_quits_every_driver():
+    started = []
+    pool = DriverPool(2, lambda options: started.append(FakeDriver(options)) or started[-1])
+
+    with pool.lease(options_with("--a")):
+        with pool.lease(options_with("--b")):
+            pass
+    pool.shutdown()
+
+    assert len(started) == 2
+    assert all(driver.quit_called for driver in started)
+    assert pool.info()["alive"] == 0
+
+
+def test_driver_is_recycled_after_max_pages():
+    started = []
+    pool = DriverPool(
+        1,
+        lambda options: started.append(FakeDriver(options)) or started[-1],
+        max_pages=3,
+        sweep=lambda live_pids: 0,
+    )
+
+    with pool.lease(options_with()) as driver:
+        pool.record_page(driver, 2)
+    with pool.lease(options_with()) as same_driver:
+        pool.record_page(same_driver)
+    with pool.lease(options_with()) as new_driver:
+        pass
+
+    assert same_driver is driver
+    assert driver.quit_called
+    assert new_driver is not driver
+    assert pool.info()["recycled"] == 1
+    assert pool.info()["pages"] == 0
+
+
+def test_driver_is_recycled_above_max_rss():
+    started = []
+    pool = DriverPool(
+        1,
+        lambda options: started.append(FakeDriver(options)) or started[-1],
+        max_rss=100,
+        rss_of=lambda driver: 200,
+        sweep=lambda live_pids: 2,
+    )
+
+    with pool.lease(options_with()) as driver:
+        pass
+
+    assert driver.quit_called
+    assert pool.info()["alive"] == 0
+    assert pool.info()["orphansKilled"] == 2
+
+
+def test_sweep_spares_live_drivers():
+    swept = []
+    pool = DriverPool(2, FakeDriver, sweep=lambda live_pids: swept.append(list(live_pids)) or 0)
+
+    with pool.lease(options_with()) as driver:
+        driver.service = SimpleNamespace(process=SimpleNamespace(pid=4242))
+        pool.sweep()
+
+    assert swept == [[4242]]
+
+
+def test_idle_proxy_servers():
+    pool = DriverPool(2, FakeDriver)
+
+    with pool.lease(options_with("--headless", "--proxy-server=a:1")):
+        assert pool.idle_proxy_servers() == []
+    with pool.lease(options_with("--headless")):
+        pass
+
+    assert pool.idle_proxy_servers() == ["a:1", None]
+
+
+def test_storage_of_scraped_and_open_origins_is_cleared():
+    pool = DriverPool(1, FakeDriver, origins=["https://www.chegg.com/search?q=stack"])
+
+    with pool.lease(options_with()) as driver:
+        driver.get("http://127.0.0.1:8000/search?q=stack")
+        driver.window_handles.append("tab")
+        driver.switch_to.window("tab")
+        driver.get("https://www.chegg.com/homework-help/questions-and-answers/q1")
+
+    assert driver.cleared_origins == ["https://www.chegg.com", "http://127.0.0.1:8000"]
+    assert "*" not in driver.cleared_origins
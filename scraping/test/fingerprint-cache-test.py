@@ -0,0 +1,58 @@
+import pytest
+
+import FingerprintCache as cache_module
+from benchmarks.memory_store import BrokenStore, MemoryStore
+from FingerprintCache import FingerprintCache
+
+ASSIGNMENT = "1. Implement a stack using two queues.\n2. Prove that Dijkstra fails with negative edges."
+QUESTIONS = ASSIGNMENT.split("\n")
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    computed = []
+    from_text = cache_module.AssignmentFingerprint.from_text
+    monkeypatch.setattr(
+        cache_module.AssignmentFingerprint,
+        "from_text",
+        lambda text, keywords: computed.append(text) or from_text(text, keywords),
+    )
+    return computed
+
+
+def test_fingerprint_is_computed_once(computed):
+    cache = FingerprintCache(MemoryStore(), ttl=600)
+
+    first = cache.get(1, ASSIGNMENT, ["stack"])
+    second = cache.get(1, ASSIGNMENT, ["stack"])
+
+    assert computed == [ASSIGNMENT]
+    assert list(second.terms) == list(first.terms)
+
+
+def test_edited_assignment_drops_previous_fingerprint(computed):
+    cache = FingerprintCache(MemoryStore(), ttl=600)
+
+    cache.get(1, ASSIGNMENT, None)
+    cache.get(1, QUESTIONS[0], None)
+    cache.get(1, ASSIGNMENT, None)
+
+    assert computed == [ASSIGNMENT, QUESTIONS[0], ASSIGNMENT]
+
+
+def test_shard_fingerprints_do_not_evict_the_assignment(computed):
+    cache = FingerprintCache(MemoryStore(), ttl=600)
+
+    # Sharded scans fingerprint each question, then the whole assignment for scoring
+    for _ in range(3):
+        for question in QUESTIONS:
+            cache.get(1, question, None, track=False)
+        cache.get(1, ASSIGNMENT, None)
+
+    assert computed == QUESTIONS + [ASSIGNMENT]
+
+
+def test_redis_errors_compute_the_fingerprint(computed):
+    FingerprintCache(BrokenStore(), ttl=600).get(1, ASSIGNMENT, None)
+
+    assert computed == [ASSIGNMENT]
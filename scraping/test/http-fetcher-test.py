@@ -0,0 +1,77 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import lxml.html
+import pytest
+
+import Chegg_Scraper as chegg
+from HttpFetcher import FetchBlocked, HttpFetcher
+
+PAGES = {
+    "/page": (200, "<html><body><div id='text'>Question text</div></body></html>"),
+    "/blocked": (403, "<html><body>Forbidden</body></html>"),
+    "/captcha": (200, "<html><body><div id='px-captcha'></div></body></html>"),
+}
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, body = PAGES[self.path]
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_fetch_parses_page(server_url):
+    page = HttpFetcher("test-agent").fetch(server_url + "/page")
+
+    assert page.get_element_by_id("text").text_content() == "Question text"
+
+
+@pytest.mark.parametrize("path", ["/blocked", "/captcha"])
+def test_fetch_detects_blocked_pages(server_url, path):
+    with pytest.raises(FetchBlocked):
+        HttpFetcher("test-agent").fetch(server_url + path)
+
+
+def scraper_with_pages(monkeypatch, pages):
+    scraper = chegg.Chegg_Scraper(["queue"], "Implement a stack using two queues")
+    submitted = []
+    # Every planned query gets the same search page
+    fetch = lambda url: pages["search"] if url.startswith("https://www.chegg.com/search?q=") else pages[url]
+    monkeypatch.setattr(scraper, "fetch_page", lambda url: lxml.html.document_fromstring(fetch(url)))
+    monkeypatch.setattr(scraper, "clear_http_cookies", lambda: None)
+    monkeypatch.setattr(scraper, "submit_search_results", lambda results, assignment_id: submitted.extend(results))
+    return scraper, submitted
+
+
+def test_scrape_http_reads_results_without_browser(monkeypatch):
+    pages = {
+        "search": "<html><body><a data-test='section-1-serp-result-1-study-link' href='/homework-help/q1'>Q</a></body></html>",
+        "https://www.chegg.com/homework-help/q1": "<html><body><div data-test='qna-question-body'>Implement a <b>stack</b></div></body></html>",
+    }
+    scraper, submitted = scraper_with_pages(monkeypatch, pages)
+
+    assert scraper.scrape_http(1)
+    assert submitted == [{"url": "https://www.chegg.com/homework-help/q1", "text": "Implement a stack"}]
+
+
+def test_scrape_http_falls_back_on_script_rendered_pages(monkeypatch):
+    pages = {"search": "<html><body><div id='__next'></div></body></html>"}
+    scraper, submitted = scraper_with_pages(monkeypatch, pages)
+
+    assert not scraper.scrape_http(1)
+    assert submitted == []
@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+import IdfModel as idf_module
+from IdfModel import CURRENT_LINK, KEPT_VERSIONS, VERSIONS_DIR, IdfModel, fit_idf, get_idf_model, save_model
+from Similarity import AssignmentFingerprint, score_fingerprint
+
+
+@pytest.fixture
+def corpus():
+    return [
+        "Insert a node into a binary search tree",
+        "Delete a node from a binary search tree",
+        "Find the shortest path in a weighted graph",
+        "Sort an array of integers using merge sort",
+        "Compute the height of a binary tree",
+    ]
+
+
+@pytest.fixture
+def model(tmp_path, corpus):
+    save_model(str(tmp_path), *fit_idf(corpus))
+    return IdfModel.load(str(tmp_path))
+
+
+def test_model_is_memory_mapped(model, corpus):
+    vectorizer = TfidfVectorizer().fit(corpus)
+    terms = list(vectorizer.get_feature_names_out())
+
+    assert len(model) == len(terms)
+    assert np.allclose(model.lookup(terms), vectorizer.idf_)
+
+
+def test_unseen_terms_get_highest_idf(model):
+    idf = model.lookup(["binary", "unseen", "x" * 100])
+
+    assert idf[1] == idf[2] == pytest.approx(np.log(6) + 1)
+    assert idf[0] < idf[1]
+
+
+def test_scores_match_corpus_fitted_vectorizer(model, corpus):
+    vectorizer = TfidfVectorizer().fit(corpus)
+    text = "Insert a node into a binary tree"
+    candidates = ["Delete a node from a binary search tree", "Sort an array using merge sort"]
+    fingerprint = AssignmentFingerprint.from_text(text, None)
+    expected = cosine_similarity(
+        vectorizer.transform([text]), vectorizer.transform(candidates)
+    )[0]
+
+    assert np.allclose(score_fingerprint(fingerprint, candidates, idf_model=model), expected)
+
+
+def test_keyword_boost_with_model(model):
+    fingerprint = AssignmentFingerprint.from_text("Compute the height of a binary tree", ["height"])
+    scores = score_fingerprint(
+        fingerprint, ["Compute the height of a binary tree", ""], idf_model=model
+    )
+
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] == pytest.approx(1 / np.sqrt(2))
+
+
+def test_save_switches_current_version(tmp_path, corpus):
+    save_model(str(tmp_path), *fit_idf(corpus))
+    old_model = IdfModel.load(str(tmp_path))
+
+    save_model(str(tmp_path), *fit_idf(corpus[:2]))
+    new_model = IdfModel.load(str(tmp_path))
+
+    # A model loaded before the switch keeps reading its own version
+    assert len(old_model) > len(new_model)
+    assert old_model.lookup(["graph"])[0] == pytest.approx(np.log(6 / 2) + 1)
+    assert new_model.lookup(["graph"])[0] == pytest.approx(np.log(3) + 1)
+    assert os.path.realpath(tmp_path / CURRENT_LINK).startswith(str(tmp_path / VERSIONS_DIR))
+
+
+def test_save_keeps_recent_versions(tmp_path, corpus):
+    for _ in range(KEPT_VERSIONS + 2):
+        save_model(str(tmp_path), *fit_idf(corpus))
+
+    versions = sorted(os.listdir(tmp_path / VERSIONS_DIR))
+    assert len(versions) == KEPT_VERSIONS
+    assert os.path.realpath(tmp_path / CURRENT_LINK) == str(tmp_path / VERSIONS_DIR / versions[-1])
+
+
+def test_workers_pick_up_a_switched_model(tmp_path, corpus, monkeypatch):
+    monkeypatch.setattr(idf_module, "IDF_MODEL_PATH", str(tmp_path))
+    monkeypatch.setattr(idf_module, "_model", None)
+    monkeypatch.setattr(idf_module, "_model_version", None)
+    assert get_idf_model() is None
+
+    save_model(str(tmp_path), *fit_idf(corpus))
+    model = get_idf_model()
+    assert len(model) > 0
+    assert get_idf_model() is model
+
+    save_model(str(tmp_path), *fit_idf(corpus[:2]))
+    assert len(get_idf_model()) < len(model)
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+import scipy
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from Similarity import score_pair, score_texts
+
+
+# Reference implementation: the vectorizer-based calc_text_similarity the fused scorer replaced
+def reference_similarity(text_1, text_2, keywords):
+    text_vectorizer = TfidfVectorizer()
+    text_vectors = text_vectorizer.fit_transform([text_1, text_2])
+    if keywords != None:
+        keyword_vectorizer = TfidfVectorizer(
+            vocabulary=text_vectorizer.get_feature_names_out()
+        )
+        keyword_vector = keyword_vectorizer.fit_transform([" ".join(keywords)])
+        keyword_vector = scipy.sparse.vstack([keyword_vector] * text_vectors.shape[0])
+        combined_vectors = scipy.sparse.hstack([text_vectors, keyword_vector])
+        return cosine_similarity(combined_vectors[0], combined_vectors[1])[0][0]
+    return cosine_similarity(text_vectors)[0][1]
+
+
+@pytest.fixture
+def pairs():
+    words = "stack queue heap push pop peek array list linked pointer null Node NODE".split()
+    rng = random.Random(11)
+    keyword_choices = [None, [], ["heap"], ["linked list", "pointer"], ["missing"]]
+    return [
+        (
+            " ".join(rng.choice(words) for _ in range(rng.randint(0, 25))),
+            " ".join(rng.choice(words) for _ in range(rng.randint(0, 25))),
+            rng.choice(keyword_choices),
+        )
+        for _ in range(300)
+    ]
+
+
+def test_fused_scorer_matches_reference(pairs):
+    compared = 0
+    for text_1, text_2, keywords in pairs:
+        try:
+            expected = reference_similarity(text_1, text_2, keywords)
+        except ValueError:
+            # Both texts are empty, which the reference cannot fit
+            assert score_pair(text_1, text_2, keywords) == 0.0
+            continue
+        assert score_pair(text_1, text_2, keywords) == pytest.approx(expected, abs=1e-9)
+        assert score_texts(text_1, [text_2], keywords)[0] == pytest.approx(expected, abs=1e-9)
+        compared += 1
+
+    assert compared > 250
+
+
+def test_keyword_only_match():
+    # Neither text shares a term with the other, but a keyword appears in one of them
+    expected = reference_similarity("heap push", "queue pop", ["heap"])
+
+    assert expected == pytest.approx(0.5)
+    assert score_pair("heap push", "queue pop", ["heap"]) == pytest.approx(expected)
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.memory_store import BrokenStore, MemoryStore
+from LayoutCache import LayoutCache
+
+
+@pytest.fixture
+def cache():
+    return LayoutCache(MemoryStore(), ttl=600, max_failures=3)
+
+
+def test_remembers_working_layout(cache):
+    assert cache.get("chegg") is None
+
+    cache.remember("chegg", "old")
+
+    assert cache.get("chegg") == "old"
+
+
+def test_forgets_layout_after_repeated_failures(cache):
+    cache.remember("chegg", "old")
+
+    cache.record_failure("chegg")
+    cache.record_failure("chegg")
+    assert cache.get("chegg") == "old"
+    cache.record_failure("chegg")
+
+    assert cache.get("chegg") is None
+
+
+def test_success_resets_failures(cache):
+    cache.remember("chegg", "old")
+
+    cache.record_failure("chegg")
+    cache.record_failure("chegg")
+    cache.record_success("chegg")
+    cache.record_failure("chegg")
+    cache.record_failure("chegg")
+
+    assert cache.get("chegg") == "old"
+
+
+def test_redis_errors_fall_back_to_probing():
+    cache = LayoutCache(BrokenStore(), ttl=600, max_failures=3)
+
+    cache.remember("chegg", "old")
+    cache.record_failure("chegg")
+
+    assert cache.get("chegg") is None
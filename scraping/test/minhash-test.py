@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+import MinHash
+from MinHash import LSHIndex
+from Similarity import tokenize
+
+
+@pytest.fixture
+def words():
+    rng = random.Random(3)
+    vocabulary = [f"word{idx}" for idx in range(2000)]
+    return [rng.choice(vocabulary) for _ in range(5000)]
+
+
+def signature_of(text):
+    return MinHash.signature(MinHash.shingle_hashes(tokenize(text)))
+
+
+def test_signature_is_deterministic():
+    text = "Prove that every tree with n nodes has n minus one edges"
+
+    assert (signature_of(text) == signature_of(text)).all()
+
+
+def test_signature_of_empty_text():
+    assert signature_of("") is None
+    assert len(MinHash.window_signatures(MinHash.shingle_hashes([]))) == 0
+
+
+def test_window_signatures_find_copied_passage(words):
+    signatures = MinHash.window_signatures(MinHash.shingle_hashes(words))
+    passage = MinHash.signature(MinHash.shingle_hashes(words[3000:3120]))
+    unrelated = signature_of("The mitochondria is the powerhouse of the cell")
+
+    assert len(signatures) > 1
+    assert MinHash.shares_band(signatures, passage, rows_per_band=2)
+    assert not MinHash.shares_band(signatures, unrelated, rows_per_band=1)
+
+
+def test_lsh_index(words):
+    index = LSHIndex(rows_per_band=2)
+    index.add(1, MinHash.window_signatures(MinHash.shingle_hashes(words[:1000])))
+    index.add(2, MinHash.window_signatures(MinHash.shingle_hashes(words[2000:3000])))
+    passage = MinHash.signature(MinHash.shingle_hashes(words[2100:2200]))
+
+    assert len(index) == 2
+    assert index.query(passage) == {2}
+    assert index.query(None) == set()
+
+    index.remove(2)
+    assert index.query(passage) == set()
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from Pacing import Pacer, backoff_delay, draw_delay, network_idle
+
+
+class FakeDriver:
+    def __init__(self, states):
+        self.states = list(states)
+
+    def execute_script(self, script):
+        # Keeps returning the last state once every state was returned
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+
+@pytest.mark.parametrize("distribution", ["lognormal", "uniform"])
+def test_draw_delay_has_configured_mean(distribution):
+    rng = random.Random(5)
+    delays = [draw_delay(distribution, 2.0, 0.5, rng) for _ in range(20000)]
+
+    assert min(delays) >= 0
+    assert sum(delays) / len(delays) == pytest.approx(2.0, rel=0.03)
+
+
+def test_draw_delay_disabled():
+    assert draw_delay("none", 2.0, 0.5) == 0.0
+    assert draw_delay("lognormal", 0.0, 0.5) == 0.0
+
+
+def test_network_idle_waits_for_quiet_complete_page():
+    condition = network_idle(0.0)
+    driver = FakeDriver([["loading", 3], ["complete", 5], ["complete", 5]])
+
+    assert not condition(driver)
+    assert not condition(driver)
+    assert condition(driver)
+
+
+def test_wait_for_network_idle_gives_up_on_busy_page():
+    requests = iter(range(1000))
+    driver = FakeDriver([["complete", 0]])
+    driver.execute_script = lambda script: ["complete", next(requests)]
+    pacer = Pacer("none", 0.0, 0.0)
+
+    pacer.wait_for_network_idle(driver, timeout=0.2)
+
+    assert pacer.report()["waitingSeconds"] >= 0.2
+
+
+def test_report_separates_waiting_from_working():
+    pacer = Pacer("uniform", 0.05, 0.0)
+
+    with pytest.raises(TimeoutException):
+        pacer.wait_until(FakeDriver([None]), lambda driver: False, 0.1)
+    pacer.human_delay()
+    report = pacer.report()
+
+    assert report["waitingSeconds"] >= 0.1
+    assert report["pausedSeconds"] == pytest.approx(0.05)
+    assert report["totalSeconds"] >= report["waitingSeconds"] + report["pausedSeconds"]
+
+
+def test_backoff_delay_doubles_with_jitter_and_is_capped():
+    rng = random.Random(0)
+    for retries in range(4):
+        delays = [backoff_delay(retries, 3, 600, rng) for _ in range(100)]
+        assert 1.5 * 2 ** retries <= min(delays) and max(delays) <= 3 * 2 ** retries
+        assert len(set(delays)) > 1
+    assert 300 <= backoff_delay(20, 3, 600, rng) <= 600
@@ -0,0 +1,53 @@
+import PageExtractor
+from PageExtractor import parse_page
+
+SEARCH_PAGE = """
+<html><body>
+  <div data-test="search-result-count-line">1,234 results for "stack"</div>
+  <a data-test="search-tabs-link-study" href="/search/stack#study">Solutions</a>
+  <a data-test="section-1-serp-result-1-study-link" href="/homework-help/questions-and-answers/q1">
+    <span data-test="section-1-serp-result-1-study-question">Implement a stack</span>
+  </a>
+  <a data-test="section-1-serp-result-2-study-link" href="https://www.chegg.com/homework-help/q2">Q2</a>
+  <a data-test="section-2-serp-result-1-textbook-link" href="/textbooks/t1">Textbook</a>
+</body></html>
+"""
+
+
+def test_extracts_result_count():
+    assert PageExtractor.extract_result_count(parse_page(SEARCH_PAGE)) == 1234
+    assert PageExtractor.extract_result_count(parse_page("<html><body></body></html>")) is None
+
+
+def test_question_body_text_keeps_words_apart():
+    page = parse_page(
+        "<html><body><div data-test='qna-question-body'><p>Implement a <b>st</b>ack.</p>"
+        "<p>Then analyze<br>push and pop<!-- hidden -->.</p></div></body></html>"
+    )
+
+    assert PageExtractor.extract_question_text(page).split() == [
+        "Implement", "a", "stack.", "Then", "analyze", "push", "and", "pop."
+    ]
+
+
+def test_transcribed_text_replaces_question_body():
+    page = parse_page(
+        "<html><body><div data-test='transcribed-data-text'>Show transcribed image text</div>"
+        "<div class='styled__TextContent-sc-1k7k16x-4 IUHUF'>Transcribed question</div>"
+        "<div data-test='qna-question-body'><img src='q.png'></div></body></html>"
+    )
+
+    assert PageExtractor.extract_question_text(page) == "Transcribed question"
+
+
+def test_missing_question_text():
+    assert PageExtractor.extract_question_text(parse_page("<html><body><div id='__next'></div></body></html>")) is None
+
+
+def test_extracts_search_results_with_snippets():
+    page = parse_page(SEARCH_PAGE)
+
+    assert PageExtractor.extract_search_results(page, "https://www.chegg.com/search/stack") == [
+        {"url": "https://www.chegg.com/homework-help/questions-and-answers/q1", "snippet": "Implement a stack"},
+        {"url": "https://www.chegg.com/homework-help/q2", "snippet": None},
+    ]
@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+import ProxyPool as proxy_pool_module
+from benchmarks.memory_store import BrokenStore, MemoryStore
+from ProxyPool import CAPTCHA, FAILURE, SUCCESS, NoProxyAvailable, ProxyPool
+
+
+def make_pool(proxies, store=None, **kwargs):
+    settings = dict(
+        request_budget=5,
+        budget_window=600,
+        stats_window=600,
+        eject_seconds=600,
+        min_requests=4,
+        max_captcha_rate=0.5,
+        min_success_rate=0.3,
+        rng=random.Random(0),
+    )
+    settings.update(kwargs)
+    return ProxyPool(store or MemoryStore(), proxies, **settings)
+
+
+def leased(pool, preferred=()):
+    with pool.lease(preferred) as proxy:
+        return proxy
+
+
+def test_empty_pool_connects_directly():
+    assert leased(make_pool([])) is None
+
+
+def test_leases_are_released():
+    pool = make_pool(["a:1"])
+
+    with pool.lease() as proxy:
+        assert proxy == "a:1"
+        assert pool.info()[0]["leases"] == 1
+
+    assert pool.info()[0]["leases"] == 0
+
+
+def test_leases_of_killed_workers_expire(monkeypatch):
+    pool = make_pool(["a:1"])
+    now = [1000.0]
+    monkeypatch.setattr(proxy_pool_module.time, "time", lambda: now[0])
+    leak = pool.lease()
+    leak.__enter__()
+
+    # Leases taken later do not keep the leaked one alive
+    for _ in range(5):
+        now[0] += 300
+        with pool.lease():
+            pass
+
+    assert pool.info()[0]["leases"] == 0
+
+
+def test_proxy_serving_captchas_is_ejected():
+    pool = make_pool(["a:1", "b:2"])
+    for _ in range(2):
+        pool.record("a:1", SUCCESS, 0.1)
+    for _ in range(2):
+        pool.record("a:1", CAPTCHA)
+
+    assert {leased(pool) for _ in range(20)} == {"b:2"}
+    assert pool.info()[0]["ejected"]
+    # The ejected proxy comes back with fresh stats
+    assert pool.info()[0]["requests"] == 0
+
+
+def test_failing_proxy_is_ejected():
+    pool = make_pool(["a:1", "b:2"])
+    for _ in range(4):
+        pool.record("a:1", FAILURE)
+
+    assert {leased(pool) for _ in range(20)} == {"b:2"}
+
+
+def test_proxy_out_of_budget_is_not_leased():
+    pool = make_pool(["a:1", "b:2"])
+    for _ in range(5):
+        pool.count_request("b:2")
+
+    assert {leased(pool) for _ in range(20)} == {"a:1"}
+    assert pool.info()[1]["budgetUsed"] == 5
+
+
+def test_no_budget():
+    pool = make_pool(["a:1"], request_budget=0)
+    for _ in range(1000):
+        pool.count_request("a:1")
+
+    assert leased(pool) == "a:1"
+
+
+def test_no_proxy_available():
+    pool = make_pool(["a:1"])
+    for _ in range(5):
+        pool.count_request("a:1")
+
+    with pytest.raises(NoProxyAvailable):
+        leased(pool)
+
+
+def test_healthy_proxies_are_leased_more():
+    pool = make_pool(["fast:1", "slow:2"], min_requests=1000)
+    for _ in range(10):
+        pool.record("fast:1", SUCCESS, 0.1)
+        pool.record("slow:2", SUCCESS, 3.0)
+    pool.record("slow:2", CAPTCHA)
+
+    picks = [leased(pool) for _ in range(200)]
+
+    assert picks.count("fast:1") > 2 * picks.count("slow:2") > 0
+    assert pool.info()[0]["latencySeconds"] == pytest.approx(0.1)
+
+
+def test_redis_errors_fall_back_to_any_proxy():
+    pool = make_pool(["a:1", "b:2"], store=BrokenStore())
+
+    pool.record("a:1", CAPTCHA)
+    pool.count_request("a:1")
+
+    assert leased(pool) in ("a:1", "b:2")
+    assert pool.info() == []
+
+
+def test_proxy_of_a_warm_driver_is_preferred():
+    pool = make_pool(["a:1", "b:2", "c:3"])
+
+    assert {leased(pool, ["b:2", None]) for _ in range(20)} == {"b:2"}
+
+
+def test_unavailable_preferred_proxy_is_passed_over():
+    pool = make_pool(["a:1", "b:2"])
+    for _ in range(5):
+        pool.count_request("b:2")
+
+    assert {leased(pool, ["b:2"]) for _ in range(20)} == {"a:1"}
@@ -0,0 +1,125 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import Chegg_Scraper as chegg
+from QueryPlanner import merge_search_results, plan_queries, split_questions, split_sentences
+
+ASSIGNMENT = """Homework 3. Answer every question below.
+Implement a stack using two queues and analyze the amortized cost of push and pop.
+Answer the question below and show your work.
+Prove that Dijkstra's algorithm fails on graphs with negative edge weights by giving a counterexample."""
+
+
+def test_split_sentences():
+    assert split_sentences("First one. Second one?\nThird one") == ["First one.", "Second one?", "Third one"]
+
+
+def test_plans_distinctive_sentences_and_key_phrases():
+    queries = plan_queries(ASSIGNMENT, ["amortized analysis"], max_queries=3, max_words=8)
+
+    assert len(queries) == 3
+    assert queries[-1] == "amortized analysis"
+    # Boilerplate instructions repeat words of the other sentences, so they are not searched for
+    assert all("show your work" not in query for query in queries)
+    assert all(len(query.split()) <= 8 for query in queries)
+    assert queries[:2] == [
+        "Implement a stack using two queues and analyze",
+        "Prove that Dijkstra's algorithm fails on graphs with",
+    ]
+
+
+def test_short_text_is_searched_as_is():
+    assert plan_queries("Binary search tree", None, max_queries=3, max_words=32) == ["Binary search tree"]
+
+
+def test_merge_keeps_first_result_per_url_rank_by_rank():
+    merged = merge_search_results(
+        [
+            [{"url": "https://x/q1", "snippet": "a"}, {"url": "https://x/q2", "snippet": "b"}],
+            [{"url": "https://x/q3/", "snippet": "c"}, {"url": "https://x/q1#answers", "snippet": "d"}],
+        ]
+    )
+
+    assert merged == [
+        {"url": "https://x/q1", "snippet": "a"},
+        {"url": "https://x/q3", "snippet": "c"},
+        {"url": "https://x/q2", "snippet": "b"},
+    ]
+
+
+def test_queries_are_url_encoded():
+    url = chegg.Chegg_Scraper([], "").url_builder("Is 50% of x & y = z?")
+
+    assert parse_qs(urlparse(url).query)["q"] == ["Is 50% of x & y = z?"]
+
+
+@pytest.mark.parametrize(
+    "markers",
+    [
+        ["1.", "2.", "3."],
+        ["1)", "2)", "3)"],
+        ["(1)", "(2)", "(3)"],
+        ["Question 1:", "Question 2:", "Question 3:"],
+        ["Q1", "Q2", "Q3"],
+    ],
+)
+def test_split_questions_on_numbered_questions(markers):
+    text = f"""Homework 3. Answer all questions.
+{markers[0]} Implement a stack using two queues.
+{markers[1]} Prove that Dijkstra's algorithm fails with negative weights.
+It takes 3.5 hours on average.
+{markers[2]} Sort the list in O(n log n)."""
+
+    assert split_questions(text, 8) == [
+        f"{markers[0]} Implement a stack using two queues.",
+        f"{markers[1]} Prove that Dijkstra's algorithm fails with negative weights.\nIt takes 3.5 hours on average.",
+        f"{markers[2]} Sort the list in O(n log n).",
+    ]
+    assert len(split_questions(text, 2)) == 2
+    assert split_questions(text, 2)[0].startswith(markers[0]) and split_questions(text, 2)[1].endswith("log n).")
+
+
+def test_split_questions_only_on_markers_of_the_first_kind():
+    text = """1. Implement a stack using two queues.
+2) Prove that Dijkstra's algorithm fails with negative weights.
+2. Sort the list in O(n log n)."""
+
+    assert split_questions(text, 8) == [
+        "1. Implement a stack using two queues.\n2) Prove that Dijkstra's algorithm fails with negative weights.",
+        "2. Sort the list in O(n log n).",
+    ]
+
+
+def test_numbered_steps_stay_with_their_question():
+    text = """Question 1: Implement a heap.
+1. Write the insert method.
+2. Write the extract-min method.
+Question 2: Sort a list.
+1) Use merge sort.
+2) Analyze its running time."""
+
+    assert split_questions(text, 8) == [
+        "Question 1: Implement a heap.\n1. Write the insert method.\n2. Write the extract-min method.",
+        "Question 2: Sort a list.\n1) Use merge sort.\n2) Analyze its running time.",
+    ]
+
+
+def test_text_without_questions_is_one_shard():
+    assert split_questions("Implement a stack using two queues.", 8) == ["Implement a stack using two queues."]
+
+
+def test_key_phrase_query_is_cut_to_whole_phrases():
+    keywords = [f"key phrase {idx}" for idx in range(50)]
+
+    queries = plan_queries("Binary search tree", keywords, max_queries=3, max_words=8)
+
+    assert queries[0] == "key phrase 0 key phrase 1"
+    assert plan_queries("Binary search tree", ["a very long key phrase"], max_queries=3, max_words=3)[0] == "a very long"
+
+
+def test_key_phrases_can_be_left_to_another_shard():
+    queries = plan_queries(ASSIGNMENT, ["amortized analysis"], max_queries=3, max_words=8, with_key_phrases=False)
+
+    assert "amortized analysis" not in queries
+    assert queries[0] == "Implement a stack using two queues and analyze"
@@ -0,0 +1,171 @@
+import math
+import random
+
+import pytest
+import redis
+
+import RateLimiter as limiter_module
+from benchmarks.memory_store import BrokenStore, MemoryStore
+from RateLimiter import BUCKET_PREFIX, TAKE_TOKEN_SCRIPT, RateLimited, RateLimiter
+
+
+# Python port of TAKE_TOKEN_SCRIPT, checked against the script by test_port_matches_script when lupa is installed
+def take_token(store, keys, args):
+    rate, burst, max_wait = (float(arg) for arg in args)
+    seconds, microseconds = store.time()
+    now = seconds + microseconds / 1000000
+    tokens, updated = store.hmget(keys[0], ["tokens", "updated"])
+    tokens = float(tokens) if tokens is not None else burst
+    updated = float(updated) if updated is not None else now
+    tokens = min(burst, tokens + max(0, now - updated) * rate)
+    wait = (1 - tokens) / rate if tokens < 1 else 0
+    taken = 0
+    if max_wait < 0 or wait <= max_wait:
+        tokens -= 1
+        taken = 1
+    store.hset(keys[0], {"tokens": tokens, "updated": now})
+    store.expire(keys[0], math.ceil((burst - tokens) / rate) + 1)
+    return [str(wait), taken]
+
+
+# Memory store running the Python port of the token bucket script
+class PortedStore(MemoryStore):
+    def register_script(self, script):
+        assert script == TAKE_TOKEN_SCRIPT
+        return lambda keys, args: take_token(self, keys, args)
+
+
+# Memory store whose scripts fail like Redis does when it is down
+class DownStore(MemoryStore):
+    def register_script(self, script):
+        def fail(keys, args):
+            raise redis.exceptions.ConnectionError("Redis is down")
+
+        return fail
+
+
+# Every behavior is checked against the port, and against the script itself when lupa can run it
+@pytest.fixture(params=["port", "script"])
+def store(request):
+    if request.param == "script":
+        pytest.importorskip("lupa")
+        return MemoryStore()
+    return PortedStore()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(limiter_module.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def tokens_left(store, key=BUCKET_PREFIX + "chegg"):
+    return float(store.hgetall(key)["tokens"])
+
+
+def test_burst_then_reserves_below_zero(store, sleeps):
+    limiter = RateLimiter(store, rate=2, burst=3, max_wait=10)
+
+    for _ in range(5):
+        limiter.acquire("chegg")
+
+    # The first 3 requests go at once, the next ones queue up half a second apart
+    assert sleeps == [0.5, 1.0]
+    assert tokens_left(store) == -2
+
+
+def test_refills_at_rate(store, sleeps):
+    limiter = RateLimiter(store, rate=2, burst=3, max_wait=10)
+    for _ in range(3):
+        limiter.acquire("chegg")
+
+    store.now = 1
+    for _ in range(3):
+        limiter.acquire("chegg")
+
+    assert sleeps == [0.5]
+
+
+def test_refill_is_capped_at_burst(store, sleeps):
+    limiter = RateLimiter(store, rate=2, burst=3, max_wait=10)
+    limiter.acquire("chegg")
+
+    store.now = 1000
+    for _ in range(4):
+        limiter.acquire("chegg")
+
+    assert sleeps == [0.5]
+
+
+def test_refuses_without_reserving_past_max_wait(store, sleeps):
+    limiter = RateLimiter(store, rate=1, burst=1, max_wait=2)
+    for _ in range(3):
+        limiter.acquire("chegg")
+
+    for _ in range(2):
+        with pytest.raises(RateLimited) as raised:
+            limiter.acquire("chegg")
+        assert raised.value.retry_after == 3
+
+    assert sleeps == [1, 2]
+    assert tokens_left(store) == -2
+
+
+def test_started_scan_waits_past_max_wait(store, sleeps):
+    limiter = RateLimiter(store, rate=1, burst=1, max_wait=2)
+    for _ in range(3):
+        limiter.acquire("chegg")
+
+    limiter.acquire("chegg", may_defer=False)
+
+    assert sleeps == [1, 2, 3]
+
+
+def test_bucket_expires_once_refilled(store, sleeps):
+    limiter = RateLimiter(store, rate=2, burst=3, max_wait=10)
+    for _ in range(5):
+        limiter.acquire("chegg")
+
+    # 5 tokens short of a full bucket at 2 tokens per second, plus a second
+    assert store.ttl(BUCKET_PREFIX + "chegg") == 4
+    store.now = 4
+    assert not store.exists(BUCKET_PREFIX + "chegg")
+
+
+def test_platforms_have_their_own_bucket(store, sleeps):
+    limiter = RateLimiter(store, rate=1, burst=1, max_wait=10)
+
+    limiter.acquire("chegg")
+    limiter.acquire("other")
+
+    assert sleeps == []
+
+
+def test_no_limit():
+    RateLimiter(BrokenStore(), rate=0, burst=5, max_wait=10).acquire("chegg")
+
+
+def test_redis_errors_let_requests_through(sleeps):
+    RateLimiter(DownStore(), rate=2).acquire("chegg")
+
+    assert sleeps == []
+
+
+def test_port_matches_script():
+    pytest.importorskip("lupa")
+    rng = random.Random(0)
+    script_store = MemoryStore()
+    port_store = MemoryStore()
+    run_script = script_store.register_script(TAKE_TOKEN_SCRIPT)
+    for _ in range(200):
+        now = script_store.now + rng.choice([0, 0, 0.25, 0.5, 1, 3])
+        script_store.now = port_store.now = now
+        args = [rng.choice([0.5, 2]), 3, rng.choice([-1, 0, 2])]
+
+        script_wait, script_taken = run_script(keys=["bucket"], args=args)
+        port_wait, port_taken = take_token(port_store, ["bucket"], args)
+
+        assert (float(script_wait), script_taken) == pytest.approx((float(port_wait), port_taken))
+        assert tokens_left(script_store, "bucket") == pytest.approx(tokens_left(port_store, "bucket"))
+        assert script_store.ttl("bucket") == port_store.ttl("bucket")
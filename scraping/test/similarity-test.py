@@ -0,0 +1,141 @@
+import json
+import random
+
+import pytest
+
+import Scraper as scraper_module
+from Scraper import Scraper
+from Similarity import (
+    AssignmentFingerprint,
+    fingerprint_key,
+    iter_passages,
+    score_fingerprint,
+    score_passages,
+    score_texts,
+    shares_band_with,
+)
+
+
+class StubScraper(Scraper):
+    def url_builder(self, search_query: str):
+        return search_query
+
+
+@pytest.fixture
+def scraper():
+    return StubScraper(["binary tree"], "")
+
+
+@pytest.fixture
+def corpus():
+    words = "tree node binary search insert delete height balance root leaf graph edge".split()
+    rng = random.Random(7)
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, 40)))
+        for _ in range(20)
+    ]
+
+
+@pytest.mark.parametrize("keywords", [None, [], ["binary tree"], ["unrelated"]])
+def test_batch_matches_pairwise(scraper, corpus, keywords):
+    text = "Insert a node into a binary search tree and report the tree height"
+    scores = scraper.calc_text_similarity_batch(text, corpus, keywords)
+
+    assert scores.shape == (len(corpus),)
+    for candidate, score in zip(corpus, scores):
+        assert score == pytest.approx(
+            scraper.calc_text_similarity(text, candidate, keywords), abs=1e-9
+        )
+
+
+def test_batch_identical_text(scraper):
+    text = "Balance the binary search tree"
+    scores = scraper.calc_text_similarity_batch(text, [text], ["binary tree"])
+
+    assert scores[0] == pytest.approx(1.0)
+
+
+def test_batch_empty(scraper):
+    assert len(scraper.calc_text_similarity_batch("text", [], None)) == 0
+
+
+def test_batch_empty_candidate(scraper):
+    scores = scraper.calc_text_similarity_batch("binary tree", ["", "!!"], None)
+
+    assert list(scores) == [0.0, 0.0]
+
+
+def test_fingerprint_round_trip(scraper, corpus):
+    text = "Delete the root node of a binary search tree"
+    fingerprint = AssignmentFingerprint.from_text(text, ["binary tree"])
+    restored = AssignmentFingerprint.from_dict(
+        json.loads(json.dumps(fingerprint.to_dict()))
+    )
+
+    assert list(score_fingerprint(restored, corpus)) == list(
+        scraper.calc_text_similarity_batch(text, corpus, ["binary tree"])
+    )
+    assert (restored.signatures == fingerprint.signatures).all()
+
+
+def test_prefilter_rejects_unrelated_text():
+    text = "Write a function that inserts a node into a binary search tree"
+    fingerprint = AssignmentFingerprint.from_text(text, None)
+    candidates = [text, "The mitochondria is the powerhouse of the cell"]
+
+    assert list(shares_band_with(fingerprint, candidates, rows_per_band=2)) == [True, False]
+
+
+def test_fingerprint_key_changes_with_text_and_keywords():
+    key = fingerprint_key("Assignment text", ["phrase"])
+
+    assert key == fingerprint_key("Assignment text", ["phrase"])
+    assert key != fingerprint_key("Assignment text!", ["phrase"])
+    assert key != fingerprint_key("Assignment text", None)
+
+
+def test_iter_passages_covers_text():
+    text = " ".join(f"word{idx}" for idx in range(25))
+    windows = [window for chunk in iter_passages(text, 10, 5, chunk_size=2) for window in chunk]
+
+    assert [len(tokens) for _, tokens in windows] == [10, 10, 10, 10]
+    assert windows[0][1][0] == "word0"
+    assert windows[-1][1][-1] == "word24"
+    assert text[windows[1][0] :].startswith("word5")
+
+
+def test_iter_passages_short_text():
+    windows = [window for chunk in iter_passages("Two words", 10, 5) for window in chunk]
+
+    assert windows == [(0, ["two", "words"])]
+
+
+def test_passage_finds_copied_question(corpus):
+    question = "Explain why the amortized cost of a dynamic array append is constant"
+    text = " ".join(corpus[:10]) + " " + question + " " + " ".join(corpus[10:])
+    whole_score = score_texts(text, [question], None)[0]
+    passage_scores, passage_offsets = score_passages(text, [question], None, 12, 3)
+
+    assert passage_scores[0] > 0.9 > whole_score
+    assert text[passage_offsets[0] :].startswith("Explain")
+
+
+@pytest.mark.parametrize("min_words", [0, 10000])
+def test_prefiltered_passages_skip_unrelated_text(monkeypatch, corpus, min_words):
+    monkeypatch.setattr(scraper_module, "MINHASH_PREFILTER_MIN_WORDS", min_words)
+    question = "Explain why the amortized cost of a dynamic array append is constant"
+    text = " ".join(corpus[:10]) + " " + question + " " + " ".join(corpus[10:])
+    scraper = StubScraper(None, text)
+    fingerprint = AssignmentFingerprint.from_text(text, None)
+    texts = [question, "The mitochondria is the powerhouse of the cell"]
+
+    scores, offsets = scraper.calc_prefiltered_passage_similarity_batch(fingerprint, texts, None)
+    expected_scores, expected_offsets = scraper.calc_passage_similarity_batch(text, texts, None)
+
+    # Texts of a short assignment are all scored, since the check would cost about as much as it saves
+    if min_words > 0:
+        assert list(scores) == list(expected_scores)
+        assert expected_scores[1] > 0
+    else:
+        assert list(scores) == [expected_scores[0], 0.0]
+        assert list(offsets) == [expected_offsets[0], 0]
@@ -0,0 +1,181 @@
+import pytest
+
+import Tasks
+from extensions import celery
+from Scraper import CAPTCHA_FAILURE, ELEMENT_FAILURE, PROXY_FAILURE
+
+
+# Circuit breaker stand-in, open, half-open with its probe taken, or closed for the whole test
+class FixedCircuit:
+    def __init__(self, open_for=0, probe_taken=False):
+        self.open_for = open_for
+        self.probe_taken = probe_taken
+        self.outcomes = []
+
+    def allow(self, name):
+        return self.open_for == 0 and not self.probe_taken
+
+    def is_open(self, name):
+        return self.open_for > 0
+
+    def retry_after(self, name):
+        return self.open_for
+
+    def release_probe(self, name):
+        self.outcomes.append("release")
+
+    def record_success(self, name):
+        self.outcomes.append("success")
+
+    def record_failure(self, name):
+        self.outcomes.append("failure")
+
+    def info(self, name):
+        return {}
+
+
+@pytest.fixture(autouse=True)
+def closed_circuit(monkeypatch):
+    circuit = FixedCircuit()
+    monkeypatch.setattr(Tasks, "circuit_breaker", circuit)
+    return circuit
+
+
+@pytest.fixture
+def eager():
+    celery.conf.task_always_eager = True
+    yield
+    celery.conf.task_always_eager = False
+
+
+def test_failing_shard_retries_then_returns_no_results(eager, monkeypatch):
+    attempts = []
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "collect", lambda self, assignment_id: attempts.append(1))
+
+    assert Tasks.scrape_Chegg_shard.apply(args=(1, None, "question"), retries=Tasks.SHARD_MAX_RETRIES).get() == []
+    assert len(attempts) == 1
+
+    attempts.clear()
+    Tasks.scrape_Chegg_shard.apply(args=(1, None, "question"))
+    assert len(attempts) == Tasks.SHARD_MAX_RETRIES + 1
+
+
+def test_shard_returns_collected_search_results(eager, monkeypatch):
+    search_results = [{"url": "https://www.chegg.com/q1", "text": "Implement a stack"}]
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "collect", lambda self, assignment_id: search_results)
+
+    assert Tasks.scrape_Chegg_shard.apply(args=(1, None, "question")).get() == search_results
+
+
+def test_crashing_shard_returns_no_results(eager, monkeypatch, closed_circuit):
+    def crash(self, assignment_id):
+        raise ValueError("unexpected page")
+
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "collect", crash)
+
+    assert Tasks.scrape_Chegg_shard.apply(args=(1, None, "question")).get() == []
+    assert closed_circuit.outcomes == ["release"]
+
+
+def test_only_the_first_shard_searches_for_key_phrases(eager, monkeypatch):
+    searched = []
+    monkeypatch.setattr(
+        Tasks.Chegg_Scraper, "collect", lambda self, assignment_id: searched.append(self.get_search_key_phrases()) or []
+    )
+
+    Tasks.scrape_Chegg_sharded(1, ["stack"], "1. Implement a stack.\n2. Prove Dijkstra fails.", ["1.", "2.", "3."])
+
+    assert searched == [True, False, False]
+
+
+def test_shards_of_a_probe_scan_run_while_half_open(eager, monkeypatch):
+    circuit = FixedCircuit(probe_taken=True)
+    monkeypatch.setattr(Tasks, "circuit_breaker", circuit)
+    search_results = [{"url": "https://www.chegg.com/q1", "text": "Implement a stack"}]
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "collect", lambda self, assignment_id: search_results)
+
+    assert Tasks.scrape_Chegg_shard.apply(args=(1, None, "question")).get() == search_results
+    assert circuit.outcomes == ["success"]
+
+
+def test_multi_question_assignment_is_sharded(monkeypatch):
+    sharded = []
+    monkeypatch.setattr(Tasks, "scrape_Chegg_sharded", lambda *args: sharded.append(args))
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "scrape", lambda self, assignment_id: pytest.fail("scraped unsharded"))
+
+    Tasks.scrape_Chegg.run(1, None, "1. Implement a stack.\n2. Prove Dijkstra fails.")
+
+    assert sharded[0][3] == ["1. Implement a stack.", "2. Prove Dijkstra fails."]
+
+
+def failing_scrape(failure, attempts):
+    def scrape(self, assignment_id):
+        attempts.append(assignment_id)
+        self.set_failure(failure)
+        return False
+
+    return scrape
+
+
+@pytest.mark.parametrize(
+    "failure, tries",
+    [
+        (CAPTCHA_FAILURE, Tasks.SCRAPE_MAX_RETRIES + 1),
+        (ELEMENT_FAILURE, Tasks.ELEMENT_MAX_RETRIES + 1),
+        (PROXY_FAILURE, Tasks.SCRAPE_MAX_RETRIES + 1),
+    ],
+)
+def test_failed_scrape_is_retried_through_celery(eager, monkeypatch, closed_circuit, failure, tries):
+    attempts = []
+    countdowns = []
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "scrape", failing_scrape(failure, attempts))
+    monkeypatch.setattr(Tasks, "log_worker_counters", lambda assignment_id: None)
+    retry = Tasks.scrape_Chegg.retry
+    monkeypatch.setattr(
+        Tasks.scrape_Chegg, "retry", lambda **kwargs: countdowns.append(kwargs["countdown"]) or retry(**kwargs)
+    )
+
+    Tasks.scrape_Chegg.apply(args=(1, None, "Implement a stack using two queues."))
+
+    assert len(attempts) == tries
+    assert len(countdowns) == tries - 1
+    assert closed_circuit.outcomes == (["failure"] if failure == CAPTCHA_FAILURE else ["release"]) * tries
+
+
+def test_open_circuit_defers_scan_without_scraping(monkeypatch):
+    deferred = []
+    monkeypatch.setattr(Tasks, "circuit_breaker", FixedCircuit(open_for=120))
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "scrape", lambda self, assignment_id: pytest.fail("scraped while open"))
+    monkeypatch.setattr(Tasks.scrape_Chegg, "apply_async", lambda args, **options: deferred.append((args, options)))
+
+    Tasks.scrape_Chegg.run(1, None, "Implement a stack using two queues.")
+
+    assert deferred[0][0] == (1, None, "Implement a stack using two queues.")
+    assert deferred[0][1]["countdown"] >= 120
+    assert deferred[0][1]["retries"] == 0
+
+
+def test_captchas_back_off_longer(monkeypatch):
+    monkeypatch.setattr(Tasks, "backoff_delay", lambda retries, base, maximum: base * 2 ** retries)
+
+    assert Tasks.retry_countdown(CAPTCHA_FAILURE, 2) == Tasks.CAPTCHA_BACKOFF_BASE * 4
+    assert Tasks.retry_countdown(ELEMENT_FAILURE, 2) == Tasks.RETRY_BACKOFF_BASE * 4
+    assert Tasks.retry_countdown(PROXY_FAILURE, 2) == Tasks.CAPTCHA_BACKOFF_BASE * 4
+    assert Tasks.retry_countdown(None, 0) == Tasks.RETRY_BACKOFF_BASE
+
+
+def test_rate_limited_scan_is_requeued(monkeypatch, closed_circuit):
+    deferred = []
+
+    def rate_limited(self, assignment_id):
+        raise Tasks.RateLimited("No token", 40)
+
+    monkeypatch.setattr(Tasks.Chegg_Scraper, "scrape", rate_limited)
+    monkeypatch.setattr(Tasks.scrape_Chegg, "apply_async", lambda args, **options: deferred.append(options))
+
+    Tasks.scrape_Chegg.run(1, None, "Implement a stack using two queues.")
+
+    assert deferred[0]["countdown"] >= 40
+    assert deferred[0]["retries"] == 0
+    # The scan may have been the probe of a half-open circuit
+    assert closed_circuit.outcomes == ["release"]
@@ -0,0 +1,37 @@
+import pytest
+
+from TextNormalizer import TokenCache, normalize_text
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("  Find the   height\n\nof a tree ", "Find the height of a tree"),
+        ("<div class=\"q\">Sort the <b>array</b></div>", "Sort the array"),
+        ("Prove a < b and b > c", "Prove a < b and b > c"),
+        ("Compute $\\frac{\\alpha}{2}$", "Compute frac alpha 2"),
+        ("Show transcribed image text Balance the tree", "Balance the tree"),
+        ("ﬁnd x² &amp; y", "find x2 & y"),
+    ],
+)
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+def test_token_cache_counts_hits_and_misses():
+    cache = TokenCache(maxsize=2)
+
+    assert cache.tokenize("Binary <b>Search</b> Tree") == ("binary", "search", "tree")
+    assert cache.tokenize("Binary <b>Search</b> Tree") == ("binary", "search", "tree")
+    assert cache.info() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 2}
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(maxsize=2)
+    cache.tokenize("first text")
+    cache.tokenize("second text")
+    cache.tokenize("first text")
+    cache.tokenize("third text")
+    cache.tokenize("second text")
+
+    assert cache.info() == {"hits": 1, "misses": 4, "size": 2, "maxsize": 2}